@@ -1,55 +1,285 @@
 import numpy as np
 from backend.NumericalTools import derive
-import matplotlib.pyplot as plt
-import json, os, sys
-import pandas as pd
-from scipy import interpolate
+from backend.AirfoilDatabase import REGISTRY, datafolder_path, get_pack, read_processed_file
+from backend.ProfilingTool import instrumented
+from backend.SplineTool import RESAMPLER, split_surfaces, turning_point
+import json, os
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Union
 
 
-datafolder_path = '\\'.join(__file__.split('/')[:-3]) if len(__file__.split('/')) > 1 else '\\'.join(__file__.split('\\')[:-3])
-datafiles_path = datafolder_path + '\\data\\AirfoilCoordinates\\processed'
+def __getattr__(name: str):
+    """
+    AIRFOILS is resolved on first access through the registry, so importing this module does not touch the disk.
+    """
 
-# datafiles_path = '/'.join(__file__.split('/')[:-3]) + 'data/AirfoilCoordinates/processed'
-print(__file__, datafiles_path)
-AIRFOILS = [file.split('.')[0] for file in os.listdir(datafiles_path)]
+    if name == 'AIRFOILS':
+        return REGISTRY.names()
 
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@lru_cache(maxsize=None)
+def fivedigit_coefficients():
+    """
+    Camber line coefficients of the 5-digit NACA series, keyed by the first three digits of the code.
+    The file is read once per process.
+    """
+
+    datafile = os.path.join(datafolder_path, 'fivedigit_coefficients.json')
+
+    with open(datafile, 'r') as file:
+        return json.load(file)
+
+
+def thickness_distribution(x, t, c=1.0):
+    """
+    Thickness distribution of 4- and 5-digit NACA airfoils.
+    All parameters may be arrays, as long as they broadcast against each other.
+    :param x: x-coordinates, ranging from 0 to c
+    :param t: maximum thickness as a fraction of the chord
+    :param c: chordlength
+    :return: half-thickness at every x-coordinate
+    """
+
+    xc = x / c
+
+    return t / 0.2 * (0.2969 * np.sqrt(xc) -
+                      0.1260 * xc -
+                      0.3515 * xc ** 2 +
+                      0.2843 * xc ** 3 -
+                      0.1015 * xc ** 4) * c
+
+
+def four_digit_camber(x, m, p, c=1.0):
+    """
+    Mean camber line of a 4-digit NACA airfoil together with its analytic slope.
+    All parameters may be arrays, as long as they broadcast against each other.
+    :param x: x-coordinates, ranging from 0 to c
+    :param m: maximum camber as a fraction of the chord
+    :param p: position of maximum camber as a fraction of the chord
+    :param c: chordlength
+    :return: tuple of the camber line ordinates and the slopes dyc/dx
+    """
+
+    xc = np.asarray(x, dtype=float) / c
+    m = np.asarray(m, dtype=float)
+    p = np.asarray(p, dtype=float)
+
+    # Symmetrical airfoils (p = 0) get a zero coefficient instead of a division by zero
+    shape = np.broadcast(m, p).shape
+    a_front = np.divide(m, p ** 2, out=np.zeros(shape), where=p > 0)
+    a_rear = np.divide(m, (1 - p) ** 2, out=np.zeros(shape), where=p < 1)
+
+    front = xc <= p
+
+    yc = np.where(front, a_front * (2 * p * xc - xc ** 2), a_rear * (1 - 2 * p + 2 * p * xc - xc ** 2)) * c
+    dyc_dx = np.where(front, a_front, a_rear) * 2 * (p - xc)
+
+    return yc, dyc_dx
 
-class AirFoil(object):
 
-    def __init__(self, chord: int or float):
+def five_digit_camber(x, m, k1, c=1.0, k2_k1=0.0):
+    """
+    Mean camber line of a 5-digit NACA airfoil together with its analytic slope.
+    With k2_k1 equal to zero this is the standard camber line, otherwise the reflexed one.
+    All parameters may be arrays, as long as they broadcast against each other.
+    :param x: x-coordinates, ranging from 0 to c
+    :param m: camber function parameter, the chordwise position where the camber line changes shape
+    :param k1: camber function parameter
+    :param c: chordlength
+    :param k2_k1: ratio of the reflex parameters k2/k1
+    :return: tuple of the camber line ordinates and the slopes dyc/dx
+    """
 
-        self.chord = chord
-        self.coordinates = None
+    xc = np.asarray(x, dtype=float) / c
+    m = np.asarray(m, dtype=float)
+    k1 = np.asarray(k1, dtype=float)
+    k2_k1 = np.asarray(k2_k1, dtype=float)
+
+    front = xc < m
+    cubic = np.where(front, 1, k2_k1)
+    linear = k2_k1 * (1 - m) ** 3 + m ** 3
+
+    yc = k1 / 6 * (cubic * (xc - m) ** 3 - linear * xc + m ** 3) * c
+    dyc_dx = k1 / 6 * (3 * cubic * (xc - m) ** 2 - linear)
+
+    return yc, dyc_dx
+
+
+def naca_family(codes: Union[list, np.ndarray] = None, m=None, p=None, t=None,
+                n: int = 25, cosine_spacing: bool = False, chord: int or float = 1.0, dtype=np.float64):
+    """
+    Generate the coordinates of a whole family of NACA airfoils in one go, without creating an airfoil object
+    for each of them. The airfoils are either given by their 4- or 5-digit codes, or by arrays of 4-digit
+    parameters m, p and t.
+    The coordinates are ordered like those of NACAFoil.load_coordinates: from the upper trailing edge,
+    over the leading edge, to the lower trailing edge.
+    :param codes: list or array of 4- and/or 5-digit codes, given as strings to preserve leading zeros
+    :param m: maximum camber as a fraction of the chord, only used when no codes are given
+    :param p: position of maximum camber as a fraction of the chord, only used when no codes are given
+    :param t: maximum thickness as a fraction of the chord, only used when no codes are given
+    :param n: number of points per surface
+    :param cosine_spacing: Whether to use cosine spacing along the chord instead of uniform spacing
+    :param chord: chordlength
+    :param dtype: floating point type of the coordinates, they are always calculated in double precision
+    :return: array of shape (N, 2n, 2), with the x- and z-coordinates of every airfoil along the last axis
+    """
+
+    if codes is not None:
+        m, p, t, k1, k2_k1, five = _parse_naca_codes(codes)
+
+    elif m is None or p is None or t is None:
+        raise ValueError("Expected either a list of codes or the parameters m, p and t")
+
+    else:
+        m, p, t = np.broadcast_arrays(*[np.atleast_1d(np.asarray(v, dtype=float)) for v in (m, p, t)])
+        k1 = k2_k1 = np.zeros_like(m)
+        five = np.zeros(m.shape, dtype=bool)
+
+    if cosine_spacing is False:
+        x = np.linspace(0, 1, n)
+
+    elif cosine_spacing is True:
+        x = 0.5 * (1 - np.cos(np.linspace(0, np.pi, n)))
+
+    else:
+        raise ValueError(f"Expected a Boolean, got {type(cosine_spacing)} instead")
+
+    yt = thickness_distribution(x, t[:, None])
+    yc = np.empty(yt.shape)
+    dyc_dx = np.empty(yt.shape)
+
+    four = ~five
+    yc[four], dyc_dx[four] = four_digit_camber(x, m[four, None], p[four, None])
+    yc[five], dyc_dx[five] = five_digit_camber(x, m[five, None], k1[five, None], 1, k2_k1[five, None])
+
+    theta = np.arctan(dyc_dx)
+    dx = yt * np.sin(theta)
+    dz = yt * np.cos(theta)
+
+    coordinates = np.empty((yt.shape[0], 2 * n, 2))
+    coordinates[:, :n, 0] = (x - dx)[:, ::-1]
+    coordinates[:, :n, 1] = (yc + dz)[:, ::-1]
+    coordinates[:, n:, 0] = x + dx
+    coordinates[:, n:, 1] = yc - dz
+    coordinates *= chord
 
-    @staticmethod
-    def __turning_point(arr):
+    return coordinates.astype(dtype, copy=False)
 
-        oldval = arr[0]
-        for idx, value in enumerate(arr[1:]):
-            if value > oldval:
-                return idx
 
-            else:
-                oldval = float(value)
+def _parse_naca_codes(codes: Union[list, np.ndarray]):
+    """
+    Turn a list of 4- and 5-digit NACA codes into parameter arrays.
+    :return: tuple of arrays m, p, t, k1, k2/k1 and a mask which is True for the 5-digit codes
+    """
 
-        raise ValueError("Could not find turning point in given arrays. "
-                         "Make sure the coordinates are defined from upper trailing edge to lower trailing edge.")
+    codes = np.atleast_1d(np.asarray(codes).astype(str))
 
-    def __find_turning_point(self):
+    if not np.all(np.char.isdigit(codes)):
+        raise TypeError("Expected numerical codes, got characters instead")
+
+    lengths = np.char.str_len(codes)
+    if np.any((lengths != 4) & (lengths != 5)):
+        raise ValueError("Expected 4- or 5-Digit inputs only")
+
+    values = codes.astype(np.int64)
+    five = lengths == 5
 
-        x = self.coordinates['x']
+    m = values // 1000 / 100
+    p = values // 100 % 10 / 10
+    t = values % 100 / 100
+    k1 = np.zeros(values.shape)
+    k2_k1 = np.zeros(values.shape)
 
-        return self.__turning_point(x)
+    if np.any(five):
+        table = fivedigit_coefficients()
+        series = np.array(sorted(int(key) for key in table))
+        coefficients = np.array([[table[str(key)]['m'], table[str(key)]['p'], table[str(key)]['k1'],
+                                  table[str(key)].get('k2_k1', 0.0)] for key in series])
 
-    def spline_coordinate_calculation(self, xnew: Union[list, np.array, str], k: int = 3, s: int = 0, **kwargs):
+        requested = values[five] // 100
+        idx = np.clip(np.searchsorted(series, requested), 0, len(series) - 1)
+        unknown = series[idx] != requested
+        if np.any(unknown):
+            raise ValueError(f"No coefficients available for 5-digit series {sorted(set(requested[unknown].tolist()))}")
+
+        m[five], p[five], k1[five], k2_k1[five] = coefficients[idx].T
+
+    return m, p, t, k1, k2_k1, five
+
+
+def resample_airfoils(names: list = None, n: int = 25, cosine_spacing: bool = False, k: int = 3, s: int = 0,
+                      dtype=np.float64):
+    """
+    Resample many database airfoils onto the same grid at once, as LoadedAirfoil.load_coordinates does for a single
+    airfoil. The splines of the airfoils are fitted once per process, and airfoils defined at the same stations are
+    evaluated together with one matrix product per surface, so resampling the database to another grid is cheap.
+    :param names: names of the airfoils, defaults to the whole database
+    :param n: number of points per surface
+    :param cosine_spacing: Whether to use cosine spacing along the chord instead of uniform spacing
+    :param k: spline order
+    :param s: spline smoothing factor
+    :param dtype: floating point type of the coordinates
+    :return: list of the names of the resampled airfoils, leaving out those whose coordinates cannot be fitted,
+             and an array of shape (N, 2n, 2) with their coordinates ordered like those of naca_family
+    """
+
+    names = REGISTRY.names() if names is None else names
+    pack = get_pack()
+
+    if cosine_spacing is False:
+        x = np.linspace(0, 1, n)
+
+    elif cosine_spacing is True:
+        x = 0.5 * (1 - np.cos(np.linspace(0, np.pi, n)))
+
+    else:
+        raise ValueError(f"Expected a Boolean, got {type(cosine_spacing)} instead")
+
+    resampled, upper, lower = [], [], []
+
+    for name in names:
+        coordinates = pack[name] if pack is not None else read_processed_file(REGISTRY.path(name))
+
+        try:
+            surfaces = split_surfaces(coordinates[:, 0], coordinates[:, 1])
+
+            for surface in surfaces:
+                RESAMPLER.fit(*surface, k=k, s=s)
+
+        except (ValueError, TypeError):
+            continue
+
+        resampled.append(name)
+        upper.append(surfaces[0])
+        lower.append(surfaces[1])
+
+    result = np.empty((len(resampled), 2 * n, 2))
+    result[:, :n, 0] = x[::-1]
+    result[:, n:, 0] = x
+    result[:, :n, 1] = RESAMPLER.evaluate_many(upper, x[::-1], k=k, s=s)
+    result[:, n:, 1] = RESAMPLER.evaluate_many(lower, x, k=k, s=s)
+
+    return resampled, result.astype(dtype, copy=False)
+
+
+class AirFoil(object):
 
-        arrsort = lambda xarr, zarr: np.array(
-            [[xi, zi] for xi, zi in sorted(zip(xarr, zarr),
-                                           key=lambda pair:
-                                           pair[0])
-             ]
-        )
+    def __init__(self, chord: int or float, dtype=np.float64):
+        """
+        :param chord: chordlength
+        :param dtype: floating point type of the generated coordinates. They are always calculated in double
+                      precision and converted at the end.
+        """
+
+        self.chord = chord
+        self.dtype = np.dtype(dtype)
+        self.coordinates = None
+
+    @instrumented('AirFoil.spline_coordinate_calculation')
+    def spline_coordinate_calculation(self, xnew: Union[list, np.array, str], k: int = 3, s: int = 0, **kwargs):
 
         if type(xnew) == list:
             xnew = np.array(xnew)
@@ -67,32 +297,28 @@ class AirFoil(object):
                 cosine = 0.5 * (1 - np.cos(np.linspace(0, np.pi, kwargs['n']))) * self.chord
                 xnew = np.concatenate((cosine[::-1], cosine))
 
-        idx_t_old = self.__find_turning_point()
-        idx_t_new = self.__turning_point(xnew)
-
-        upper_coordinates = arrsort(self.coordinates['x'][:idx_t_old], self.coordinates['z'][:idx_t_old])
-        lower_coordinates = arrsort(self.coordinates['x'][idx_t_old:], self.coordinates['z'][idx_t_old:])
+        idx_t_new = turning_point(xnew)
 
-        tU, cU, kU = interpolate.splrep(upper_coordinates[:, 0], upper_coordinates[:, 1], k=k, s=s)
-        tL, cL, kL = interpolate.splrep(lower_coordinates[:, 0], lower_coordinates[:, 1], k=k, s=s)
+        upper_coordinates, lower_coordinates = split_surfaces(self.coordinates['x'], self.coordinates['z'])
 
-        upper_spline = interpolate.BSpline(tU, cU, kU, extrapolate=False)
-        lower_spline = interpolate.BSpline(tL, cL, kL, extrapolate=False)
+        # The splines of every surface and their basis matrices on the target grid are cached,
+        # so resampling an airfoil again comes down to two matrix products
+        z = np.concatenate((RESAMPLER.evaluate(*upper_coordinates, xnew[:idx_t_new], k=k, s=s),
+                            RESAMPLER.evaluate(*lower_coordinates, xnew[idx_t_new:], k=k, s=s)))
 
         self.coordinates = {
-            'x': xnew,
-            'z': np.concatenate((upper_spline(xnew[:idx_t_new]), lower_spline(xnew[idx_t_new:])))
+            'x': np.asarray(xnew).astype(self.dtype, copy=False),
+            'z': z.astype(self.dtype, copy=False)
         }
-        self.coordinates['z'][np.isnan(self.coordinates['z'])] = 0
 
         return self.coordinates
 
 
 class NACAFoil(AirFoil):
 
-    def __init__(self, code: str or int, n_digits: int, chord: int or float, **kwargs):
+    def __init__(self, code: str or int, n_digits: int, chord: int or float, dtype=np.float64, **kwargs):
 
-        super().__init__(chord=chord)
+        super().__init__(chord=chord, dtype=dtype)
 
         self.__n = n_digits
 
@@ -111,14 +337,12 @@ class NACAFoil(AirFoil):
         self.__p = None
         self.__t = None
         self.__k1 = None
+        self.__k2_k1 = None
         self.__initialize_parameters()
 
         # Plotting Functions
         self.__yt = self.__thickness_distribution_functions(self.__t, self.chord)
-        self.__yc_p = lambda: None
-        self.__yc_c = lambda: None
-        self.__theta_p = lambda: None
-        self.__theta_c = lambda: None
+        self.__camber = self.__slope_calculation(kwargs['camber']) if 'camber' in kwargs else None
 
     def __str__(self):
         """
@@ -162,18 +386,12 @@ class NACAFoil(AirFoil):
 
         elif self.__n == 5:
 
-            if sys.platform == 'win32':
-                datafile = '\\'.join(datafiles_path.split('\\')[:-3])+'\\data\\fivedigit_coefficients.json'
-
-            else:
-                datafile = '/'.join(datafiles_path.split('/')[:-3]) + 'data/fivedigit_coefficients.json'
-
-            with open(datafile, 'r') as file:
-                coefficients = json.load(file)[self.code[0:3]]
+            coefficients = fivedigit_coefficients()[self.code[0:3]]
 
             self.__m = coefficients['m']         # Camber function parameter
             self.__p = coefficients['p']         # Position of Maximum Camber
             self.__k1 = coefficients['k1']       # Camber function parameter
+            self.__k2_k1 = coefficients.get('k2_k1', 0.0)  # Reflex parameter, zero for standard camber lines
             self.__t = int(self.code[3:]) / 100  # Maximum thickness
 
     @staticmethod
@@ -185,11 +403,7 @@ class NACAFoil(AirFoil):
         :return: function with as input a number from 0 to c and returning airfoil thickness.
         """
 
-        yt = lambda x: t / 0.2 * (0.2969 * np.sqrt(x / c) -
-                                         0.1260 * (x / c) -
-                                         0.3515 * (x / c) ** 2 +
-                                         0.2843 * (x / c) ** 3 -
-                                         0.1015 * (x / c) ** 4) * c
+        yt = lambda x: thickness_distribution(x, t, c)
 
         return yt
 
@@ -201,34 +415,24 @@ class NACAFoil(AirFoil):
     # TODO: Finish copying coefficients for modified 20% thickness airfoils
 
     @staticmethod
-    def __theta_calculation(yc_p, yc_c):
+    def __slope_calculation(yc):
         """
-        Method to calculate the slope of the airfoil. Is identical for 4- and 5-digit airfoils.
-        :param yc_p: Function describing the camberline with as input a number from 0 to p
-        :param yc_c:
-        :return:
+        Method to add a numerical slope to a user-supplied camber line. The built-in NACA camber lines have
+        analytic slopes and do not need this.
+        :param yc: Function describing the camberline with as input a number from 0 to c
+        :return: function with as input a number from 0 to c and returning the camber line and its slope.
         """
 
-        dyc_dx_p = derive(yc_p)
-        dyc_dx_c = derive(yc_c)
-
-        theta_p = lambda x: np.arctan(dyc_dx_p(x))
-        theta_c = lambda x: np.arctan(dyc_dx_c(x))
+        dyc_dx = derive(yc)
 
-        return theta_p, theta_c
+        return lambda x: (yc(x), dyc_dx(x))
 
     def get_coordinates(self):
         return self.coordinates
 
+    @instrumented('NACAFoil.load_coordinates')
     def load_coordinates(self, cosine_spacing: bool = False, n: int = 25):
 
-        data = {
-            'XU': [],
-            'YU': [],
-            'XL': [],
-            'YL': []
-        }
-
         if cosine_spacing is False:
             xrange = np.linspace(0, self.chord, n)
 
@@ -238,24 +442,17 @@ class NACAFoil(AirFoil):
         else:
             raise ValueError(f"Expected a Boolean, got {type(cosine_spacing)} instead")
 
-        for x in xrange:
-
-            if x <= self.__p * self.chord:
-                data['XU'].append(x - self.__yt(x) * np.sin(self.__theta_p(x)))
-                data['YU'].append(self.__yc_p(x) + self.__yt(x) * np.cos(self.__theta_p(x)))
+        yt = self.__yt(xrange)
+        yc, dyc_dx = self.__camber(xrange)
+        theta = np.arctan(dyc_dx)
 
-                data['XL'].append(x + self.__yt(x) * np.sin(self.__theta_p(x)))
-                data['YL'].append(self.__yc_p(x) - self.__yt(x) * np.cos(self.__theta_p(x)))
+        xu = xrange - yt * np.sin(theta)
+        yu = yc + yt * np.cos(theta)
+        xl = xrange + yt * np.sin(theta)
+        yl = yc - yt * np.cos(theta)
 
-            elif self.chord >= x > self.chord * self.__p:
-                data['XU'].append(x - self.__yt(x) * np.sin(self.__theta_c(x)))
-                data['YU'].append(self.__yc_c(x) + self.__yt(x) * np.cos(self.__theta_c(x)))
-
-                data['XL'].append(x + self.__yt(x) * np.sin(self.__theta_c(x)))
-                data['YL'].append(self.__yc_c(x) - self.__yt(x) * np.cos(self.__theta_c(x)))
-
-        x = np.concatenate((data['XU'][::-1], data['XL']))
-        z = np.concatenate((data['YU'][::-1], data['YL']))
+        x = np.concatenate((xu[::-1], xl)).astype(self.dtype, copy=False)
+        z = np.concatenate((yu[::-1], yl)).astype(self.dtype, copy=False)
 
         self.coordinates = {"x": x, "z": z}
 
@@ -264,10 +461,10 @@ class NACAFoil(AirFoil):
 
 class FourDigitNACA(NACAFoil):
 
-    def __init__(self, code: str or int, chord: int or float, **kwargs):
+    def __init__(self, code: str or int, chord: int or float, dtype=np.float64, **kwargs):
 
         # Initialize Parent NACA Class
-        super().__init__(code=code, chord=chord, n_digits=4, **kwargs)
+        super().__init__(code=code, chord=chord, n_digits=4, dtype=dtype, **kwargs)
 
         self.__p = self._NACAFoil__p
         self.__m = self._NACAFoil__m
@@ -279,58 +476,56 @@ class FourDigitNACA(NACAFoil):
             self.__type = 'cambered'
 
         self.__yt = self._NACAFoil__yt
-        self._NACAFoil__yc_p, self._NACAFoil__yc_c = self.__mean_camber_line()
-        self._NACAFoil__theta_p, self._NACAFoil__theta_c = self._NACAFoil__theta_calculation(self._NACAFoil__yc_p, self._NACAFoil__yc_c)
+
+        if self._NACAFoil__camber is None:
+            self._NACAFoil__camber = self.__mean_camber_line()
 
     def __mean_camber_line(self):
 
         if self.__type == 'cambered':
-            yc_0 = lambda x: self.__m / (self.__p ** 2) * (2 * self.__p * x / self.chord - (x / self.chord) ** 2) * self.chord
-            yc_1 = lambda x: self.__m / ((1 - self.__p) ** 2) * (1 - 2 * self.__p + 2 * self.__p * x / self.chord - (x / self.chord) ** 2) * self.chord
+            camber = lambda x: four_digit_camber(x, self.__m, self.__p, self.chord)
 
         elif self.__type == 'symmetrical':
-            yc_0 = lambda x: 0
-            yc_1 = lambda x: 0
+            camber = lambda x: (np.zeros_like(x), np.zeros_like(x))
 
         else:
             raise TypeError("Airfoil type not defined")
 
-        return yc_0, yc_1
+        return camber
 
 
 class FiveDigitNACA(NACAFoil):
 
-    def __init__(self, code: str or int, chord: int or float, **kwargs):
+    def __init__(self, code: str or int, chord: int or float, dtype=np.float64, **kwargs):
 
         # Initialize Parent NACA Class
-        super().__init__(code=code, chord=chord, n_digits=5, **kwargs)
+        super().__init__(code=code, chord=chord, n_digits=5, dtype=dtype, **kwargs)
 
         self.__p = self._NACAFoil__p
         self.__m = self._NACAFoil__m
         self.__k1 = self._NACAFoil__k1
+        self.__k2_k1 = self._NACAFoil__k2_k1
 
         self.__yt = self._NACAFoil__yt
-        self._NACAFoil__yc_p, self._NACAFoil__yc_c = self.__mean_camber_line()
-        self._NACAFoil__theta_p, self._NACAFoil__theta_c = self._NACAFoil__theta_calculation(self._NACAFoil__yc_p,
-                                                                                             self._NACAFoil__yc_c)
 
-    def __mean_camber_line(self):
+        if self._NACAFoil__camber is None:
+            self._NACAFoil__camber = self.__mean_camber_line()
 
-        yc_0 = lambda x: self.__k1/6*(x**3 - 3*self.__m*x**2+self.__m**2*(3-self.__m)*x)
-        yc_1 = lambda x: self.__k1/6*self.__m**3*(1-x)
+    def __mean_camber_line(self):
 
-        return yc_0, yc_1
+        return lambda x: five_digit_camber(x, self.__m, self.__k1, self.chord, self.__k2_k1)
 
 
 class LoadedAirfoil(AirFoil):
 
-    def __init__(self, code: str, chord: int or float = 1.0):
+    def __init__(self, code: str, chord: int or float = 1.0, dtype=np.float64):
 
-        super().__init__(chord=chord)
+        super().__init__(chord=chord, dtype=dtype)
 
         self.code = code.lower()
 
-    def load_coordinates(self, cosine_spacing: bool = False, n: int = 25):
+    @instrumented('LoadedAirfoil.load_coordinates')
+    def load_coordinates(self, cosine_spacing: bool = False, n: int = 25, k: int = 3, s: int = 0):
 
         self.coordinates = self.__load_airfoil()
 
@@ -342,37 +537,157 @@ class LoadedAirfoil(AirFoil):
 
         # self.coordinates = self.spline_coordinate_calculation(xrange)
 
-        return self.spline_coordinate_calculation(xrange, n=n)
+        return self.spline_coordinate_calculation(xrange, k=k, s=s, n=n)
+
+    def properties(self):
+        """
+        Geometric properties of the airfoil from the property index: thickness, camber, leading edge radius,
+        trailing edge thickness and angle, area and perimeter, as fractions of the chord.
+        """
+
+        from backend.AirfoilProperties import get_property_index
+
+        index = get_property_index()
+        if self.code not in index:
+            raise ValueError("Specified Airfoil not found in database")
+
+        return index[self.code]
 
+    @instrumented('LoadedAirfoil.load_airfoil')
     def __load_airfoil(self):
 
-        if sys.platform == 'win32':
-            datafiles_path = '\\'.join(os.getcwd().split('\\')[:-2]) + '\\data\\AirfoilCoordinates\\processed'
+        pack = get_pack()
 
-        else:
-            datafiles_path = '/'.join(os.getcwd().split('/')[:-2]) + 'data/AirfoilCoordinates/processed'
+        if pack is not None:
+            if self.code not in pack:
+                raise ValueError("Specified Airfoil not found in database")
 
-        airfoils = AIRFOILS
+            # Read-only view into the memory-mapped pack
+            coordinates = pack[self.code]
 
-        if self.code not in airfoils:
+        elif self.code not in REGISTRY:
             raise ValueError("Specified Airfoil not found in database")
 
         else:
-            coordinates = pd.read_csv(datafiles_path+f"\\{self.code}.txt",
-                                      sep=',',
-                                      index_col=False,
-                                      skiprows=[0],
-                                      header=None,
-                                      names=['x', 'z'],
-                                      dtype=float)
+            coordinates = read_processed_file(REGISTRY.path(self.code))
 
-        data = {"x": np.array(coordinates['x'], dtype=float),
-                "z": np.array(coordinates['z'], dtype=float)}
+        data = {"x": coordinates[:, 0],
+                "z": coordinates[:, 1]}
 
         return data
 
+
+def create_airfoil(name: str, chord: int or float = 1.0, dtype=np.float64):
+    """
+    Create the airfoil object belonging to a name. Names starting with 'naca' followed by 4 or 5 digits
+    ('naca2412', 'NACA 23012') are generated analytically, everything else is loaded from the database.
+    :param name: name of the airfoil
+    :param chord: chordlength
+    :param dtype: floating point type of the generated coordinates
+    :return: FourDigitNACA, FiveDigitNACA or LoadedAirfoil object
+    """
+
+    if name[:4].lower() == 'naca':
+        code = name.split(' ')[1] if ' ' in name else name[4:]
+
+        if len(code) == 4 and code.isdigit():
+            return FourDigitNACA(code, chord, dtype=dtype)
+
+        elif len(code) == 5 and code.isdigit():
+            return FiveDigitNACA(code, chord, dtype=dtype)
+
+    return LoadedAirfoil(name, chord, dtype=dtype)
+
+
+class SectionCache(object):
+
+    def __init__(self, maxsize: int = 128):
+        """
+        Least-recently-used cache of chord-normalized airfoil sections, shared by all wings in the process.
+        Sections are keyed by (airfoil name, number of points, spacing, spline order, spline smoothing, dtype) and
+        handed out as read-only arrays, so callers cannot corrupt the cached data.
+        :param maxsize: maximum number of sections kept in memory
+        """
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__sections = OrderedDict()
+
+    def __len__(self):
+        return len(self.__sections)
+
+    def get(self, name: str, n: int, cosine_spacing: bool = False, k: int = 3, s: int = 0, dtype=np.float64):
+        """
+        Coordinates of an airfoil with unit chord, loaded on the first request and taken from the cache afterwards.
+        :return: dictionary with read-only 'x' and 'z' arrays
+        """
+
+        key = (name.lower().replace(' ', ''), n, 'cosine' if cosine_spacing else 'linear', k, s, np.dtype(dtype).str)
+
+        if key in self.__sections:
+            self.hits += 1
+            self.__sections.move_to_end(key)
+
+        else:
+            self.misses += 1
+            self.__sections[key] = self.__load(name, n, cosine_spacing, k, s, dtype)
+
+            while len(self.__sections) > self.maxsize:
+                self.__sections.popitem(last=False)
+                self.evictions += 1
+
+        x, z = self.__sections[key]
+
+        return {'x': x, 'z': z}
+
+    @staticmethod
+    @instrumented('SectionCache.load')
+    def __load(name: str, n: int, cosine_spacing: bool, k: int, s: int, dtype):
+
+        airfoil = create_airfoil(name, 1, dtype=dtype)
+
+        if isinstance(airfoil, LoadedAirfoil):
+            coordinates = airfoil.load_coordinates(cosine_spacing=cosine_spacing, n=n, k=k, s=s)
+
+        else:
+            coordinates = airfoil.load_coordinates(cosine_spacing=cosine_spacing, n=n)
+
+        x = np.array(coordinates['x'], dtype=dtype)
+        z = np.array(coordinates['z'], dtype=dtype)
+        x.setflags(write=False)
+        z.setflags(write=False)
+
+        return x, z
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.__sections),
+            'maxsize': self.maxsize
+        }
+
+    def clear(self):
+        """
+        Remove all sections and reset the counters.
+        """
+
+        self.__sections.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+SECTION_CACHE = SectionCache()
+
+
 if __name__ == '__main__':
 
+    import matplotlib.pyplot as plt
+
     test4d = FourDigitNACA('3210', chord=4)
     a = test4d.load_coordinates(cosine_spacing=False)
 
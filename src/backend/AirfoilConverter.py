@@ -0,0 +1,465 @@
+import numpy as np
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import time
+from typing import Union
+from backend.AirfoilDatabase import REGISTRY, PACK_INDEX, AirfoilPack, manifest_path, packed_path, processed_path, \
+    raw_path, read_processed_file, reset_packs, split_values, write_pack
+from backend.AirfoilProperties import PROPERTY_VERSION, properties_path, update_property_index
+from backend.AirfoilSimilarity import SHAPE_VERSION, shapes_path, update_shape_index
+
+
+# Recorded in the manifest, bump it whenever the parsing or normalization changes so everything is converted again
+CONVERTER_VERSION = 3
+
+# Points at the start or end of a file further outside the chord range of the other points than this fraction of
+# that range are not part of the airfoil. A full chord keeps sparse files whose last point on one surface is missing.
+OUTLIER_MARGIN = 1.0
+
+# Encodings tried in order when decoding a raw file, latin-1 accepts any byte sequence
+ENCODINGS = ('utf-8', 'latin-1')
+
+
+def decode(data: bytes):
+    """
+    Decode the contents of a raw file. Files with a byte order mark are decoded as UTF-16 or UTF-8 accordingly.
+    """
+
+    if data[:2] in (b'\xff\xfe', b'\xfe\xff'):
+        return data.decode('utf-16')
+
+    if data[:3] == b'\xef\xbb\xbf':
+        return data[3:].decode('utf-8', errors='replace')
+
+    for encoding in ENCODINGS:
+        try:
+            return data.decode(encoding)
+
+        except UnicodeDecodeError:
+            continue
+
+
+def tokenize(lines: list):
+    """
+    Convert the lines of a file into coordinate pairs. Lines holding two numbers (separated by whitespace or a
+    comma) are coordinates, all other lines are skipped. This includes lines with placeholders such as '......'.
+    Values in brackets are kept, see AirfoilDatabase.split_values.
+    :return: tuple of an array of shape (n, 2) with the pairs, and the line index of every pair
+    """
+
+    rows = [split_values(line) for line in lines]
+    candidates = np.array([idx for idx, row in enumerate(rows) if len(row) == 2], dtype=int)
+
+    if candidates.size == 0:
+        return np.zeros((0, 2)), candidates
+
+    tokens = np.array([rows[idx] for idx in candidates])
+
+    # Fast path: NumPy converts all tokens at once, which only fails if some line holds something else than numbers
+    try:
+        return tokens.astype(float), candidates
+
+    except ValueError:
+        pass
+
+    valid = np.ones(len(tokens), dtype=bool)
+    for idx, (a, b) in enumerate(tokens):
+        try:
+            float(a), float(b)
+
+        except ValueError:
+            valid[idx] = False
+
+    return tokens[valid].astype(float), candidates[valid]
+
+
+def trim_outliers(coordinates: np.ndarray):
+    """
+    Remove points from the start and end of Selig-ordered coordinates which lie far outside the chord range of the
+    other points. Some sources end with a footnote holding two numbers, such as '100.00 0.0000' in the NACA files,
+    which reads like a point otherwise.
+    """
+
+    def outside(x: float, others: np.ndarray):
+        margin = OUTLIER_MARGIN*(others.max() - others.min())
+        return x < others.min() - margin or x > others.max() + margin
+
+    while len(coordinates) > 3 and outside(coordinates[-1, 0], coordinates[:-1, 0]):
+        coordinates = coordinates[:-1]
+
+    while len(coordinates) > 3 and outside(coordinates[0, 0], coordinates[1:, 0]):
+        coordinates = coordinates[1:]
+
+    return coordinates
+
+
+def normalize(coordinates: np.ndarray):
+    """
+    Bring Selig-ordered coordinates into the order used throughout the database: from the trailing edge over the
+    upper surface to the leading edge, and back over the lower surface. Repeated points and points outside the
+    chord range (see trim_outliers) are removed.
+    """
+
+    coordinates = trim_outliers(coordinates)
+
+    if len(coordinates) > 1:
+        repeated = np.all(coordinates[1:] == coordinates[:-1], axis=1)
+        coordinates = coordinates[np.concatenate(([True], ~repeated))]
+
+    # Going over the upper surface first runs counter-clockwise, which gives a positive signed area
+    x, z = coordinates[:, 0], coordinates[:, 1]
+    area = 0.5*np.sum(x*np.roll(z, -1) - np.roll(x, -1)*z)
+
+    return coordinates[::-1] if area < 0 else coordinates
+
+
+def parse_airfoil(text: str):
+    """
+    Parse the contents of a raw airfoil file in Selig or Lednicer format.
+    Selig files list the points from the trailing edge over one surface to the leading edge and back over the other.
+    Lednicer files start with the number of points on the upper and lower surface, and list both surfaces from
+    the leading edge to the trailing edge.
+    :param text: contents of the file
+    :return: tuple of (title, normalized (n, 2) coordinates, 'selig' or 'lednicer')
+    """
+
+    lines = text.splitlines()
+    coordinates, line_numbers = tokenize(lines)
+
+    # The title is the first non-empty line, unless that line already holds coordinates
+    first = next((idx for idx, line in enumerate(lines) if line.strip()), None)
+    title = lines[first].strip() if first is not None and (line_numbers.size == 0 or line_numbers[0] != first) else ''
+
+    layout = 'selig'
+
+    if len(coordinates) > 0:
+        n_upper, n_lower = coordinates[0]
+
+        # Point counts instead of chord fractions, matching the number of points that follow
+        if n_upper >= 2 and n_lower >= 2 and n_upper % 1 == 0 and n_lower % 1 == 0 and \
+                int(n_upper + n_lower) == len(coordinates) - 1:
+
+            layout = 'lednicer'
+            upper = coordinates[1:1 + int(n_upper)]
+            lower = coordinates[1 + int(n_upper):]
+            coordinates = np.concatenate((upper[::-1], lower))
+
+    return title, normalize(coordinates), layout
+
+
+def format_processed(title: str, coordinates: np.ndarray):
+    """
+    Contents of a processed file: the title on the first line, then one 'x,z' pair per line.
+    10 significant digits reproduce every value of the raw files exactly.
+    """
+
+    lines = [f"{x:.10g},{z:.10g}" for x, z in coordinates.tolist()]
+
+    return '\n'.join([title] + lines) + '\n'
+
+
+def file_digest(path: str):
+    """
+    SHA-256 of the contents of a file.
+    """
+
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def convert_file(raw_file: str, processed_folder: str = None):
+    """
+    Convert a single raw file.
+    :param raw_file: path of the raw file
+    :param processed_folder: folder to write the processed file to, or None to only parse the file
+    :return: dictionary with the 'name', 'title', 'coordinates' and 'layout' of the airfoil, and the SHA-256 of
+             the raw file ('source_sha256') and of the processed file ('output_sha256', None if not written)
+    """
+
+    with open(raw_file, 'rb') as file:
+        data = file.read()
+
+    title, coordinates, layout = parse_airfoil(decode(data))
+
+    # Everything after the first dot is dropped, as the airfoil names in the database always have been
+    name = os.path.basename(raw_file).split('.')[0]
+    output_sha256 = None
+
+    if processed_folder is not None:
+        content = format_processed(title, coordinates).encode('utf-8')
+        output_sha256 = hashlib.sha256(content).hexdigest()
+
+        with open(os.path.join(processed_folder, f"{name}.txt"), 'wb') as file:
+            file.write(content)
+
+    return {
+        'name': name,
+        'title': title,
+        'coordinates': coordinates,
+        'layout': layout,
+        'source_sha256': hashlib.sha256(data).hexdigest(),
+        'output_sha256': output_sha256
+    }
+
+
+def _convert_chunk(task: tuple):
+    """
+    Worker function: convert a list of raw files.
+    """
+
+    raw_files, processed_folder = task
+
+    return [convert_file(raw_file, processed_folder) for raw_file in raw_files]
+
+
+def _convert_files(raw_files: list, processed_folder: Union[str, None], processes: int = None):
+    """
+    Convert raw files across a process pool.
+    :return: list of the records returned by convert_file, in the order of the files
+    """
+
+    if not raw_files:
+        return []
+
+    if processed_folder is not None:
+        os.makedirs(processed_folder, exist_ok=True)
+
+    processes = os.cpu_count() if processes is None else processes
+    chunksize = max(1, -(-len(raw_files) // (4*processes)))
+    tasks = [(raw_files[start:start + chunksize], processed_folder) for start in range(0, len(raw_files), chunksize)]
+
+    if processes == 1:
+        results = [_convert_chunk(task) for task in tasks]
+
+    else:
+        with mp.Pool(processes) as pool:
+            results = pool.map(_convert_chunk, tasks)
+
+    return [record for chunk in results for record in chunk]
+
+
+def convert_database(raw_folder: str = raw_path, processed_folder: str = processed_path, pack_folder: str = packed_path,
+                     output: str = 'both', processes: int = None, files: list = None):
+    """
+    Convert raw airfoil files into processed text files, the binary pack, or both.
+    :param raw_folder: folder containing the raw files
+    :param processed_folder: folder to write the processed .txt files to
+    :param pack_folder: folder to write the binary pack to
+    :param output: 'text', 'pack' or 'both'
+    :param processes: number of worker processes, defaults to the number of CPUs. With 1, no pool is started.
+    :param files: names of the raw files to convert, defaults to all files in the raw folder
+    :return: dictionary with the airfoil names as keys and (title, coordinates, layout) tuples as values
+    """
+
+    if output not in ('text', 'pack', 'both'):
+        raise ValueError(f"Expected output 'text', 'pack' or 'both', got '{output}'")
+
+    files = sorted(os.listdir(raw_folder)) if files is None else list(files)
+    records = _convert_files([os.path.join(raw_folder, file) for file in files],
+                             processed_folder if output in ('text', 'both') else None, processes)
+
+    airfoils = {record['name']: (record['title'], record['coordinates'], record['layout']) for record in records}
+
+    if output in ('pack', 'both'):
+        write_pack({name: airfoil[1] for name, airfoil in sorted(airfoils.items())}, pack_folder)
+
+    REGISTRY.invalidate()
+
+    return airfoils
+
+
+def load_manifest(path: str = manifest_path):
+    """
+    Read the manifest of the database, or return an empty one if there is none yet.
+    """
+
+    if not os.path.isfile(path):
+        return {'converter_version': CONVERTER_VERSION, 'sources': {}, 'indexes': {}}
+
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def save_manifest(manifest: dict, path: str = manifest_path):
+    """
+    Write the manifest. It is replaced in one step, so an interrupted run never leaves half a manifest behind.
+    """
+
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+
+    os.replace(temporary, path)
+
+
+def outputs_digest(manifest: dict):
+    """
+    Digest of all processed outputs listed in the manifest. An index built from outputs with the same digest is
+    up to date.
+    """
+
+    outputs = sorted(f"{entry['name']}:{entry['output_sha256']}" for entry in manifest['sources'].values())
+
+    return hashlib.sha256('\n'.join(outputs).encode('utf-8')).hexdigest()
+
+
+def update_pack(names: list, load: callable, changed: set, pack_folder: str = packed_path):
+    """
+    Rebuild the binary pack. Airfoils which did not change are copied from the current pack, all others are loaded.
+    :param names: names of all airfoils in the database
+    :param load: function returning the (n, 2) coordinates of an airfoil from its name
+    :param changed: names of the airfoils whose coordinates changed since the pack was written
+    :param pack_folder: folder of the pack
+    """
+
+    current = AirfoilPack(pack_folder) if os.path.isfile(os.path.join(pack_folder, PACK_INDEX)) else None
+
+    airfoils = {}
+    for name in sorted(names):
+        if current is not None and name not in changed and name in current:
+            airfoils[name] = np.array(current[name])
+
+        else:
+            airfoils[name] = load(name)
+
+    # Let go of the memory map before the file underneath it is rewritten
+    del current
+    reset_packs()
+
+    write_pack(airfoils, pack_folder)
+
+
+# Downstream indexes built from the processed outputs, by name: function(names, load, changed, target)
+INDEX_BUILDERS = {
+    'pack': update_pack,
+    'properties': update_property_index,
+    'shapes': update_shape_index,
+}
+
+# Versions of the indexes whose contents do not only depend on the processed outputs, recorded in the manifest
+INDEX_VERSIONS = {
+    'properties': PROPERTY_VERSION,
+    'shapes': SHAPE_VERSION,
+}
+
+
+def update_database(raw_folder: str = raw_path, processed_folder: str = processed_path, manifest_file: str = manifest_path,
+                    indexes: dict = None, processes: int = None, force: bool = False):
+    """
+    Bring the processed files and the downstream indexes up to date with the raw files. Only raw files which are new,
+    changed, or were converted by another converter version are converted, and only the indexes whose inputs changed
+    are rebuilt. Processed files whose raw file has disappeared are removed.
+    :param raw_folder: folder containing the raw files
+    :param processed_folder: folder containing the processed .txt files
+    :param manifest_file: path of the manifest
+    :param indexes: dictionary with the names of the indexes in INDEX_BUILDERS to update as keys and their targets
+                    as values, defaults to all of them in their default locations
+    :param processes: number of worker processes for the conversion
+    :param force: convert all raw files and rebuild all indexes, regardless of the manifest
+    :return: dictionary with lists of the 'added', 'changed' and 'removed' raw files, the number of 'unchanged'
+             ones, and the names of the 'rebuilt' indexes
+    """
+
+    indexes = {'pack': packed_path, 'properties': properties_path, 'shapes': shapes_path} if indexes is None else indexes
+
+    manifest = load_manifest(manifest_file)
+    if manifest.get('converter_version') != CONVERTER_VERSION:
+        force = True
+
+    sources = manifest['sources']
+    files = sorted(os.listdir(raw_folder))
+
+    digests = {file: file_digest(os.path.join(raw_folder, file)) for file in files}
+
+    def up_to_date(file: str):
+        entry = sources[file]
+        output = os.path.join(processed_folder, f"{entry['name']}.txt")
+
+        return entry['source_sha256'] == digests[file] and os.path.isfile(output) and \
+            file_digest(output) == entry['output_sha256']
+
+    added = [file for file in files if file not in sources]
+    changed = [file for file in files if file in sources and (force or not up_to_date(file))]
+    removed = sorted(set(sources) - set(files))
+
+    # Outputs of removed sources go first, a changed source may have taken over their name
+    for file in removed:
+        output = os.path.join(processed_folder, f"{sources.pop(file)['name']}.txt")
+        if os.path.isfile(output):
+            os.remove(output)
+
+    records = _convert_files([os.path.join(raw_folder, file) for file in added + changed], processed_folder, processes)
+
+    converted = {}
+    for file, record in zip(added + changed, records):
+        sources[file] = {key: record[key] for key in ('name', 'layout', 'source_sha256', 'output_sha256')}
+        converted[record['name']] = record['coordinates']
+
+    manifest['converter_version'] = CONVERTER_VERSION
+
+    # Indexes are rebuilt when any output changed, or when the index is missing, out of date or of another version
+    digest = outputs_digest(manifest)
+
+    names = [entry['name'] for entry in sources.values()]
+    load = lambda name: converted[name] if name in converted else \
+        read_processed_file(os.path.join(processed_folder, f"{name}.txt"))
+
+    rebuilt = []
+    for index, target in indexes.items():
+        state = manifest['indexes'].get(index, {})
+
+        version = INDEX_VERSIONS.get(index)
+
+        if force or state.get('digest') != digest or state.get('target') != target or \
+                state.get('version') != version or not os.path.exists(target):
+            INDEX_BUILDERS[index](names, load, set(names) if force else set(converted), target)
+            manifest['indexes'][index] = {'digest': digest, 'target': target, 'version': version}
+            rebuilt.append(index)
+
+    save_manifest(manifest, manifest_file)
+    REGISTRY.invalidate()
+
+    return {
+        'added': added,
+        'changed': changed,
+        'removed': removed,
+        'unchanged': len(files) - len(added) - len(changed),
+        'rebuilt': rebuilt
+    }
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Convert the raw airfoil files into processed files and the binary pack. "
+                                                 "Only new and changed raw files are converted, unless --full is given.")
+    parser.add_argument('--raw', default=raw_path, help="folder containing the raw files")
+    parser.add_argument('--processed', default=processed_path, help="folder to write the processed .txt files to")
+    parser.add_argument('--pack', default=packed_path, help="folder to write the binary pack to")
+    parser.add_argument('--properties', default=properties_path, help="file to write the property index to")
+    parser.add_argument('--shapes', default=shapes_path, help="file to write the shape vectors to")
+    parser.add_argument('--manifest', default=manifest_path, help="manifest recording what has been converted")
+    parser.add_argument('--output', choices=('text', 'pack', 'both'), default='both',
+                        help="what to write. 'pack' converts everything straight into the pack, without a manifest.")
+    parser.add_argument('--full', action='store_true', help="convert all files and rebuild all indexes")
+    parser.add_argument('--processes', type=int, default=None, help="number of worker processes")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    if args.output == 'pack':
+        airfoils = convert_database(args.raw, args.processed, args.pack, output='pack', processes=args.processes)
+        print(f"Converted {len(airfoils)} airfoils into the pack in {time.perf_counter() - start:.2f} s")
+
+    else:
+        summary = update_database(args.raw, args.processed, args.manifest, processes=args.processes, force=args.full,
+                                  indexes={'pack': args.pack, 'properties': args.properties, 'shapes': args.shapes}
+                                  if args.output == 'both' else {})
+
+        print(f"Updated the database in {time.perf_counter() - start:.2f} s: {len(summary['added'])} added, "
+              f"{len(summary['changed'])} changed, {len(summary['removed'])} removed, {summary['unchanged']} unchanged")
+
+        if summary['rebuilt']:
+            print(f"Rebuilt: {', '.join(summary['rebuilt'])}")
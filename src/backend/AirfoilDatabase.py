@@ -0,0 +1,300 @@
+import numpy as np
+import argparse
+import hashlib
+import json
+import os
+from typing import Union
+
+
+datafolder_path = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data'))
+raw_path = os.path.join(datafolder_path, 'AirfoilCoordinates', 'raw')
+processed_path = os.path.join(datafolder_path, 'AirfoilCoordinates', 'processed')
+packed_path = os.path.join(datafolder_path, 'AirfoilCoordinates', 'packed')
+manifest_path = os.path.join(datafolder_path, 'AirfoilCoordinates', 'manifest.json')
+
+PACK_DATA = 'airfoils.bin'
+PACK_INDEX = 'airfoils.json'
+
+# Data files of a pack are named after their contents, 'airfoils-<digest>.bin', and the index points to one of them
+PACK_DATA_PREFIX = 'airfoils-'
+PACK_DTYPE = '<f8'
+
+
+def split_values(line: str):
+    """
+    Split a line of a coordinate file into its values, separated by whitespace or a comma. Values in brackets,
+    which some sources use to mark estimated points such as the trailing edge of the NACA tables, are kept
+    without their brackets.
+    """
+    return [token[1:-1] if len(token) > 2 and token[0] == '(' and token[-1] == ')' else token
+            for token in line.replace(',', ' ').split()]
+
+
+def read_processed_file(path: str):
+    """
+    Read a processed airfoil file. The first line holds the title, every other line an 'x,z' pair.
+    Lines which do not start with two numbers (comments, separators, footnotes) are skipped.
+    :param path: path to the processed .txt file
+    :return: array of shape (n, 2) with the x- and z-coordinates
+    """
+
+    with open(path, 'r', encoding='latin-1') as file:
+        lines = file.read().splitlines()[1:]
+
+    points = []
+    for line in lines:
+        values = split_values(line)
+
+        try:
+            points.append((float(values[0]), float(values[1])))
+
+        except (ValueError, IndexError):
+            continue
+
+    return np.array(points, dtype=float).reshape(-1, 2)
+
+
+def build_pack(processed_folder: str = processed_path, pack_folder: str = packed_path):
+    """
+    Compile all processed airfoil files into a single binary pack: one flat array with the coordinates of all
+    airfoils, plus an index with the offset and length of every airfoil in that array.
+    :param processed_folder: folder containing the processed .txt files
+    :param pack_folder: folder to write the pack to
+    :return: the index of the pack
+    """
+
+    names = sorted(file[:-4] for file in os.listdir(processed_folder) if file.endswith('.txt'))
+    coordinates = [read_processed_file(os.path.join(processed_folder, name + '.txt')) for name in names]
+
+    return write_pack(dict(zip(names, coordinates)), pack_folder)
+
+
+def write_pack(airfoils: dict, pack_folder: str = packed_path):
+    """
+    Write a dictionary of coordinate arrays to a binary pack.
+    :param airfoils: dictionary with airfoil names as keys and (n, 2) coordinate arrays as values
+    :param pack_folder: folder to write the pack to
+    :return: the index of the pack
+    """
+
+    os.makedirs(pack_folder, exist_ok=True)
+
+    lengths = np.array([len(coordinates) for coordinates in airfoils.values()], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+
+    data = np.concatenate([np.asarray(c, dtype=PACK_DTYPE).reshape(-1, 2) for c in airfoils.values()]) \
+        if airfoils else np.zeros((0, 2), dtype=PACK_DTYPE)
+
+    index = {
+        'dtype': PACK_DTYPE,
+        'shape': list(data.shape),
+        'airfoils': {name: [int(offset), int(length)] for name, offset, length in zip(airfoils, offsets, lengths)}
+    }
+
+    digest = hashlib.sha256(data.tobytes()).hexdigest()
+    data_file = f"{PACK_DATA_PREFIX}{digest[:16]}.bin"
+
+    index['data'] = data_file
+    index['nbytes'] = int(data.nbytes)
+    index['sha256'] = digest
+
+    previous = _pack_data_file(pack_folder)
+
+    # The data is written to a new file, which no index points to yet. Replacing the index is then the only step
+    # that changes the pack, so readers either see the previous pack or the new one, never a mix of both.
+    if not os.path.isfile(os.path.join(pack_folder, data_file)):
+        data.tofile(os.path.join(pack_folder, data_file + '.tmp'))
+        os.replace(os.path.join(pack_folder, data_file + '.tmp'), os.path.join(pack_folder, data_file))
+
+    with open(os.path.join(pack_folder, PACK_INDEX + '.tmp'), 'w') as file:
+        json.dump(index, file)
+    os.replace(os.path.join(pack_folder, PACK_INDEX + '.tmp'), os.path.join(pack_folder, PACK_INDEX))
+
+    # Data of the previous pack is kept for readers which read its index just before it was replaced, anything
+    # older is removed. Files that are still memory-mapped elsewhere cannot be removed on every platform.
+    for file in os.listdir(pack_folder):
+        if (file.startswith(PACK_DATA_PREFIX) and file.endswith('.bin') or file == PACK_DATA) and \
+                file not in (data_file, previous):
+            try:
+                os.remove(os.path.join(pack_folder, file))
+
+            except OSError:
+                pass
+
+    return index
+
+
+def _pack_data_file(pack_folder: str):
+    """
+    Name of the data file the current index of a pack points to, None if there is no pack.
+    """
+
+    if not os.path.isfile(os.path.join(pack_folder, PACK_INDEX)):
+        return None
+
+    with open(os.path.join(pack_folder, PACK_INDEX), 'r') as file:
+        return json.load(file).get('data', PACK_DATA)
+
+
+class AirfoilPack(object):
+
+    def __init__(self, pack_folder: str = packed_path):
+
+        with open(os.path.join(pack_folder, PACK_INDEX), 'r') as file:
+            index = json.load(file)
+
+        self.__index = index['airfoils']
+        self.__shape = tuple(index['shape'])
+
+        # Packs written before the data files were named after their contents use a fixed name
+        data_file = os.path.join(pack_folder, index.get('data', PACK_DATA))
+        nbytes = index.get('nbytes', int(np.prod(self.__shape))*np.dtype(index['dtype']).itemsize)
+
+        if not os.path.isfile(data_file) or os.path.getsize(data_file) != nbytes:
+            raise ValueError(f"The data of the airfoil pack in {pack_folder} does not match its index, rebuild the pack")
+
+        # np.memmap cannot map an empty file
+        if self.__shape[0] > 0:
+            self.__data = np.memmap(data_file, dtype=index['dtype'], mode='r', shape=self.__shape)
+
+        else:
+            self.__data = np.zeros(self.__shape, dtype=index['dtype'])
+
+    def __contains__(self, name: str):
+        return name in self.__index
+
+    def __len__(self):
+        return len(self.__index)
+
+    def __getitem__(self, name: str):
+        """
+        Coordinates of an airfoil as a read-only (n, 2) view into the pack, nothing is copied or parsed.
+        """
+
+        offset, length = self.__index[name]
+
+        return self.__data[offset:offset + length]
+
+    def names(self):
+        return list(self.__index.keys())
+
+    def get_array(self):
+        return self.__data
+
+
+_packs = {}
+
+
+def get_pack(pack_folder: str = packed_path) -> Union[AirfoilPack, None]:
+    """
+    Open the pack in the given folder. Packs are opened once per process and shared afterwards.
+    :return: the pack, or None if it has not been built
+    """
+
+    if pack_folder not in _packs:
+
+        if not os.path.isfile(os.path.join(pack_folder, PACK_INDEX)):
+            return None
+
+        _packs[pack_folder] = AirfoilPack(pack_folder)
+
+    return _packs[pack_folder]
+
+
+def reset_packs():
+    """
+    Forget all opened packs, for example after rebuilding them.
+    """
+    _packs.clear()
+
+
+class AirfoilRegistry(object):
+
+    def __init__(self, processed_folder: str = processed_path, pack_folder: str = packed_path):
+        """
+        Registry of the airfoils available in the database. Nothing is read until the names are first needed,
+        after which they are cached until the registry is invalidated.
+        :param processed_folder: folder containing the processed .txt files
+        :param pack_folder: folder containing the binary pack, which is preferred over the processed folder
+        """
+
+        self.processed_folder = processed_folder
+        self.pack_folder = pack_folder
+        self.__names = None
+
+        # Functions called on invalidation, so caches derived from the database are dropped as well
+        self.__listeners = []
+
+    def __contains__(self, name: str):
+        return name in self.__get_names()
+
+    def __iter__(self):
+        return iter(self.__get_names())
+
+    def __len__(self):
+        return len(self.__get_names())
+
+    def __get_names(self):
+
+        if self.__names is None:
+            pack = get_pack(self.pack_folder)
+
+            if pack is not None:
+                self.__names = dict.fromkeys(pack.names())
+
+            else:
+                self.__names = dict.fromkeys(sorted(file.split('.')[0] for file in os.listdir(self.processed_folder)))
+
+        return self.__names
+
+    def names(self):
+        return list(self.__get_names())
+
+    def path(self, name: str):
+        """
+        Path of the processed file of an airfoil.
+        """
+        return os.path.join(self.processed_folder, f"{name}.txt")
+
+    def query(self, **ranges):
+        """
+        Names of the airfoils whose geometric properties fall within the given ranges, for example
+        query(thickness=(0.12, 0.15), camber=(None, 0.02), te_thickness=(None, 0.003)).
+        See AirfoilProperties.PropertyIndex.mask for the details.
+        """
+
+        # Imported here, the property index itself depends on this module
+        from backend.AirfoilProperties import get_property_index
+
+        return [name for name in get_property_index().query(**ranges) if name in self]
+
+    def subscribe(self, callback: callable):
+        """
+        Register a function to be called without arguments whenever the registry is invalidated.
+        """
+        self.__listeners.append(callback)
+
+    def invalidate(self):
+        """
+        Forget the cached names and opened packs, so the next lookup sees the current state of the database.
+        """
+
+        self.__names = None
+        _packs.pop(self.pack_folder, None)
+
+        for callback in self.__listeners:
+            callback()
+
+
+REGISTRY = AirfoilRegistry()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Compile the processed airfoil files into a binary pack")
+    parser.add_argument('--processed', default=processed_path, help="folder containing the processed .txt files")
+    parser.add_argument('--output', default=packed_path, help="folder to write the pack to")
+    args = parser.parse_args()
+
+    index = build_pack(args.processed, args.output)
+    print(f"Packed {len(index['airfoils'])} airfoils ({index['shape'][0]} points) into {args.output}")
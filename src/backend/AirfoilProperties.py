@@ -0,0 +1,267 @@
+import numpy as np
+import os
+from backend.AirfoilDatabase import REGISTRY, get_pack, packed_path, read_processed_file
+
+
+properties_path = os.path.join(packed_path, 'properties.npz')
+
+# Stored with the table, bump it whenever the properties are calculated differently so they are calculated again
+PROPERTY_VERSION = 3
+
+# One record per airfoil, all lengths as fractions of the chord and angles in degrees
+PROPERTY_DTYPE = np.dtype([
+    ('name', 'U48'),
+    ('thickness', '<f8'),       # maximum thickness
+    ('thickness_x', '<f8'),     # chordwise position of the maximum thickness
+    ('camber', '<f8'),          # maximum camber, negative for airfoils cambered downwards
+    ('camber_x', '<f8'),        # chordwise position of the maximum camber
+    ('le_radius', '<f8'),       # leading edge radius
+    ('te_thickness', '<f8'),    # distance between the upper and lower trailing edge points
+    ('te_angle', '<f8'),        # angle between the upper and lower surface over the last 5% of the chord
+    ('area', '<f8'),            # enclosed cross-sectional area, as a fraction of the chord squared
+    ('perimeter', '<f8'),       # length of the contour from trailing edge to trailing edge
+])
+
+PROPERTIES = PROPERTY_DTYPE.names[1:]
+
+# Chordwise stations at which the surfaces are compared, clustered towards both edges
+GRID = 0.5*(1 - np.cos(np.linspace(0, np.pi, 201)))
+
+# Points within this fraction of the chord from the leading edge are used to fit the leading edge curvature
+LE_FIT_REGION = 0.01
+
+# Steps against the chordwise direction of a surface up to this fraction of the chord are accepted as noise
+SWEEP_TOLERANCE = 0.01
+
+# Both ends of a contour have to lie this far aft, as a fraction of the chord, to be an airfoil
+TE_REGION = 0.9
+
+# Trailing edge properties are only calculated if both ends lie within this fraction of the chord from the
+# trailing edge
+TE_TOLERANCE = 0.01
+
+
+def _leading_edge_radius(x: np.ndarray, z: np.ndarray, le: int):
+    """
+    Radius of curvature at the leading edge, from a polynomial x(z) fitted through the points close to it.
+    Near the leading edge x = z^2/(2r) + ..., so the radius follows from the quadratic coefficient.
+    """
+
+    near = np.flatnonzero(x <= LE_FIT_REGION)
+    if near.size < 5:
+        near = np.argsort(x, kind='stable')[:5]
+
+    # Coarse tables only support a parabola
+    coefficients = np.polyfit(z[near] - z[le], x[near], 4 if near.size >= 7 else 2)
+
+    return 1/(2*coefficients[-3]) if coefficients[-3] > 0 else 0.0
+
+
+def plausible(x: np.ndarray, le: int):
+    """
+    Whether the x-coordinates of a contour, scaled to unit chord, describe an airfoil: a single sweep from the
+    trailing edge to the leading edge and back, which starts and ends near the trailing edge. This rules out
+    partial contours, such as a single surface or one element of a multi-element airfoil, and tables which were
+    converted incorrectly.
+    """
+
+    return bool(np.all(np.diff(x[:le + 1]) <= SWEEP_TOLERANCE) and np.all(np.diff(x[le:]) >= -SWEEP_TOLERANCE)
+                and min(x[0], x[-1]) >= TE_REGION)
+
+
+def airfoil_properties(coordinates: np.ndarray):
+    """
+    Geometric properties of an airfoil.
+    :param coordinates: (n, 2) array ordered from the trailing edge over the upper surface to the leading edge and
+                        back over the lower surface, as stored in the database
+    :return: dictionary with a value for every name in PROPERTIES. All values are NaN for airfoils with too few
+             points or implausible coordinates (see plausible), so they drop out of range queries. The trailing edge
+             properties are NaN if the contour does not reach the trailing edge on both surfaces.
+    """
+
+    coordinates = np.asarray(coordinates, dtype=float)
+
+    if len(coordinates) < 5:
+        return dict.fromkeys(PROPERTIES, np.nan)
+
+    # Scale to unit chord, with the leading edge at x = 0
+    le = int(np.argmin(coordinates[:, 0]))
+    chord = coordinates[:, 0].max() - coordinates[le, 0]
+    x = (coordinates[:, 0] - coordinates[le, 0])/chord
+    z = coordinates[:, 1]/chord
+
+    if not plausible(x, le):
+        return dict.fromkeys(PROPERTIES, np.nan)
+
+    def surface(points: slice):
+        order = np.argsort(x[points], kind='stable')
+        return x[points][order], z[points][order]
+
+    upper, lower = surface(slice(0, le + 1)), surface(slice(le, None))
+
+    zu = np.interp(GRID, *upper)
+    zl = np.interp(GRID, *lower)
+
+    if np.mean(zu - zl) < 0:
+        upper, lower, zu, zl = lower, upper, zl, zu
+
+    thickness = zu - zl
+    camber = (zu + zl)/2
+
+    i = int(np.argmax(thickness))
+    j = int(np.argmax(np.abs(camber)))
+
+    # Slopes of both surfaces over the last 5% of the chord
+    zu_te, zl_te = np.interp([0.95, 1.0], *upper), np.interp([0.95, 1.0], *lower)
+    te_angle = np.degrees(np.arctan((zu_te[0] - zu_te[1])/0.05) - np.arctan((zl_te[0] - zl_te[1])/0.05))
+
+    if min(x[0], x[-1]) < 1 - TE_TOLERANCE:
+        te_angle = np.nan
+
+    segments = np.diff(np.stack((x, z), axis=-1), axis=0)
+
+    return {
+        'thickness': thickness[i],
+        'thickness_x': GRID[i],
+        'camber': camber[j],
+        'camber_x': GRID[j],
+        'le_radius': _leading_edge_radius(x, z, le),
+        'te_thickness': np.hypot(x[0] - x[-1], z[0] - z[-1]) if np.isfinite(te_angle) else np.nan,
+        'te_angle': te_angle,
+        'area': 0.5*abs(np.sum(x*np.roll(z, -1) - np.roll(x, -1)*z)),
+        'perimeter': np.sum(np.hypot(segments[:, 0], segments[:, 1])),
+    }
+
+
+def property_table(airfoils: dict):
+    """
+    Structured array with the properties of a set of airfoils, sorted by name.
+    :param airfoils: dictionary with airfoil names as keys and (n, 2) coordinate arrays as values
+    """
+
+    table = np.zeros(len(airfoils), dtype=PROPERTY_DTYPE)
+
+    for row, name in zip(table, sorted(airfoils)):
+        row['name'] = name
+
+        for key, value in airfoil_properties(airfoils[name]).items():
+            row[key] = value
+
+    return table
+
+
+def update_property_index(names: list, load: callable, changed: set, target: str = properties_path):
+    """
+    Rebuild the property index. Rows of airfoils which did not change are taken from the current index.
+    Has the signature of the index builders in AirfoilConverter.INDEX_BUILDERS.
+    :param names: names of all airfoils in the database
+    :param load: function returning the (n, 2) coordinates of an airfoil from its name
+    :param changed: names of the airfoils whose coordinates changed since the index was written
+    :param target: path of the index file
+    """
+
+    current = {}
+    if os.path.isfile(target):
+        with np.load(target) as data:
+            if 'version' in data and data['version'] == PROPERTY_VERSION:
+                current = {str(row['name']): row for row in data['table']}
+
+    names = sorted(names)
+    table = property_table({name: load(name) for name in names if name in changed or name not in current})
+
+    rows = {str(row['name']): row for row in table}
+    rows.update({name: current[name] for name in names if name not in rows})
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    temporary = target + '.tmp'
+    with open(temporary, 'wb') as file:
+        np.savez(file, version=PROPERTY_VERSION, table=np.array([rows[name] for name in names], dtype=PROPERTY_DTYPE))
+
+    os.replace(temporary, target)
+
+    _indexes.pop(target, None)
+
+
+class PropertyIndex(object):
+
+    def __init__(self, table: np.ndarray):
+        """
+        Geometric properties of all airfoils in the database, with range queries over them.
+        :param table: structured array with PROPERTY_DTYPE
+        """
+
+        self.table = table
+        self.__rows = {name: idx for idx, name in enumerate(table['name'].tolist())}
+
+    def __contains__(self, name: str):
+        return name in self.__rows
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, name: str):
+        """
+        Properties of a single airfoil as a dictionary.
+        """
+
+        row = self.table[self.__rows[name]]
+
+        return {key: float(row[key]) for key in PROPERTIES}
+
+    def mask(self, **ranges):
+        """
+        Boolean mask of the airfoils whose properties fall within the given ranges.
+        :param ranges: property names with (minimum, maximum) tuples, either bound may be None for an open range.
+                       Example: mask(thickness=(0.12, 0.15), camber=(None, 0.02), te_thickness=(None, 0.003))
+        """
+
+        mask = np.ones(len(self.table), dtype=bool)
+
+        for key, (minimum, maximum) in ranges.items():
+            if key not in PROPERTIES:
+                raise ValueError(f"Unknown property '{key}', choose from {list(PROPERTIES)}")
+
+            if minimum is not None:
+                mask &= self.table[key] >= minimum
+
+            if maximum is not None:
+                mask &= self.table[key] <= maximum
+
+        return mask
+
+    def query(self, **ranges):
+        """
+        Names of the airfoils whose properties fall within the given ranges, see mask().
+        """
+        return self.table['name'][self.mask(**ranges)].tolist()
+
+
+_indexes = {}
+REGISTRY.subscribe(_indexes.clear)
+
+
+def get_property_index(path: str = properties_path):
+    """
+    Open the property index. If it has not been built, or was built by another version of airfoil_properties, it is
+    calculated from the airfoil database instead, which takes a moment. Indexes are opened once per process and shared afterwards.
+    """
+
+    if path not in _indexes:
+
+        table = None
+        if os.path.isfile(path):
+            with np.load(path) as data:
+                if 'version' in data and data['version'] == PROPERTY_VERSION:
+                    table = data['table']
+
+        if table is None:
+            pack = get_pack()
+            load = (lambda name: pack[name]) if pack is not None else \
+                (lambda name: read_processed_file(REGISTRY.path(name)))
+
+            table = property_table({name: load(name) for name in REGISTRY.names()})
+
+        _indexes[path] = PropertyIndex(table)
+
+    return _indexes[path]
@@ -0,0 +1,342 @@
+import numpy as np
+import os
+from typing import Union
+from backend.AirfoilDatabase import REGISTRY, get_pack, packed_path, read_processed_file
+from backend.AirFoilTool import SECTION_CACHE, AirFoil, LoadedAirfoil, NACAFoil, naca_family
+from backend.SplineTool import RESAMPLER, split_surfaces
+
+
+shapes_path = os.path.join(packed_path, 'shapes.npz')
+
+# Chordwise stations at which both surfaces are sampled, every airfoil becomes a vector of 2*len(SHAPE_GRID) values
+SHAPE_GRID = 0.5*(1 - np.cos(np.linspace(0, np.pi, 65)))
+
+# Number of points per surface when an airfoil has to be resampled through the section cache first
+SECTION_SAMPLES = 100
+
+# Stored with the shape vectors, bump it whenever shape_vector changes so stored vectors are calculated again
+SHAPE_VERSION = 3
+
+# Dimension of the embedding the nearest neighbours are searched in
+N_COMPONENTS = 12
+
+# Analytic airfoils added to the catalog: 4-digit sections with 0-7% camber at 20-70% chord, and the 5-digit
+# 210-250 series, all from 6 to 24% thickness
+NACA_CODES = tuple(
+    [f"00{t:02d}" for t in range(6, 25)] +
+    [f"{m}{p}{t:02d}" for m in range(1, 8) for p in range(2, 8) for t in range(6, 25)] +
+    [f"{series}{t:02d}" for series in range(210, 251, 10) for t in range(6, 25)]
+)
+
+
+def leading_edge(coordinates: np.ndarray):
+    """
+    Leading edge of an airfoil: the point of the contour furthest from the middle of the trailing edge, as in
+    MetricsTool. The maximum is refined with a parabola through the three points around it, so the leading edge
+    does not depend on how the contour is sampled, e.g. on whether a point lies exactly on the leading edge.
+    :param coordinates: (n, 2) array ordered from the trailing edge over one surface to the leading edge and back
+                        over the other surface. Repeated points next to the leading edge disable the refinement.
+    :return: index of the point the leading edge lies on or after, the fraction of the way to the next point
+             and the (x, z) coordinates of the leading edge
+    """
+
+    x, z = coordinates[:, 0], coordinates[:, 1]
+    distance = (x - (x[0] + x[-1])/2)**2 + (z - (z[0] + z[-1])/2)**2
+
+    idx = int(np.clip(np.argmax(distance), 1, len(x) - 2))
+    segments = np.hypot(np.diff(x[idx - 1:idx + 2]), np.diff(z[idx - 1:idx + 2]))
+
+    if not np.all(segments > 0):
+        return idx, 0.0, coordinates[idx]
+
+    # Parabola through the squared distances, over the length along the contour
+    s = np.array([-segments[0], 0, segments[1]])
+    a, b, _ = np.polyfit(s, distance[idx - 1:idx + 2], 2)
+    s_le = float(np.clip(-b/(2*a), s[0], s[2])) if a < 0 else 0.0
+
+    if s_le < 0:
+        idx, fraction = idx - 1, 1 + s_le/segments[0]
+    else:
+        fraction = s_le/segments[1]
+
+    return idx, fraction, coordinates[idx] + fraction*(coordinates[idx + 1] - coordinates[idx])
+
+
+def shape_vector(coordinates: np.ndarray, k: int = 3, s: int = 0):
+    """
+    Sample the upper and lower surface of an airfoil at SHAPE_GRID, after moving its leading edge to the origin
+    and scaling it to unit chord. The surfaces are the splines a Wing resamples the airfoil with: they are split at
+    the turning point and fitted through RESAMPLER, so the fits are shared with SECTION_CACHE and resample_airfoils.
+    Between the leading edge and the first point of a surface the contour is closed with a straight line.
+    :param coordinates: (n, 2) array ordered from the trailing edge over one surface to the leading edge and back
+                        over the other surface
+    :param k: spline order
+    :param s: spline smoothing factor
+    :return: array with the z-coordinates of the upper surface followed by those of the lower surface
+    """
+
+    # Only imported when needed, like scipy.interpolate in AirFoilTool
+    from scipy.interpolate import BSpline
+
+    coordinates = np.asarray(coordinates, dtype=float)
+
+    # Repeated points, like the leading edge of the analytic airfoils which is on both surfaces
+    coordinates = coordinates[np.r_[True, np.any(np.diff(coordinates, axis=0) != 0, axis=1)]]
+
+    _, _, le = leading_edge(coordinates)
+    chord = (coordinates[0, 0] + coordinates[-1, 0])/2 - le[0]
+    x = le[0] + chord*SHAPE_GRID
+
+    def surface(xs: np.ndarray, zs: np.ndarray):
+        # The basis matrices are not cached, every airfoil has its own knots and is evaluated on the grid once.
+        # The trailing edge points need not lie at the same x, so the splines are extrapolated up to there.
+        z = BSpline(*RESAMPLER.fit(xs, zs, k=k, s=s), k)(x)
+
+        before = x < xs[0]
+        z[before] = le[1] + (x[before] - le[0])/(xs[0] - le[0])*(zs[0] - le[1])
+
+        return (z - le[1])/chord
+
+    zu, zl = [surface(*points) for points in split_surfaces(coordinates[:, 0], coordinates[:, 1])]
+
+    if not (np.all(np.isfinite(zu)) and np.all(np.isfinite(zl))):
+        raise ValueError("Could not fit splines through the airfoil surfaces, check for repeated x-coordinates")
+
+    if np.mean(zu - zl) < 0:
+        zu, zl = zl, zu
+
+    return np.concatenate((zu, zl))
+
+
+def shape_matrix(airfoils: dict):
+    """
+    Shape vectors of a set of airfoils. Airfoils whose coordinates cannot be fitted are left out, as in
+    resample_airfoils, since they cannot be used in a Wing either.
+    :param airfoils: dictionary with airfoil names as keys and (n, 2) coordinate arrays as values
+    :return: sorted list of names and an array with the shape vector of every airfoil as rows
+    """
+
+    names, shapes = [], []
+
+    for name in sorted(airfoils):
+        try:
+            shapes.append(shape_vector(airfoils[name]))
+
+        except (ValueError, TypeError):
+            continue
+
+        names.append(name)
+
+    return names, np.array(shapes).reshape(len(names), 2*len(SHAPE_GRID))
+
+
+def naca_shapes(codes: Union[list, tuple] = NACA_CODES):
+    """
+    Shape vectors of analytic NACA airfoils, named like the database airfoils ('naca2412').
+    """
+
+    coordinates = naca_family(list(codes), n=SECTION_SAMPLES, cosine_spacing=True)
+
+    return [f"naca{code}" for code in codes], np.array([shape_vector(airfoil) for airfoil in coordinates])
+
+
+def update_shape_index(names: list, load: callable, changed: set, target: str = shapes_path):
+    """
+    Rebuild the stored shape vectors of the database airfoils. Vectors of airfoils which did not change are taken
+    from the current file, airfoils whose coordinates cannot be fitted are left out. Has the signature of the index builders in AirfoilConverter.INDEX_BUILDERS.
+    :param names: names of all airfoils in the database
+    :param load: function returning the (n, 2) coordinates of an airfoil from its name
+    :param changed: names of the airfoils whose coordinates changed since the index was written
+    :param target: path of the index file
+    """
+
+    current = {}
+    if os.path.isfile(target):
+        with np.load(target) as data:
+            if 'version' in data and data['version'] == SHAPE_VERSION:
+                current = dict(zip(data['names'].tolist(), data['shapes']))
+
+    new_names, new_shapes = shape_matrix({name: load(name) for name in names if name in changed or name not in current})
+
+    vectors = {name: current[name] for name in names if name in current and name not in changed}
+    vectors.update(zip(new_names, new_shapes))
+
+    # Airfoils that cannot be fitted are left out
+    names = sorted(name for name in names if name in vectors)
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    temporary = target + '.tmp'
+    with open(temporary, 'wb') as file:
+        np.savez(file, version=SHAPE_VERSION, names=np.array(names), shapes=np.array([vectors[name] for name in names]).reshape(len(names), -1))
+
+    os.replace(temporary, target)
+
+    for key in [key for key in _indexes if key[0] == target]:
+        del _indexes[key]
+
+
+class ShapeIndex(object):
+
+    def __init__(self, names: list, shapes: np.ndarray, n_components: int = N_COMPONENTS):
+        """
+        Nearest-neighbour search over airfoil shapes. The shape vectors are reduced with a principal component
+        analysis and the reduced vectors are stored in a KD-tree.
+        :param names: names of the airfoils
+        :param shapes: array with the shape vector of every airfoil as rows
+        :param n_components: number of principal components to keep
+        """
+
+        # Only imported when needed, like scipy.interpolate in AirFoilTool
+        from scipy.spatial import cKDTree
+
+        self.names = list(names)
+        self.shapes = np.asarray(shapes, dtype=float)
+        # Names are matched without regard to case and spaces, like the keys of SECTION_CACHE
+        self.__rows = {self.__key(name): idx for idx, name in enumerate(self.names)}
+
+        self.mean = self.shapes.mean(axis=0)
+        _, singular_values, vt = np.linalg.svd(self.shapes - self.mean, full_matrices=False)
+
+        n_components = min(n_components, len(singular_values))
+        self.components = vt[:n_components]
+
+        variance = singular_values**2
+        self.explained_variance = variance[:n_components].sum()/variance.sum()
+
+        self.embedding = self.embed(self.shapes)
+        self.tree = cKDTree(self.embedding)
+
+    def __contains__(self, name: str):
+        return self.__key(name) in self.__rows
+
+    def __len__(self):
+        return len(self.names)
+
+    def embed(self, shapes: np.ndarray):
+        """
+        Project shape vectors onto the principal components.
+        """
+        return (shapes - self.mean) @ self.components.T
+
+    @staticmethod
+    def __key(name: str):
+        return name.lower().replace(' ', '')
+
+    @staticmethod
+    def __name(airfoil: Union[str, int, AirFoil, np.ndarray]):
+        """
+        Catalog name of an airfoil given by name, NACA code or as airfoil object without loaded coordinates,
+        None otherwise. NACA codes ('2412', 23012) are named like the catalog entries ('naca2412', 'naca23012').
+        """
+
+        if isinstance(airfoil, (int, np.integer)) and not isinstance(airfoil, bool):
+            if not 0 <= airfoil < 100000:
+                raise ValueError(f"{airfoil} is not a 4 or 5 digit NACA code")
+            airfoil = f"{int(airfoil):04d}"
+
+        if isinstance(airfoil, str):
+            code = airfoil.strip()
+            return f"naca{code}" if len(code) in (4, 5) and code.isdigit() else airfoil
+
+        if isinstance(airfoil, AirFoil) and airfoil.coordinates is None:
+
+            if isinstance(airfoil, LoadedAirfoil):
+                return airfoil.code
+
+            if isinstance(airfoil, NACAFoil):
+                return f"naca{airfoil.code}"
+
+        return None
+
+    def shape(self, airfoil: Union[str, int, AirFoil, np.ndarray]):
+        """
+        Shape vector of an airfoil given by name, NACA code, as airfoil object or as (n, 2) coordinate array.
+        Airfoil objects with loaded coordinates are taken as they are, named airfoils outside the catalog are
+        resampled through SECTION_CACHE.
+        """
+
+        name = self.__name(airfoil)
+
+        if name is not None and name in self:
+            return self.shapes[self.__rows[self.__key(name)]]
+
+        if name is not None:
+            section = SECTION_CACHE.get(name, SECTION_SAMPLES, cosine_spacing=True)
+            airfoil = np.stack((section['x'], section['z']), axis=-1)
+
+        elif isinstance(airfoil, AirFoil):
+            airfoil = np.stack((airfoil.coordinates['x'], airfoil.coordinates['z']), axis=-1)
+
+        airfoil = np.asarray(airfoil)
+        if airfoil.ndim != 2 or airfoil.shape[1] != 2:
+            raise ValueError(f"Expected an (n, 2) coordinate array, got shape {airfoil.shape} instead")
+
+        return shape_vector(airfoil)
+
+    def query(self, airfoil: Union[str, int, AirFoil, np.ndarray], k: int = 5):
+        """
+        Airfoils most similar in shape to the given one. An airfoil given by name or NACA code is left out of its own
+        results.
+        :param airfoil: name, NACA code ('2412' or 2412), airfoil object or (n, 2) coordinate array
+        :param k: number of airfoils to return
+        :return: list of (name, distance) tuples, closest first. The distance is the root mean square difference
+                 of the sampled z-coordinates, as a fraction of the chord, within the reduced space.
+        """
+
+        vector = self.shape(airfoil)
+        name = self.__name(airfoil)
+        exclude = self.__rows.get(self.__key(name)) if name is not None else None
+
+        distances, rows = self.tree.query(self.embed(vector), k=min(k + (exclude is not None), len(self.names)))
+        distances = np.atleast_1d(distances)/np.sqrt(vector.size)
+
+        return [(self.names[row], float(distance)) for distance, row in zip(distances, np.atleast_1d(rows))
+                if row != exclude][:k]
+
+
+_indexes = {}
+REGISTRY.subscribe(_indexes.clear)
+
+
+def get_shape_index(path: str = shapes_path, naca_codes: Union[list, tuple] = NACA_CODES):
+    """
+    Open the shape index of the database airfoils together with the given analytic NACA airfoils. If the shape
+    vectors have not been stored, or were stored by another version of shape_vector, they are calculated from the airfoil database instead, which takes a moment.
+    Indexes are built once per process and shared afterwards.
+    Database airfoils named like an analytic NACA airfoil are replaced by it, as in create_airfoil.
+    """
+
+    key = (path, tuple(naca_codes))
+
+    if key not in _indexes:
+
+        names = None
+        if os.path.isfile(path):
+            with np.load(path) as data:
+                if 'version' in data and data['version'] == SHAPE_VERSION:
+                    names, shapes = data['names'].tolist(), data['shapes']
+
+        if names is None:
+            pack = get_pack()
+            load = (lambda name: pack[name]) if pack is not None else \
+                (lambda name: read_processed_file(REGISTRY.path(name)))
+
+            names, shapes = shape_matrix({name: load(name) for name in REGISTRY.names()})
+
+        naca_names, naca_vectors = naca_shapes(naca_codes) if naca_codes else ([], np.empty((0, shapes.shape[1])))
+
+        replaced = set(naca_names)
+        keep = [row for row, name in enumerate(names) if name not in replaced]
+
+        _indexes[key] = ShapeIndex([names[row] for row in keep] + naca_names,
+                                   np.concatenate((shapes[keep], naca_vectors)))
+
+    return _indexes[key]
+
+
+def similar_airfoils(airfoil: Union[str, int, AirFoil, np.ndarray], k: int = 5):
+    """
+    Airfoils from the database and the NACA catalog most similar in shape to the given one, see ShapeIndex.query.
+    """
+    return get_shape_index().query(airfoil, k=k)
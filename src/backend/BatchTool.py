@@ -0,0 +1,144 @@
+import numpy as np
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+from backend.MetricsTool import wing_metrics
+from backend.WingTool import Wing
+
+
+def _construct_chunk(task: tuple):
+    """
+    Worker function: construct a chunk of wings and write their coordinates straight into the shared memory block.
+    :param task: tuple of (shared memory name, array shape, dtype, index of the first wing, list of wings)
+    :return: tuple of (process id, number of wings constructed, seconds spent)
+    """
+
+    name, shape, dtype, start, wings = task
+
+    start_time = time.perf_counter()
+
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        coordinates = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+        for idx, wing in enumerate(wings, start):
+            wing.construct()
+            sections = wing.data_container.get_sections()
+
+            if sections.shape != shape[1:]:
+                raise ValueError(f"Wing {idx} has shape {sections.shape}, expected {shape[1:]} like the first wing")
+
+            coordinates[idx] = sections
+
+        del coordinates
+
+    finally:
+        block.close()
+
+    return os.getpid(), len(wings), time.perf_counter() - start_time
+
+
+class WingBatch(object):
+
+    def __init__(self, block: shared_memory.SharedMemory, shape: tuple, dtype, throughput: dict):
+        """
+        Coordinates of a batch of wings, stored in a shared memory block of shape (n_wings, n_span, n_points, 3).
+        The block is released by close(), or when the batch is used as a context manager and the block ends.
+        :param block: shared memory block holding the coordinates
+        :param shape: shape of the coordinate array
+        :param dtype: data type of the coordinate array
+        :param throughput: per-worker statistics, keyed by process id
+        """
+
+        self.__block = block
+        self.coordinates = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        self.throughput = throughput
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.coordinates.shape[0]
+
+    def name(self):
+        """
+        Name of the shared memory block, for attaching to it from other processes.
+        """
+        return self.__block.name
+
+    def metrics(self, method: str = 'simpson'):
+        """
+        Geometric integrals of all wings in the batch in one call, see MetricsTool.wing_metrics.
+        :return: dictionary of arrays with one value per wing
+        """
+        return wing_metrics(self.coordinates, method)
+
+    def close(self):
+        """
+        Release the shared memory block. Copy the coordinates first if they are needed afterwards.
+        """
+
+        if self.__block is not None:
+            self.coordinates = None
+            self.__block.close()
+            self.__block.unlink()
+            self.__block = None
+
+
+def construct_wings(wings: list, processes: int = None, chunksize: int = None):
+    """
+    Construct many wings in parallel. All wings need the same number of span stations and airfoil points.
+    Wings of different floating point types are stored in the widest of them.
+    The coordinates are written by the workers into a single shared memory block, so large arrays are never pickled.
+    :param wings: list of configured Wing objects
+    :param processes: number of worker processes, defaults to the number of CPUs. With 1, no pool is started.
+    :param chunksize: number of wings sent to a worker at a time, defaults to an even split in 4 chunks per worker
+    :return: WingBatch holding the coordinates and the per-worker throughput
+    """
+
+    if not wings:
+        raise ValueError("Expected at least one wing")
+
+    for wing in wings:
+        if not isinstance(wing, Wing):
+            raise TypeError(f"Expected Wing objects, got {type(wing)} instead")
+
+    processes = os.cpu_count() if processes is None else processes
+    chunksize = max(1, -(-len(wings) // (4*processes))) if chunksize is None else chunksize
+
+    # The first wing sets the shape of the batch. The floating point type is the one all wings fit in, like the
+    # storage of a single wing at least single precision, so mixing single and double precision wings loses nothing.
+    shape = (len(wings),) + wings[0].compile().get_shape()
+    dtype = np.result_type(np.float32, *[wing.dtype for wing in wings])
+    block = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape))*dtype.itemsize))
+
+    tasks = [(block.name, shape, dtype.str, start, wings[start:start + chunksize])
+             for start in range(0, len(wings), chunksize)]
+
+    try:
+        if processes == 1:
+            results = [_construct_chunk(task) for task in tasks]
+
+        else:
+            with mp.Pool(processes) as pool:
+                results = list(pool.imap_unordered(_construct_chunk, tasks))
+
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+
+    throughput = {}
+    for pid, count, seconds in results:
+        stats = throughput.setdefault(pid, {'wings': 0, 'seconds': 0.0})
+        stats['wings'] += count
+        stats['seconds'] += seconds
+
+    for stats in throughput.values():
+        stats['wings_per_second'] = stats['wings']/stats['seconds'] if stats['seconds'] > 0 else float('inf')
+
+    return WingBatch(block, shape, dtype, throughput)
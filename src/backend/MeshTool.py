@@ -0,0 +1,271 @@
+import numpy as np
+import shutil
+import tempfile
+from typing import Iterable, Union
+
+
+STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+PLY_FACE = np.dtype([('count', 'u1'), ('indices', '<i4', (3,))])
+
+# Counts in the PLY header are written as fixed-width fields, so they can be filled in once the mesh is written
+PLY_COUNT_WIDTH = 12
+
+# Neighbouring section points closer than this fraction of the section size are merged into one vertex. Single
+# precision sections use a larger tolerance, in line with their resolution.
+MERGE_TOLERANCE = 1e-9
+
+
+def _iter_chunks(sections: Union[np.ndarray, Iterable[np.ndarray]], chunk: int):
+    """
+    Split a (n_span, n_points, 3) array into blocks of stations, or pass an iterable of such blocks through.
+    """
+
+    if isinstance(sections, np.ndarray):
+        for start in range(0, sections.shape[0], chunk):
+            yield sections[start:start + chunk]
+
+    else:
+        for block in sections:
+            yield np.asarray(block)
+
+
+class SectionTopology(object):
+
+    def __init__(self, section_block: np.ndarray):
+        """
+        Connectivity of a single section ring, shared by all stations of a wing.
+        Sections run from the upper trailing edge over the leading edge to the lower trailing edge. Neighbouring
+        points which coincide at every station (the duplicated leading edge point, or the trailing edge of a
+        closed airfoil) are merged into one vertex, so the mesh has no zero-area faces along those edges.
+        :param section_block: coordinates of the first stations, shape (n_stations, n_points, 3)
+        """
+
+        n_points = section_block.shape[1]
+
+        if n_points < 3:
+            raise ValueError(f"Sections need at least 3 points to be triangulated, got {n_points}")
+
+        # Map every point of a section onto the vertex it is merged into. Points count as coinciding when they are
+        # closer than a small fraction of the section size at every station, sections of zero size are ignored.
+        size = np.ptp(section_block, axis=1).max(axis=-1)
+        relative = max(MERGE_TOLERANCE, 10*np.finfo(np.result_type(section_block, np.float32)).resolution)
+        tolerance = relative*np.where(size > 0, size, np.inf)[:, None]
+
+        def coincide(a, b):
+            return np.all(np.linalg.norm(a - b, axis=-1) <= tolerance, axis=0) & bool(np.any(size > 0))
+
+        keep = np.concatenate(([True], ~coincide(section_block[:, 1:], section_block[:, :-1])))
+        vertex = np.cumsum(keep) - 1
+        self.columns = np.flatnonzero(keep)
+
+        if self.columns.size > 1 and coincide(section_block[:, -1:], section_block[:, :1])[0]:
+            vertex[vertex == vertex[-1]] = 0
+            self.columns = self.columns[:-1]
+
+        self.n_vertices = self.columns.size
+
+        # Edges around the ring. For an open trailing edge the closing edge spans the trailing edge face.
+        ring = np.arange(self.n_vertices)
+        self.edges = np.stack((ring, np.roll(ring, -1)), axis=-1)
+
+        # Caps: a ladder of quads between matching upper and lower points, each split into two triangles
+        upper = np.arange(n_points // 2 - 1)
+        lower = n_points - 1 - upper
+        triangles = np.concatenate((np.stack((upper, upper + 1, lower - 1), axis=-1),
+                                    np.stack((upper, lower - 1, lower), axis=-1)))
+
+        if n_points % 2:
+            middle = n_points // 2
+            triangles = np.concatenate((triangles, [[middle - 1, middle, middle + 1]]))
+
+        # Triangles touching a merged point twice have collapsed and are dropped
+        triangles = vertex[triangles]
+        valid = (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & \
+                (triangles[:, 2] != triangles[:, 0])
+        self.cap = triangles[valid]
+
+        # Whether the faces have to be flipped to point outwards, which depends on the direction in which the ring
+        # runs around the x-z plane, and on the direction in which the span coordinate increases
+        x, z = section_block[0, self.columns, 0], section_block[0, self.columns, 2]
+        area = 0.5*np.sum(x*np.roll(z, -1) - np.roll(x, -1)*z)
+        span = section_block[-1, :, 1].mean() - section_block[0, :, 1].mean() if len(section_block) > 1 else 1.0
+        self.flip = bool(area*span > 0)
+
+    def side_faces(self, first_station: int, n_strips: int):
+        """
+        Triangles between consecutive stations, from first_station up to first_station + n_strips.
+        :return: vertex indices, shape (2 * n_strips * n_vertices, 3)
+        """
+
+        base = (first_station + np.arange(n_strips))[:, None]*self.n_vertices
+        a = base + self.edges[:, 0]
+        b = base + self.edges[:, 1]
+        c = b + self.n_vertices
+        d = a + self.n_vertices
+
+        faces = np.stack((np.stack((a, b, c), axis=-1), np.stack((a, c, d), axis=-1)), axis=-2).reshape(-1, 3)
+
+        return faces[:, ::-1] if self.flip else faces
+
+    def cap_faces(self, station: int, tip: bool):
+        """
+        Triangles closing the wing at a station, facing away from the rest of the wing.
+        """
+
+        faces = self.cap + station*self.n_vertices
+
+        return faces[:, ::-1] if tip == self.flip else faces
+
+
+def iter_mesh_blocks(sections: Union[np.ndarray, Iterable[np.ndarray]], chunk: int = 256):
+    """
+    Triangulate the wing surface block by block. Every block holds the vertices of a group of stations and all
+    triangles which end at those stations, so only one group of stations has to be in memory at a time.
+    The topology is derived from the first block and reused for all following blocks.
+    :param sections: (n_span, n_points, 3) array, or an iterable of (n_stations, n_points, 3) blocks in span order
+    :param chunk: number of stations per block when an array is given
+    :return: generator of (vertices, faces) tuples. Vertices have shape (n_stations, n_vertices, 3) and are numbered
+             station by station. Faces are (m, 3) arrays of global vertex indices, which may refer to the vertices
+             of the last station of the previous block.
+    """
+
+    topology = None
+    station = 0
+
+    blocks = _iter_chunks(sections, chunk)
+    block = next(blocks, None)
+
+    if block is None or len(block) == 0:
+        raise ValueError("Expected at least one span station")
+
+    while block is not None:
+
+        # One block of look-ahead, to know when to close the tip
+        following = next(blocks, None)
+
+        if topology is None:
+            topology = SectionTopology(block)
+
+        faces = []
+
+        if station == 0:
+            faces.append(topology.cap_faces(0, tip=False))
+            faces.append(topology.side_faces(0, len(block) - 1))
+
+        else:
+            faces.append(topology.side_faces(station - 1, len(block)))
+
+        if following is None:
+            faces.append(topology.cap_faces(station + len(block) - 1, tip=True))
+
+        yield block[:, topology.columns], np.concatenate(faces)
+
+        station += len(block)
+        block = following
+
+
+def triangulate(sections: Union[np.ndarray, Iterable[np.ndarray]]):
+    """
+    Indexed triangle mesh of the full wing surface, including the root and tip caps.
+    :param sections: (n_span, n_points, 3) array, or an iterable of (n_stations, n_points, 3) blocks in span order
+    :return: tuple of the vertices, shape (n, 3), and the triangles, shape (m, 3)
+    """
+
+    if isinstance(sections, np.ndarray):
+        sections = [sections]
+
+    vertices, faces = zip(*iter_mesh_blocks(sections))
+
+    return np.concatenate(vertices).reshape(-1, 3), np.concatenate(faces)
+
+
+def face_normals(triangles: np.ndarray):
+    """
+    Unit normals of triangles given by their corner coordinates, shape (m, 3, 3). Collapsed triangles get a zero normal.
+    """
+
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    length = np.linalg.norm(normals, axis=-1, keepdims=True)
+
+    return np.divide(normals, length, out=np.zeros_like(normals), where=length > 0)
+
+
+def write_stl(path: str, sections: Union[np.ndarray, Iterable[np.ndarray]], chunk: int = 256,
+              header: str = 'WingGeo binary STL'):
+    """
+    Write the wing surface to a binary STL file, one block of stations at a time.
+    :param path: file to write to
+    :param sections: (n_span, n_points, 3) array, or an iterable of (n_stations, n_points, 3) blocks in span order
+    :param chunk: number of stations per block when an array is given
+    :param header: text for the 80-byte header
+    :return: number of triangles written
+    """
+
+    n_triangles = 0
+
+    # Vertices the next block can refer to: those of the last station written, starting at global index window_start
+    window = np.zeros((0, 3))
+    window_start = 0
+
+    with open(path, 'wb') as file:
+        file.write(header.encode('ascii', 'replace')[:80].ljust(80, b' '))
+        file.write(np.uint32(0).tobytes())
+
+        for vertices, faces in iter_mesh_blocks(sections, chunk):
+            window = np.concatenate((window, vertices.reshape(-1, 3)))
+            triangles = window[faces - window_start]
+
+            records = np.zeros(len(faces), dtype=STL_RECORD)
+            records['normal'] = face_normals(triangles)
+            records['vertices'] = triangles
+            records.tofile(file)
+
+            n_triangles += len(faces)
+            window_start += len(window) - vertices.shape[1]
+            window = vertices[-1]
+
+        # The triangle count is only known at the end
+        file.seek(80)
+        file.write(np.uint32(n_triangles).tobytes())
+
+    return n_triangles
+
+
+def write_ply(path: str, sections: Union[np.ndarray, Iterable[np.ndarray]], chunk: int = 256):
+    """
+    Write the wing surface to a binary little-endian PLY file: an indexed mesh, storing every vertex once.
+    Vertices are streamed to the file directly, faces to a temporary file which is appended at the end.
+    :param path: file to write to
+    :param sections: (n_span, n_points, 3) array, or an iterable of (n_stations, n_points, 3) blocks in span order
+    :param chunk: number of stations per block when an array is given
+    :return: tuple of the number of vertices and the number of faces written
+    """
+
+    n_vertices = n_faces = 0
+
+    header = "ply\nformat binary_little_endian 1.0\ncomment WingGeo wing surface\n" \
+             "element vertex {:>{width}d}\nproperty float x\nproperty float y\nproperty float z\n" \
+             "element face {:>{width}d}\nproperty list uchar int vertex_indices\nend_header\n"
+
+    with open(path, 'wb') as file, tempfile.TemporaryFile() as face_file:
+        file.write(header.format(0, 0, width=PLY_COUNT_WIDTH).encode('ascii'))
+
+        for vertices, faces in iter_mesh_blocks(sections, chunk):
+            vertices.astype('<f4').tofile(file)
+
+            records = np.zeros(len(faces), dtype=PLY_FACE)
+            records['count'] = 3
+            records['indices'] = faces
+            records.tofile(face_file)
+
+            n_vertices += vertices.shape[0]*vertices.shape[1]
+            n_faces += len(faces)
+
+        face_file.seek(0)
+        shutil.copyfileobj(face_file, file)
+
+        # Fill in the counts, the header keeps its length because of the fixed-width fields
+        file.seek(0)
+        file.write(header.format(n_vertices, n_faces, width=PLY_COUNT_WIDTH).encode('ascii'))
+
+    return n_vertices, n_faces
@@ -0,0 +1,191 @@
+import numpy as np
+
+
+# Number of coordinates processed at a time, bounding the temporary arrays of large batches of wings
+CHUNK_POINTS = 2**21
+
+METRICS = ('span', 'area', 'MAC', 'x_LEMAC', 'aspect_ratio', 'volume', 'wetted_area')
+
+
+def trapezoid(f: np.ndarray, x: np.ndarray):
+    """
+    Integrate sampled values with the trapezoidal rule along the last axis.
+    :param f: values, shape (..., n)
+    :param x: sample positions in any spacing, shape (..., n)
+    :return: integral, shape (...)
+    """
+    return 0.5*np.sum((f[..., 1:] + f[..., :-1])*np.diff(x, axis=-1), axis=-1)
+
+
+def simpson(f: np.ndarray, x: np.ndarray):
+    """
+    Integrate sampled values with Simpson's rule for unequally spaced samples along the last axis.
+    With an odd number of intervals, the last one is integrated with the parabola through the last three samples.
+    :param f: values, shape (..., n)
+    :param x: sample positions in any spacing, shape (..., n)
+    :return: integral, shape (...)
+    """
+
+    f, x = np.broadcast_arrays(f, x)
+
+    if f.shape[-1] < 3:
+        return trapezoid(f, x)
+
+    h = np.diff(x, axis=-1)
+    n_pairs = h.shape[-1]//2
+
+    # Pairs of intervals, each integrated with the parabola through its three samples
+    h0, h1 = h[..., 0:2*n_pairs:2], h[..., 1:2*n_pairs:2]
+    f0, f1, f2 = f[..., 0:2*n_pairs:2], f[..., 1:2*n_pairs + 1:2], f[..., 2:2*n_pairs + 2:2]
+
+    result = np.sum((h0 + h1)/6*((2 - h1/h0)*f0 + (h0 + h1)**2/(h0*h1)*f1 + (2 - h0/h1)*f2), axis=-1)
+
+    if h.shape[-1] % 2:
+        h0, h1 = h[..., -2], h[..., -1]
+        alpha = (2*h1**2 + 3*h0*h1)/(6*(h0 + h1))
+        beta = (h1**2 + 3*h0*h1)/(6*h0)
+        eta = h1**3/(6*h0*(h0 + h1))
+        result = result + alpha*f[..., -1] + beta*f[..., -2] - eta*f[..., -3]
+
+    return result
+
+
+QUADRATURE = {
+    'trapezoid': trapezoid,
+    'simpson': simpson,
+}
+
+
+def _planes(sections: np.ndarray):
+    """
+    Contiguous double precision copies of the x-, y- and z-coordinates of sections of shape (..., n_points, 3).
+    """
+    return np.moveaxis(np.asarray(sections, dtype=np.float64), -1, 0).copy()
+
+
+def _section_geometry(x: np.ndarray, z: np.ndarray):
+
+    # The leading edge is the point furthest from the middle of the trailing edge, the chord is its distance to it
+    dx = x - ((x[..., 0] + x[..., -1])/2)[..., None]
+    dz = z - ((z[..., 0] + z[..., -1])/2)[..., None]
+    le = np.argmax(dx**2 + dz**2, axis=-1)[..., None]
+
+    chord = np.hypot(np.take_along_axis(dx, le, axis=-1), np.take_along_axis(dz, le, axis=-1))[..., 0]
+    x_le = np.take_along_axis(x, le, axis=-1)[..., 0]
+
+    # Shoelace formula over the closed contour
+    area = 0.5*np.abs(np.sum(x[..., :-1]*z[..., 1:] - x[..., 1:]*z[..., :-1], axis=-1)
+                      + x[..., -1]*z[..., 0] - x[..., 0]*z[..., -1])
+
+    return chord, x_le, area
+
+
+def _wetted_area(x: np.ndarray, y: np.ndarray, z: np.ndarray):
+
+    # Half the cross product of the diagonals of a quadrilateral is its area vector
+    d1 = [c[..., 1:, 1:] - c[..., :-1, :-1] for c in (x, y, z)]
+    d2 = [c[..., 1:, :-1] - c[..., :-1, 1:] for c in (x, y, z)]
+
+    normal = (d1[1]*d2[2] - d1[2]*d2[1])**2
+    normal += (d1[2]*d2[0] - d1[0]*d2[2])**2
+    normal += (d1[0]*d2[1] - d1[1]*d2[0])**2
+
+    return 0.5*np.sum(np.sqrt(normal, out=normal), axis=(-2, -1))
+
+
+def section_geometry(sections: np.ndarray):
+    """
+    Properties of every wing section in its own plane (the x-z plane at the station).
+    :param sections: coordinates ordered around the airfoil from trailing edge to trailing edge,
+                     shape (..., n_span, n_points, 3)
+    :return: tuple of chord, x-coordinate of the leading edge and enclosed area of every section, shape (..., n_span)
+    """
+
+    x, _, z = _planes(sections)
+
+    return _section_geometry(x, z)
+
+
+def wetted_area(sections: np.ndarray):
+    """
+    Surface area of the wing skin between the stations, from the quadrilateral panels joining neighbouring points
+    of neighbouring stations. The root, the tip and the trailing edge base are not included.
+    :param sections: shape (..., n_span, n_points, 3)
+    :return: shape (...)
+    """
+    return _wetted_area(*_planes(sections))
+
+
+def wing_metrics(sections: np.ndarray, method: str = 'simpson'):
+    """
+    Geometric integrals of a wing, or of a stack of wings at once. Spanwise integrals use the given quadrature
+    over the span stations, so they can be evaluated on wings with any span discretization.
+    Everything is measured on the geometry as given: for a half wing from root to tip, the full wing has
+    twice the area, volume and wetted area and twice the aspect ratio.
+    :param sections: coordinates of the wings, shape (..., n_span, n_points, 3), e.g. the output of Wing.construct,
+                     ConstructionPlan or WingBatch
+    :param method: 'simpson' or 'trapezoid'
+    :return: dictionary with arrays of shape (...) for:
+             'span': distance between the first and last station along y
+             'area': planform area, the integral of the chord along the span
+             'MAC': mean aerodynamic chord, the integral of the chord squared divided by the area
+             'x_LEMAC': x-coordinate of the leading edge of the mean aerodynamic chord
+             'aspect_ratio': span squared divided by the area
+             'volume': enclosed volume, the integral of the section area along the span
+             'wetted_area': area of the wing skin
+    """
+
+    if method not in QUADRATURE:
+        raise ValueError(f"Expected one of {list(QUADRATURE)} as method, got '{method}' instead")
+
+    sections = np.asarray(sections)
+    if sections.ndim < 3 or sections.shape[-1] != 3:
+        raise ValueError(f"Expected sections of shape (..., n_span, n_points, 3), got shape {sections.shape} instead")
+
+    integrate = QUADRATURE[method]
+
+    batch_shape = sections.shape[:-3]
+    wings = sections.reshape((-1,) + sections.shape[-3:])
+    results = {key: np.empty(len(wings)) for key in METRICS}
+
+    chunk = max(1, CHUNK_POINTS//(sections.shape[-3]*sections.shape[-2]))
+
+    for start in range(0, len(wings), chunk):
+        # Every coordinate is worked on as its own contiguous array, which is much faster than the interleaved layout
+        x, y, z = _planes(wings[start:start + chunk])
+        rows = slice(start, start + len(x))
+
+        chord, x_le, section_area = _section_geometry(x, z)
+        wetted = _wetted_area(x, y, z)
+
+        y = y[..., 0]
+
+        area = integrate(chord, y)
+        span = y[..., -1] - y[..., 0]
+
+        results['span'][rows] = span
+        results['area'][rows] = area
+        results['MAC'][rows] = integrate(chord**2, y)/area
+        results['x_LEMAC'][rows] = integrate(chord*x_le, y)/area
+        results['aspect_ratio'][rows] = span**2/area
+        results['volume'][rows] = integrate(section_area, y)
+        results['wetted_area'][rows] = wetted
+
+    return {key: values.reshape(batch_shape) for key, values in results.items()}
+
+
+def mean_aerodynamic_chord(chord: np.ndarray, y: np.ndarray, method: str = 'simpson'):
+    """
+    Mean aerodynamic chord from a chord distribution, without constructing the wing.
+    :param chord: chord at every station, shape (..., n_span)
+    :param y: span coordinates of the stations, shape (..., n_span)
+    :param method: 'simpson' or 'trapezoid'
+    """
+
+    if method not in QUADRATURE:
+        raise ValueError(f"Expected one of {list(QUADRATURE)} as method, got '{method}' instead")
+
+    chord = np.asarray(chord, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    return QUADRATURE[method](chord**2, y)/QUADRATURE[method](chord, y)
@@ -1,5 +1,5 @@
 import numpy as np
-import os
+from typing import Union
 
 
 def derive(f, h=10e-5):
@@ -14,65 +14,95 @@ def linear_interpolation(x: float or int, p0: tuple or list, p1: tuple or list):
     return dy / dx * (x - p0[0]) + p0[1]
 
 
-def linear_interpolation_nearest_neighbour(X, Y):
+def resample_distribution(knots: Union[list, np.ndarray], values: Union[list, np.ndarray], x: Union[list, np.ndarray], mode: str = 'linear'):
+    """
+    Resample a distribution defined at a set of knots onto new positions.
+    Outside the range of the knots, the value of the nearest knot is used.
+    :param knots: positions at which the distribution is defined, in any order
+    :param values: value of the distribution at every knot
+    :param x: positions to resample to
+    :param mode: 'linear' for piecewise-linear interpolation,
+                 'step' to use the value of the last knot at or before every position,
+                 'cubic' for a cubic spline through the knots
+    :return: array with the value of the distribution at every position in x
+    """
 
-    def linear_function(x0):
+    knots = np.asarray(knots, dtype=float)
+    values = np.asarray(values, dtype=float)
+    x = np.asarray(x, dtype=float)
 
-        diff = float('inf')
-        for idx, xi in enumerate(X):
-            prev_diff = float(diff)
-            diff = abs(x0 - xi)
+    if knots.shape != values.shape or knots.ndim != 1 or knots.size == 0:
+        raise ValueError(f"Expected matching 1D arrays of knots and values, got shapes {knots.shape} and {values.shape}")
 
-            if prev_diff < diff:
+    order = np.argsort(knots, kind='stable')
+    knots = knots[order]
+    values = values[order]
 
-                dx = X[idx] - X[idx-1]
-                dy = Y[idx] - Y[idx-1]
+    mode = mode.lower()
 
-                return dy/dx*(x0 - X[idx-1]) + Y[idx-1]
+    if mode == 'linear':
+        return np.interp(x, knots, values)
 
-        raise ValueError("Value outside defined range")
+    elif mode == 'step':
+        idx = np.searchsorted(knots, x, side='right') - 1
+        return values[np.clip(idx, 0, knots.size - 1)]
 
-    return linear_function
+    elif mode == 'cubic':
+        if knots.size < 2:
+            return np.full(x.shape, values[0])
+
+        # Only imported when needed, scipy.interpolate is expensive to import
+        from scipy.interpolate import CubicSpline
+
+        return CubicSpline(knots, values)(np.clip(x, knots[0], knots[-1]))
+
+    raise ValueError(f"Unknown interpolation mode '{mode}', expected 'linear', 'step' or 'cubic'")
 
 
-def file_parser(rawdata_folder: str = r'C:\Users\lucky\Desktop\WingGeo\data\AirfoilCoordinates\raw',
-                processed_folder: str = r'C:\Users\lucky\Desktop\WingGeo\data\AirfoilCoordinates\processed'):
+def evaluate_callable(function: callable, x: Union[list, np.ndarray]):
+    """
+    Evaluate a function at every position in x. The function is first called once on the whole array, which works
+    for functions written with NumPy operations. If that fails, or does not return one value per position,
+    the function is evaluated element by element instead.
+    :param function: function taking a position and returning a number
+    :param x: positions to evaluate the function at
+    :return: tuple of the array of values and the path that was taken: 'vectorized', 'np.vectorize' or 'loop'
+    """
 
-    for datafile in os.listdir(rawdata_folder):
-        print(f"Parsing {datafile}")
+    x = np.asarray(x, dtype=float)
 
-        for enc in ['utf-8', 'utf-16', 'iso-8859-15', 'cp437']:
-            try:
-                with open(rawdata_folder + '\\' + datafile, 'r', encoding=enc) as file:
-                    lines = file.readlines()
-                    if not ord(lines[0][0]) >= 48 and not ord(lines[0][0]) <= 57:
-                        title = lines[0]
-                        lines = lines[1:]
-                    else:
-                        title = None
-                break
+    try:
+        values = np.asarray(function(x), dtype=float)
 
-            except (UnicodeDecodeError, UnicodeError, UnicodeTranslateError):
-                continue
+        if values.shape == x.shape:
+            return values, 'vectorized'
 
-        processed_lines = []
+    except Exception:
+        pass
 
-        for line in lines:
-            while line[0] is ' ':
-                line = line[1:]
+    try:
+        return np.vectorize(function, otypes=[float])(x), 'np.vectorize'
 
-            idx = line.find(' ')
-            line = line[0:idx] + ',' + line[idx+1:]
+    except Exception:
+        return np.array([function(xi) for xi in x.tolist()], dtype=float), 'loop'
 
-            while line[idx+1] is ' ':
-                line = line[0:idx+1] + line[idx+2:]
 
-            processed_lines.append(line)
+def linear_interpolation_nearest_neighbour(X, Y):
 
-        with open(processed_folder + '\\' + datafile.split('.')[0] + '.txt', 'w+', encoding=enc) as file:
-            file.write(''.join(processed_lines))
+    def linear_function(x0):
 
+        diff = float('inf')
+        for idx, xi in enumerate(X):
+            prev_diff = float(diff)
+            diff = abs(x0 - xi)
 
-if __name__ == '__main__':
+            if prev_diff < diff:
 
-    file_parser()
\ No newline at end of file
+                dx = X[idx] - X[idx-1]
+                dy = Y[idx] - Y[idx-1]
+
+                return dy/dx*(x0 - X[idx-1]) + Y[idx-1]
+
+        raise ValueError("Value outside defined range")
+
+    return linear_function
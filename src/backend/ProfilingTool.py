@@ -0,0 +1,154 @@
+import functools
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+# Recorder collecting the stage statistics, None while nothing is being recorded
+_recorder = None
+
+
+class StageRecorder(object):
+
+    def __init__(self, memory: bool = True):
+        """
+        Statistics of the instrumented pipeline stages: number of calls, wall time and peak memory.
+        Times and memory are inclusive, so a stage which calls other stages also counts their share.
+        Memory is measured with tracemalloc, whose peak is reset at the start of every stage. That peak is shared by
+        the whole process, so a recorder measuring memory has to own the tracing: see record().
+        :param memory: whether to measure the peak memory of the stages, which slows them down considerably
+        """
+
+        self.memory = memory
+        self.stages = {}
+
+        # Frames of the stages currently running, innermost last: [base memory, highest memory seen]
+        self.__stack = []
+
+    def __enter_stage(self):
+
+        if not self.memory:
+            return None
+
+        current, peak = tracemalloc.get_traced_memory()
+
+        # The peak is reset for the new stage, so keep what the enclosing stages have seen so far
+        for frame in self.__stack:
+            frame[1] = max(frame[1], peak)
+
+        tracemalloc.reset_peak()
+        frame = [current, current]
+        self.__stack.append(frame)
+
+        return frame
+
+    def __exit_stage(self, frame):
+
+        if frame is None:
+            return 0
+
+        frame[1] = max(frame[1], tracemalloc.get_traced_memory()[1])
+        self.__stack.pop()
+
+        if self.__stack:
+            self.__stack[-1][1] = max(self.__stack[-1][1], frame[1])
+
+        return frame[1] - frame[0]
+
+    def call(self, name: str, function: callable, args: tuple, kwargs: dict):
+        """
+        Call a function as the given stage and record its statistics.
+        """
+
+        frame = self.__enter_stage()
+        start = time.perf_counter()
+
+        try:
+            return function(*args, **kwargs)
+
+        finally:
+            seconds = time.perf_counter() - start
+            peak = self.__exit_stage(frame)
+
+            stats = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'peak_memory': 0 if self.memory else None})
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+
+            if self.memory:
+                stats['peak_memory'] = max(stats['peak_memory'], peak)
+
+    def report(self):
+        """
+        :return: dictionary with the stage names as keys and dictionaries of 'calls', 'seconds' and 'peak_memory'
+                 (in bytes, None when memory was not traced) as values
+        """
+        return {name: dict(stats) for name, stats in self.stages.items()}
+
+
+def instrumented(name: str):
+    """
+    Decorator marking a function as a pipeline stage. While no recording is active the function is called directly,
+    so the instrumentation costs a single check per call.
+    :param name: name of the stage in the report
+    """
+
+    def decorator(function: callable):
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+
+            if _recorder is None:
+                return function(*args, **kwargs)
+
+            return _recorder.call(name, function, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def record(memory: bool = True):
+    """
+    Record the statistics of all instrumented stages called within the block.
+    Memory is only measured if tracemalloc is not tracing yet when the block starts, the recorder then starts and
+    stops the tracing itself. Within an enclosing record() block, or while tracing was started elsewhere, resetting
+    the peak would corrupt the measurements made there, so the peak memory of the stages is reported as None.
+    :param memory: whether to trace the peak memory of every stage with tracemalloc
+    :return: the StageRecorder holding the statistics
+    """
+
+    global _recorder
+
+    previous = _recorder
+
+    start_tracing = memory and not tracemalloc.is_tracing()
+    recorder = StageRecorder(memory=start_tracing)
+
+    if start_tracing:
+        tracemalloc.start()
+
+    _recorder = recorder
+
+    try:
+        yield recorder
+
+    finally:
+        _recorder = previous
+
+        if start_tracing:
+            tracemalloc.stop()
+
+
+def format_report(report: dict):
+    """
+    Format a stage report as a table, slowest stage first.
+    """
+
+    lines = [f"{'stage':<36}{'calls':>8}{'time [ms]':>14}{'peak memory [MB]':>20}"]
+
+    for name, stats in sorted(report.items(), key=lambda item: -item[1]['seconds']):
+        memory = '-' if stats['peak_memory'] is None else f"{stats['peak_memory'] / 1e6:.3f}"
+        lines.append(f"{name:<36}{stats['calls']:>8}{stats['seconds'] * 1e3:>14.3f}{memory:>20}")
+
+    return '\n'.join(lines)
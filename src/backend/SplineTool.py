@@ -0,0 +1,177 @@
+import numpy as np
+from collections import OrderedDict
+
+
+def turning_point(x: np.ndarray):
+    """
+    Index of the leading edge of an airfoil ordered from the trailing edge over one surface to the leading edge and
+    back over the other: the last point before x starts increasing again.
+    """
+
+    increasing = np.diff(x) > 0
+
+    if not np.any(increasing):
+        raise ValueError("Could not find turning point in given arrays. "
+                         "Make sure the coordinates are defined from upper trailing edge to lower trailing edge.")
+
+    return int(np.argmax(increasing))
+
+
+def split_surfaces(x: np.ndarray, z: np.ndarray):
+    """
+    Split airfoil coordinates at the turning point into an upper surface, without the leading edge point, and a
+    lower surface, starting at the leading edge. Both are sorted by x; points with equal x keep their order.
+    :return: tuple of (x, z) tuples for the upper and lower surface
+    """
+
+    # Plain arrays, slicing views of the memory-mapped pack is comparatively slow
+    x, z = np.asarray(x), np.asarray(z)
+    idx = turning_point(x)
+
+    def surface(points: slice):
+        order = np.argsort(x[points], kind='stable')
+        return x[points][order], z[points][order]
+
+    return surface(slice(0, idx)), surface(slice(idx, None))
+
+
+class SplineResampler(object):
+
+    def __init__(self, maxsize: int = 4096, maxbytes: int = 2**27):
+        """
+        Resampling of curves z(x) through interpolating or smoothing B-splines, as fitted by scipy's splrep.
+        Two least-recently-used caches are kept: the fitted spline of every curve, keyed by its coordinates, and
+        the basis matrix of every combination of knots and target grid. Evaluating a fitted spline on a grid it was
+        evaluated on before is a single matrix product, and curves sharing their knots are evaluated together.
+        :param maxsize: maximum number of fitted splines kept in memory
+        :param maxbytes: maximum total size of the basis matrices kept in memory
+        """
+
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.__splines = OrderedDict()
+        self.__bases = OrderedDict()
+        self.__basis_bytes = 0
+
+    def __cached(self, cache: OrderedDict, key: tuple, function: callable):
+
+        if key in cache:
+            self.hits += 1
+            cache.move_to_end(key)
+            return cache[key]
+
+        self.misses += 1
+        cache[key] = value = function()
+
+        if cache is self.__bases:
+            self.__basis_bytes += value.nbytes
+
+            while self.__basis_bytes > self.maxbytes and len(cache) > 1:
+                self.__basis_bytes -= cache.popitem(last=False)[1].nbytes
+
+        else:
+            while len(cache) > self.maxsize:
+                cache.popitem(last=False)
+
+        return value
+
+    def fit(self, x: np.ndarray, z: np.ndarray, k: int = 3, s: int = 0):
+        """
+        B-spline through the points of a curve, with x in ascending order.
+        :return: tuple of the knots and the coefficients belonging to them
+        """
+
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        z = np.ascontiguousarray(z, dtype=np.float64)
+
+        def fit():
+            # scipy.interpolate dominates the import time of this package, so it is only imported when needed
+            from scipy import interpolate
+
+            t, c, _ = interpolate.splrep(x, z, k=k, s=s)
+            t.setflags(write=False)
+            c = c[:len(t) - k - 1]
+            c.setflags(write=False)
+
+            return t, c
+
+        return self.__cached(self.__splines, (x.tobytes(), z.tobytes(), k, s), fit)
+
+    def basis(self, t: np.ndarray, k: int, xnew: np.ndarray):
+        """
+        Matrix with the value of every B-spline basis function at every target point, shape (len(xnew), n_coefficients).
+        Rows of points outside the knots are zero, so the curves are zero there.
+        """
+
+        t = np.ascontiguousarray(t, dtype=np.float64)
+        xnew = np.ascontiguousarray(xnew, dtype=np.float64)
+
+        def basis():
+            from scipy import interpolate
+
+            # A spline with the identity as coefficients evaluates to every basis function at once
+            matrix = interpolate.BSpline(t, np.eye(len(t) - k - 1), k, extrapolate=False)(xnew)
+            matrix[np.isnan(matrix)] = 0
+            matrix.setflags(write=False)
+
+            return matrix
+
+        return self.__cached(self.__bases, (t.tobytes(), k, xnew.tobytes()), basis)
+
+    def evaluate(self, x: np.ndarray, z: np.ndarray, xnew: np.ndarray, k: int = 3, s: int = 0):
+        """
+        Resample a curve with x in ascending order onto new x-coordinates, zero outside the range of x.
+        """
+
+        t, c = self.fit(x, z, k=k, s=s)
+
+        return self.basis(t, k, xnew) @ c
+
+    def evaluate_many(self, curves: list, xnew: np.ndarray, k: int = 3, s: int = 0):
+        """
+        Resample many curves onto the same x-coordinates. Curves with the same knots, e.g. airfoils defined at
+        the same stations, are evaluated with a single matrix product.
+        :param curves: list of (x, z) tuples with x in ascending order
+        :return: array of shape (len(curves), len(xnew))
+        """
+
+        groups = {}
+        for idx, (x, z) in enumerate(curves):
+            t, c = self.fit(x, z, k=k, s=s)
+            groups.setdefault(t.tobytes(), (t, [], []))
+            groups[t.tobytes()][1].append(idx)
+            groups[t.tobytes()][2].append(c)
+
+        result = np.empty((len(curves), len(xnew)))
+
+        for t, rows, coefficients in groups.values():
+            result[rows] = (self.basis(t, k, xnew) @ np.array(coefficients).T).T
+
+        return result
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'splines': len(self.__splines),
+            'bases': len(self.__bases),
+            'basis_bytes': self.__basis_bytes,
+            'maxsize': self.maxsize,
+            'maxbytes': self.maxbytes
+        }
+
+    def clear(self):
+        """
+        Remove all splines and basis matrices and reset the counters.
+        """
+
+        self.__splines.clear()
+        self.__bases.clear()
+        self.__basis_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+
+RESAMPLER = SplineResampler()
@@ -1,85 +1,288 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import axes3d, Axes3D
+from contextlib import contextmanager
 from typing import Union
-from backend.NumericalTools import linear_interpolation
-from backend.AirFoilTool import FiveDigitNACA, FourDigitNACA, LoadedAirfoil
+from backend.NumericalTools import evaluate_callable, resample_distribution
+from backend.AirFoilTool import SECTION_CACHE
+from backend.MeshTool import write_ply, write_stl
+from backend.MetricsTool import mean_aerodynamic_chord, wing_metrics
+from backend.ProfilingTool import instrumented, record
 
 
 # TODO: Make discretization more modular
 
 
+def span_offsets(y: np.ndarray, angle: np.ndarray, initial: float = 0.0):
+    """
+    Cumulative offsets along the span caused by a sweep or dihedral angle: station i is displaced by
+    the sum of (y[j+1] - y[j])*tan(angle[j]) over all stations j before it.
+    :param y: span coordinates, shape (..., n_span)
+    :param angle: angle at every station in degrees, shape (..., n_span)
+    :param initial: offset of the first station, to continue the offsets of stations further inboard
+    :return: offset of every station in double precision, shape (..., n_span)
+    """
+
+    # The running sum accumulates rounding errors along the span, so it is always done in double precision
+    increments = np.diff(np.asarray(y, dtype=np.float64), axis=-1)*np.tan(np.deg2rad(np.asarray(angle, dtype=np.float64)[..., :-1]))
+
+    offsets = np.empty(increments.shape[:-1] + (increments.shape[-1] + 1,))
+    offsets[..., 0] = initial
+    offsets[..., 1:] = increments
+    np.cumsum(offsets, axis=-1, out=offsets)
+
+    return offsets
+
+
+def scale_sections(sections: np.ndarray, y: np.ndarray, chord: np.ndarray):
+    """
+    Scale unit-chord airfoil sections with the chord distribution and place them along the span.
+    The x-axis points from the trailing edge towards the leading edge, which lies at x = 0.
+    :param sections: unit-chord coordinates of every station, shape (n_span, n_points, 2)
+    :param y: span coordinates, shape (n_span,)
+    :param chord: chord of every station, shape (..., n_span)
+    :return: coordinates with the floating point type of the sections, shape (..., n_span, n_points, 3)
+    """
+
+    c = np.asarray(chord, dtype=float)[..., None]
+
+    data = np.empty(c.shape[:-2] + sections.shape[:2] + (3,), dtype=sections.dtype)
+    data[..., 0] = sections[:, :, 0]*-c
+    data[..., 1] = np.asarray(y, dtype=float)[:, None]
+    data[..., 2] = sections[:, :, 1]*c
+
+    return data
+
+
+def shift_sections(sections: np.ndarray, chord: np.ndarray, percent_chord: float = 0.25):
+    """
+    Shift every section forwards by a fraction of its chord, in place.
+    :param sections: coordinates, shape (..., n_span, n_points, 3)
+    :param chord: chord of every station, shape (..., n_span)
+    :param percent_chord: fraction of the chord to shift by
+    """
+
+    sections[..., 0] += np.asarray(chord, dtype=float)[..., None]*percent_chord
+
+
+def apply_twist(sections: np.ndarray, twist: np.ndarray):
+    """
+    Rotate every section in the x-z plane around the origin, in place.
+    :param sections: coordinates, shape (..., n_span, n_points, 3)
+    :param twist: twist angle of every section in degrees, shape (..., n_span)
+    """
+
+    theta = np.deg2rad(np.asarray(twist, dtype=np.float64))
+    cos, sin = np.cos(theta).astype(sections.dtype), np.sin(theta).astype(sections.dtype)
+
+    # Stack of rotation matrices, shape (..., n_span, 2, 2)
+    T = np.stack((np.stack((cos, -sin), axis=-1),
+                  np.stack((sin, cos), axis=-1)), axis=-2)
+
+    # Batched matrix product of every (n_points, 2) block with its transposed rotation matrix. This is the
+    # same contraction as einsum('...sij,...spj->...spi'), but matmul is considerably faster on strided input
+    sections[..., ::2] = np.matmul(sections[..., ::2], np.swapaxes(T, -1, -2))
+
+
+def apply_sweep(sections: np.ndarray, y: np.ndarray, sweep: np.ndarray):
+    """
+    Shift every section backwards according to the sweep of the stations before it, in place.
+    :param sections: coordinates, shape (..., n_span, n_points, 3)
+    :param y: span coordinates, shape (..., n_span)
+    :param sweep: sweep angle at every station in degrees, shape (..., n_span)
+    """
+
+    sections[..., 0] -= span_offsets(y, sweep)[..., None]
+
+
+def apply_dihedral(sections: np.ndarray, y: np.ndarray, dihedral: np.ndarray):
+    """
+    Shift every section upwards according to the dihedral of the stations before it, in place.
+    :param sections: coordinates, shape (..., n_span, n_points, 3)
+    :param y: span coordinates, shape (..., n_span)
+    :param dihedral: dihedral angle at every station in degrees, shape (..., n_span)
+    """
+
+    sections[..., 2] += span_offsets(y, dihedral)[..., None]
+
+
 class DataStorage(object):
 
     def __init__(self):
+        """
+        Storage for the wing coordinates. All coordinates live in a single (n_span, n_points, 3) array, with the
+        sections sorted along the span. The dictionary and flat array forms are views on that array, so changes
+        made through them end up in the storage as well.
+        """
 
-        self.__data_dict = None
-        self.__data_array = None
-        self.__length = None
-        self.__keys = None
+        self.__sections = None
+        self.__y = None
 
     def get_dictionary(self):
-        return self.__data_dict
+        """
+        Dictionary with the span coordinates as keys and dictionaries of 'x' and 'z' views as values.
+        """
+
+        if self.__sections is None:
+            return None
+
+        return {yi: {'x': section[:, 0], 'z': section[:, 2]} for yi, section in zip(self.__y.tolist(), self.__sections)}
 
     def get_array(self):
-        return self.__data_array
+        """
+        All coordinates as a (3, n_span * n_points) view, section after section.
+        """
 
-    def __get_y_keys(self):
-        self.__keys = list(self.__data_dict.keys())
+        if self.__sections is None:
+            return None
 
-    def __array_to_dict(self):
+        return self.__sections.reshape(-1, 3).T
 
-        unique_y = set(self.__data_array[1,:])
-        series_length = 0
+    def get_sections(self):
+        return self.__sections
 
-        y0 = self.__data_array[1,0]
-        for idx, yi in enumerate(self.__data_array[1,1:]):
-            if yi == y0:
-                continue
-            else:
-                series_length = idx+1
-                break
+    def get_span_coordinates(self):
+        return self.__y
+
+    @staticmethod
+    def __dict_to_sections(data: dict):
 
-        for counter, y in enumerate(unique_y):
-            self.__data_dict[y] = {
-                'x': self.__data_array[0, counter*series_length:(counter+1):series_length],
-                'z': self.__data_array[2, counter*series_length:(counter+1):series_length]
-            }
+        keys = sorted(data.keys())
 
-    def __dict_to_array(self):
+        dtype = np.result_type(data[keys[0]]['x'], data[keys[0]]['z'], np.float32)
+        sections = np.empty((len(keys), len(data[keys[0]]['x']), 3), dtype=dtype)
+        for section, yi in zip(sections, keys):
+            section[:, 0] = data[yi]['x']
+            section[:, 1] = yi
+            section[:, 2] = data[yi]['z']
 
-        ny = len(self.__data_dict)
-        nxz = len(self.__data_dict[self.__keys[0]]['x'])
+        return sections
 
-        self.__data_array = np.zeros((3, ny*nxz))
+    @staticmethod
+    def __array_to_sections(array: np.ndarray):
+
+        # The number of points per section follows from the first change in the span coordinate
+        y = array[1, :]
+        changes = np.flatnonzero(y[1:] != y[0])
+        n_points = changes[0] + 1 if changes.size else y.size
 
-        for idx1, (y, value) in enumerate(self.__data_dict.items()):
-            for idx2, (x, z) in enumerate(zip(self.__data_dict[y]['x'], self.__data_dict[y]['z'])):
-                self.__data_array[:, idx1*nxz + idx2] = np.array([x, y, z])
+        return np.ascontiguousarray(array.T.reshape(-1, n_points, 3))
 
-    def set_data(self, data: Union[np.array, dict, list]):
+    @instrumented('DataStorage.set_data')
+    def set_data(self, data: Union[np.ndarray, dict, list]):
+        """
+        :param data: dictionary of sections, flat (3, n_span * n_points) array or (n_span, n_points, 3) array.
+                     Single and double precision data is stored as is, anything else as double precision.
+        """
 
         if type(data) == list:
             data = np.array(data)
 
         if type(data) == dict:
+            sections = self.__dict_to_sections(data)
+
+        elif isinstance(data, np.ndarray) and data.ndim == 3:
+            sections = np.ascontiguousarray(data, dtype=np.result_type(data, np.float32))
+
+        elif isinstance(data, np.ndarray) and data.ndim == 2:
+            sections = self.__array_to_sections(np.asarray(data, dtype=np.result_type(data, np.float32)))
+
+        else:
+            raise TypeError("Invalid Input")
 
-            self.__data_dict = dict(data)
-            self.__get_y_keys()
-            self.__dict_to_array()
+        order = np.argsort(sections[:, 0, 1], kind='stable')
+        if np.any(order != np.arange(order.size)):
+            sections = sections[order]
 
-        elif type(data) == np.array:
+        self.__sections = sections
+        self.__y = sections[:, 0, 1].copy()
 
-            self.__data_array = np.array(data)
-            self.__array_to_dict()
-            self.__get_y_keys()
+
+class ConstructionPlan(object):
+
+    def __init__(self, sections: np.ndarray, y: np.ndarray, chord: np.ndarray,
+                 twist: np.ndarray = None, sweep: np.ndarray = None, dihedral: np.ndarray = None):
+        """
+        Everything needed to construct a wing, without any of the Python state of a Wing object.
+        Usually created through Wing.compile(). Executing the plan applies the same stages as Wing.construct.
+        :param sections: unit-chord coordinates of every station, shape (n_span, n_points, 2). Their floating point
+                         type is also the type of the constructed coordinates.
+        :param y: span coordinates, shape (n_span,)
+        :param chord: default chord distribution, shape (n_span,)
+        :param twist: default twist distribution in degrees, shape (n_span,), or None for no twist
+        :param sweep: default sweep distribution in degrees, shape (n_span,), or None for no sweep
+        :param dihedral: default dihedral distribution in degrees, shape (n_span,), or None for no dihedral
+        """
+
+        self.sections = np.asarray(sections, dtype=np.result_type(sections, np.float32))
+        self.y = np.asarray(y, dtype=float)
+        self.defaults = {
+            'chord': chord,
+            'twist': twist,
+            'sweep': sweep,
+            'dihedral': dihedral
+        }
+
+    def get_shape(self):
+        """
+        Shape of a single constructed wing: (n_span, n_points, 3).
+        """
+        return self.sections.shape[:2] + (3,)
+
+    def __call__(self, chord: np.ndarray = None, twist: np.ndarray = None, sweep: np.ndarray = None, dihedral: np.ndarray = None):
+        """
+        Construct the wing, optionally replacing some of the distributions. Every distribution has the span
+        stations along its last axis and may have leading batch axes, e.g. shape (K, n_span) to construct
+        K variants in one vectorized call. Batch axes of different distributions broadcast against each other.
+        :return: coordinates, shape (..., n_span, n_points, 3)
+        """
+
+        overrides = {'chord': chord, 'twist': twist, 'sweep': sweep, 'dihedral': dihedral}
+        parameters = {}
+
+        for key, default in self.defaults.items():
+            value = default if overrides[key] is None else np.asarray(overrides[key], dtype=float)
+
+            if value is not None and value.shape[-1:] != self.y.shape:
+                raise ValueError(f"Expected {len(self.y)} {key} values along the last axis, got shape {value.shape}")
+
+            parameters[key] = value
+
+        if parameters['chord'] is None:
+            raise ValueError("A chord distribution is required")
+
+        batch = np.broadcast_shapes(*[value.shape[:-1] for value in parameters.values() if value is not None])
+
+        data = scale_sections(self.sections, self.y, np.broadcast_to(parameters['chord'], batch + self.y.shape))
+        shift_sections(data, parameters['chord'], 0.25)
+
+        if parameters['twist'] is not None:
+            apply_twist(data, parameters['twist'])
+
+        if parameters['sweep'] is not None:
+            apply_sweep(data, self.y, parameters['sweep'])
+
+        if parameters['dihedral'] is not None:
+            apply_dihedral(data, self.y, parameters['dihedral'])
+
+        return data
 
 
 class Wing(object):
 
-    def __init__(self):
+    # Construction stages in the order they are applied, each one working on the output of the one before it
+    __STAGES = ('sections', 'chord', 'shift', 'twist', 'sweep', 'dihedral')
+
+    # Stages whose output is kept between constructions, the stages after them are recomputed from there.
+    # Every stage after 'chord' works in place, so the stages after 'shift' share a single working buffer.
+    __CACHED_STAGES = ('sections', 'shift')
+
+    def __init__(self, dtype=np.float64):
+        """
+        :param dtype: floating point type of the wing coordinates. Single precision halves the memory of the
+                      coordinates, the running sums of the sweep and dihedral offsets are done in double precision.
+        """
 
         # Initialize all parameters defining the wing
+        self.dtype = np.dtype(dtype)
         self.b = None
         self.MAC = None
         self.x_LEMAC = None
@@ -92,7 +295,15 @@ class Wing(object):
         self.airfoil_distribution = None
         self.dihedral_distribution = None
 
-        self.transformation_order = []
+        # How every callable distribution was evaluated: 'vectorized', 'np.vectorize' or 'loop'
+        self.callable_evaluation = {}
+
+        # Per-stage statistics of the last profile() block, see ProfilingTool.StageRecorder.report
+        self.profile_report = None
+
+        # Cached output of the stages in __CACHED_STAGES, and the first stage that has to be recomputed
+        self.__stage_data = {}
+        self.__dirty_stage = 0
 
         # Final Coordinates of the wing
         self.__span_steps = 25
@@ -102,12 +313,29 @@ class Wing(object):
         self.data_container = DataStorage()
 
 
+    def __getstate__(self):
+        """
+        The cached construction stages and the constructed coordinates are left out when pickling, e.g. when
+        sending a wing to a worker process. They are rebuilt by the next call to construct.
+        """
+
+        state = dict(self.__dict__)
+        state['_Wing__stage_data'] = {}
+        state['_Wing__dirty_stage'] = 0
+        state['data_container'] = DataStorage()
+
+        return state
+
     """
     Detail-Level Methods go below here
     """
     @staticmethod
-    def __calculate_MAC(c: np.array):
-        return np.average(c)
+    def __calculate_MAC(c: np.array, y: np.array):
+
+        if y is None or len(y) < 2:
+            return None
+
+        return float(mean_aerodynamic_chord(c, y))
 
     def get_span(self):
         return self.b
@@ -121,6 +349,13 @@ class Wing(object):
         - Dictionaries which contain the y coordinates and their variables in a list or array 
           can also be inputted with the correct key
     """
+    @staticmethod
+    def __is_number(value):
+        """
+        Python and NumPy numbers (np.float64(2.0), np.int32(3)) are all taken as a single value. Booleans are not.
+        """
+        return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
     @staticmethod
     def __number_input_allocation(code: str, span_steps: Union[np.array, np.ndarray], key: str, target: dict or None, airfoil: bool = False):
 
@@ -129,83 +364,79 @@ class Wing(object):
 
         if airfoil is False:
             target['y'] = span_steps
-            target[key] = np.array([code for _ in target['y']])
+            target[key] = np.full(len(span_steps), code)
 
         elif airfoil is True:
-            target[code] = (0, 1, None, None)
+            # A single knot, the airfoil is used along the whole span
+            target = {'y': np.zeros(1), key: [code], 'interpolation': 'step'}
 
         return target
 
     @staticmethod
-    def __array_input_allocation(array: list or np.array, span_steps: Union[np.array, np.ndarray], key: str, target: dict or None):
-
-        # TODO: Interpolate the values of array to match discretization
+    def __array_input_allocation(array: list or np.array, span_steps: Union[np.array, np.ndarray], key: str, target: dict or None, interpolation: str = 'linear'):
+        """
+        Arrays contain (value, y) pairs, either as rows of an (n, 2) array or as columns of a (2, n) array.
+        A 1D array with one value per span station is used as it is.
+        """
 
         if target is None:
             target = {}
 
-        if type(array) == list:
-            array = np.array(array)
-
-        new_array = []
+        array = np.asarray(array, dtype=float)
 
-        if array.shape[0] > array.shape[1]:
-            for yi in span_steps:
-                for i in range(len(array[:,1])-1):
+        if array.ndim == 1 and len(array) == len(span_steps):
+            target['y'] = span_steps
+            target[key] = array.copy()
 
-                    if array[:,1][i+1] > yi >= array[:,1][i]:
-                        new_array.append(linear_interpolation(yi, list(reversed(array[i, :])), list(reversed(array[i+1, :]))))
+            return target
 
-            target[key] = np.array(new_array)
-            target["y"] = span_steps
+        elif array.ndim == 2 and array.shape[1] == 2:
+            values, knots = array[:, 0], array[:, 1]
 
-        elif array.shape[0] < array.shape[1]:
-            for yi in span_steps:
-                for i in range(len(array[1, :]) - 1):
+        elif array.ndim == 2 and array.shape[0] == 2:
+            values, knots = array[0, :], array[1, :]
 
-                    if array[1, :][i + 1] > yi >= array[1, :][i]:
-                        new_array.append(linear_interpolation(yi, list(reversed(array[:, i])), list(reversed(array[:, i+1]))))
+        else:
+            raise ValueError(f"Expected an array of (value, y) pairs with shape (n, 2) or (2, n), got shape {array.shape}")
 
-            target[key] = np.array(new_array)
-            target["y"] = span_steps
+        target['y'] = span_steps
+        target[key] = resample_distribution(knots, values, span_steps, mode=interpolation)
 
         return target
 
-    @staticmethod
-    def __callable_input_allocation(function: callable, span_steps: Union[np.array, np.ndarray], key: str, target: dict or None):
+    def __callable_input_allocation(self, function: callable, span_steps: Union[np.array, np.ndarray], key: str, target: dict or None):
         
         if target is None:
             target = {}
 
         target['y'] = span_steps
-        target[key] = np.array([function(yi) for yi in target['y']])
+        target[key], self.callable_evaluation[key] = evaluate_callable(function, span_steps)
 
         return target
 
     @staticmethod
-    def __dictionary_input_allocation(dictionary: dict, span_steps: Union[np.array, np.ndarray], key: str, target: dict or None, airfoil=False):
+    def __dictionary_input_allocation(dictionary: dict, span_steps: Union[np.array, np.ndarray], key: str, target: dict or None, airfoil=False, interpolation: str = 'linear'):
         
         if target is None:
             target = {}
 
         if airfoil is False:
             target['y'] = span_steps
-            target[key] = []
+            target[key] = resample_distribution(list(dictionary.keys()), list(dictionary.values()), span_steps, mode=interpolation)
 
-            keys = list(dictionary.keys())
-
-            for yi in span_steps:
-                for i in range(len(keys)-1):
-
-                    if keys[i+1] > yi >= keys[i]:
-                        target[key].append(linear_interpolation(yi, (keys[i], dictionary[keys[i]]), (keys[i+1], dictionary[keys[i+1]])))
+        elif airfoil is True:
+            # Airfoils are kept at their knots, the sections in between are blended when the wing is constructed
+            if interpolation not in ('linear', 'step'):
+                raise ValueError(f"Expected 'linear' or 'step' interpolation for airfoils, got '{interpolation}' instead")
 
-            target[key] = np.array(target[key])
+            if len(dictionary) == 0:
+                raise ValueError("Expected at least one airfoil")
 
-        elif airfoil is True:  # TODO: Airfoil transition morphing needs to be implemented
+            knots = np.array(list(dictionary.keys()), dtype=float)
+            order = np.argsort(knots, kind='stable')
+            names = list(dictionary.values())
 
-            for key_i, value in dictionary.items():
-                target[key].append(value)
+            target = {'y': knots[order], key: [names[idx] for idx in order], 'interpolation': interpolation}
 
         return target
 
@@ -216,96 +447,107 @@ class Wing(object):
 
         self.b = span_points[-1]
         self.__yrange = np.array(span_points)
+        self.__invalidate('sections')
+
+    def set_airfoil(self, airfoil: Union[str, dict], interpolation: str = 'linear'):
+        """
+        :param airfoil: name of the airfoil along the whole span, or dictionary with span coordinates as keys and
+                        airfoil names as values, e.g. {0: 'naca2415', 4: 'naca2412', 10: 'naca0010'} for a root,
+                        kink and tip airfoil. Outside the outermost knots their airfoil is used.
+        :param interpolation: 'linear' to morph the sections gradually from one knot to the next,
+                              'step' to use the airfoil of the last knot at or before every station
+        """
 
-    def set_airfoil(self, airfoil: Union[str, dict]):
-        
         airfoiltype = type(airfoil)
 
         if airfoiltype is str:
-            self.airfoil_distribution = self.__number_input_allocation(airfoil, self.__yrange, 'airfoil', self.airfoil_distribution, airfoil=True)
+            self.airfoil_distribution = self.__number_input_allocation(airfoil, self.__yrange, 'airfoil', None, airfoil=True)
 
         elif airfoiltype is dict:
-            self.airfoil_distribution = self.__dictionary_input_allocation(airfoil, 'airfoil', self.airfoil_distribution, airfoil=True)
+            self.airfoil_distribution = self.__dictionary_input_allocation(airfoil, self.__yrange, 'airfoil', None,
+                                                                           airfoil=True, interpolation=interpolation)
 
         else:
             raise TypeError("Invalid Input")
+
+        self.__invalidate('sections')
     
-    def set_twist(self, twist: Union[int, float, callable, list, np.array, dict]):
+    def set_twist(self, twist: Union[int, float, np.number, callable, list, np.array, dict], interpolation: str = 'linear'):
         
         twisttype = type(twist)
 
-        if twisttype in [int, float]:
+        if self.__is_number(twist):
             self.twist_distribution = self.__number_input_allocation(twist, self.__yrange, 'twist', self.twist_distribution)
 
-        elif twisttype in [list, np.array]:
-            self.twist_distribution = self.__array_input_allocation(twist, self.__yrange, 'twist', self.twist_distribution)
+        elif twisttype in [list, np.ndarray]:
+            self.twist_distribution = self.__array_input_allocation(twist, self.__yrange, 'twist', self.twist_distribution, interpolation)
 
         elif callable(twist):
             self.twist_distribution = self.__callable_input_allocation(twist, self.__yrange, 'twist', self.twist_distribution)
 
         elif twisttype is dict:
-            self.twist_distribution = self.__dictionary_input_allocation(twist, 'twist', self.twist_distribution)
+            self.twist_distribution = self.__dictionary_input_allocation(twist, self.__yrange, 'twist', self.twist_distribution, interpolation=interpolation)
 
         else:
             raise TypeError("Invalid Input")
 
-        self.transformation_order.append(self.__apply_twist)
+        self.__invalidate('twist')
     
-    def set_dihedral(self, dihedral: Union[int, float, callable, list, np.array, dict]):
+    def set_dihedral(self, dihedral: Union[int, float, np.number, callable, list, np.array, dict], interpolation: str = 'linear'):
         
         dihedraltype = type(dihedral)
         
-        if dihedraltype in [int, float]:
+        if self.__is_number(dihedral):
             self.dihedral_distribution = self.__number_input_allocation(dihedral, self.__yrange, 'dihedral', self.dihedral_distribution)
 
-        elif dihedraltype in [list, np.array]:
-            self.dihedral_distribution = self.__array_input_allocation(dihedral, self.__yrange, 'dihedral', self.dihedral_distribution)
+        elif dihedraltype in [list, np.ndarray]:
+            self.dihedral_distribution = self.__array_input_allocation(dihedral, self.__yrange, 'dihedral', self.dihedral_distribution, interpolation)
 
         elif callable(dihedral):
             self.dihedral_distribution = self.__callable_input_allocation(dihedral, self.__yrange, 'dihedral', self.dihedral_distribution)
 
         elif dihedraltype is dict:
-            self.dihedral_distribution = self.__dictionary_input_allocation(dihedral, 'dihedral', self.dihedral_distribution, )
+            self.dihedral_distribution = self.__dictionary_input_allocation(dihedral, self.__yrange, 'dihedral', self.dihedral_distribution, interpolation=interpolation)
 
         else:
             raise TypeError("Invalid Input")
 
-        self.transformation_order.append(self.__apply_dihedral)
+        self.__invalidate('dihedral')
         
-    def set_sweep(self, sweep: Union[int, float, callable, list, np.array, dict]):
+    def set_sweep(self, sweep: Union[int, float, np.number, callable, list, np.array, dict], interpolation: str = 'linear'):
 
         sweeptype = type(sweep)
     
-        if sweeptype in [int, float]:
+        if self.__is_number(sweep):
             self.sweep_distribution = self.__number_input_allocation(sweep, self.__yrange, 'sweep', self.sweep_distribution)
 
-        elif sweeptype in [list, np.array]:
-            self.sweep_distribution = self.__array_input_allocation(sweep, self.__yrange, 'sweep', self.sweep_distribution)
+        elif sweeptype in [list, np.ndarray]:
+            self.sweep_distribution = self.__array_input_allocation(sweep, self.__yrange, 'sweep', self.sweep_distribution, interpolation)
 
         elif callable(sweep):
             self.sweep_distribution = self.__callable_input_allocation(sweep, self.__yrange, 'sweep', self.sweep_distribution)
             
         elif sweeptype is dict:
-            self.sweep_distribution = self.__dictionary_input_allocation(sweep, 'sweep', self.sweep_distribution)
+            self.sweep_distribution = self.__dictionary_input_allocation(sweep, self.__yrange, 'sweep', self.sweep_distribution, interpolation=interpolation)
             
         else:
             raise TypeError("Invalid Input")
 
-        self.transformation_order.append(self.__apply_sweep)
+        self.__invalidate('sweep')
 
-    def set_chord(self, c: Union[int, float, callable, list, np.array, dict]):
+    def set_chord(self, c: Union[int, float, np.number, callable, list, np.array, dict], interpolation: str = 'linear'):
 
         ctype = type(c)
 
-        if ctype in [int, float]:
+        if self.__is_number(c):
             self.cr = c
             self.ct = c
             self.taper = 1
             self.chord_distribution = self.__number_input_allocation(c, self.__yrange, 'chord', self.chord_distribution)
 
-        elif ctype in [list, np.array]:
+        elif ctype in [list, np.ndarray]:
 
-            self.chord_distribution = self.__array_input_allocation(c, self.__yrange, 'chord', self.chord_distribution)
+            self.chord_distribution = self.__array_input_allocation(c, self.__yrange, 'chord', self.chord_distribution, interpolation)
             self.cr = self.chord_distribution['chord'][0]
             self.ct = self.chord_distribution['chord'][-1]
             self.taper = self.ct/self.cr
@@ -317,24 +559,40 @@ class Wing(object):
             self.chord_distribution = self.__callable_input_allocation(c, self.__yrange, 'chord', self.chord_distribution)
 
         elif ctype == dict:
-            self.chord_distribution = self.__dictionary_input_allocation(c, 'chord', self.chord_distribution)
+            self.chord_distribution = self.__dictionary_input_allocation(c, self.__yrange, 'chord', self.chord_distribution, interpolation=interpolation)
             self.cr = self.chord_distribution['chord'][0]
-            self.ct = self.chord_distribution['chord'][0]
+            self.ct = self.chord_distribution['chord'][-1]
             self.taper = self.ct/self.cr
 
         else:
             raise TypeError("Invalid Input")
 
-        # self.MAC = self.__calculate_MAC(self.chord_distribution['chord'])
+        self.MAC = self.__calculate_MAC(self.chord_distribution['chord'], self.__yrange)
+
+        self.__invalidate('chord')
 
     def set_spanwise_steps(self, n_steps: int):
         self.__span_steps = n_steps
 
     def set_airfoil_steps(self, n_steps: int):
         self.__airfoil_steps = n_steps
+        self.__invalidate('sections')
+
+    def set_dtype(self, dtype):
+        """
+        :param dtype: floating point type of the wing coordinates, np.float32 or np.float64
+        """
+
+        dtype = np.dtype(dtype)
+        if dtype.kind != 'f':
+            raise TypeError(f"Expected a floating point type, got {dtype} instead")
+
+        self.dtype = dtype
+        self.__invalidate('sections')
 
     def set_cosine_spacing(self, b: bool):
         self.__cosine_spacing = b
+        self.__invalidate('sections')
 
     """
     Once all desired variables are defined, the wing will have to be 'assembled'. 
@@ -342,108 +600,293 @@ class Wing(object):
     """
 
     @staticmethod
-    def __get_current_airfoil(airfoil_distribution: dict, yi: int or float, span: int or float, steps: int, cosine_spacing: bool):
+    def __get_airfoil_stations(airfoil_distribution: dict, y: np.ndarray, steps: int, cosine_spacing: bool, dtype=np.float64):
+        """
+        Locate every span station between the airfoil knots. Each distinct airfoil is looked up once, all of them
+        are sampled at the same number of points so their coordinates can be blended point by point.
+        :return: the knot before every station, the fraction of the way to the next knot (zero for 'step'
+                 interpolation and outside the knots), an (n_airfoils, n_points, 2) array with the unit-chord
+                 coordinates of the distinct airfoils, and the index into it of the airfoil at every knot
+        """
 
-        for foil, distr in airfoil_distribution.items():
-            if distr[0] <= yi/span <= distr[1]:
-                if foil[:4].lower() == 'naca':
-                    if ' ' in foil:
-                        code = foil.split(' ')[1]
+        knots = airfoil_distribution['y']
+        names = list(dict.fromkeys(airfoil_distribution['airfoil']))
+        labels = np.array([names.index(name) for name in airfoil_distribution['airfoil']])
 
-                    else:
-                        code = foil[4:]
+        airfoils = np.empty((len(names), 2*steps, 2), dtype=dtype)
 
-                    if len(code) == 4:
-                        coordinates = FourDigitNACA(code, 1).get_coordinates()
+        for idx, name in enumerate(names):
+            coordinates = SECTION_CACHE.get(name, steps, cosine_spacing=cosine_spacing, dtype=dtype)
+            airfoils[idx, :, 0] = coordinates['x']
+            airfoils[idx, :, 1] = coordinates['z']
 
-                    elif len(code) == 5:
-                        coordinates = FiveDigitNACA(code, 1).get_coordinates()
+        segment = np.clip(np.searchsorted(knots, y, side='right') - 1, 0, len(knots) - 1)
+        fraction = np.zeros(y.shape)
 
-                    else:
-                        coordinates = LoadedAirfoil(foil, 1).load_coordinates(cosine_spacing=cosine_spacing, n=steps)
+        if airfoil_distribution['interpolation'] == 'linear' and len(knots) > 1:
+            inner = segment < len(knots) - 1
+            left, right = knots[segment[inner]], knots[segment[inner] + 1]
+            fraction[inner] = np.clip((y[inner] - left)/(right - left), 0, 1)
 
-                else:
-                    coordinates = LoadedAirfoil(foil, 1).load_coordinates(cosine_spacing=cosine_spacing, n=steps)
+        return segment, fraction, airfoils, labels
+
+    def __invalidate(self, stage: str):
+        """
+        Mark a construction stage, and with it every stage after it, as out of date.
+        """
+        self.__dirty_stage = min(self.__dirty_stage, self.__STAGES.index(stage))
 
-                return coordinates
+    @instrumented('Wing.sections')
+    def __load_sections(self, _=None):
+        """
+        Unit-chord airfoil coordinates of every station, shape (n_span, n_points, 2).
+        """
+        return self.__unit_sections(np.asarray(self.__yrange, dtype=float))
 
-        raise ValueError("Could not locate position along wing")
+    def __unit_sections(self, y: np.ndarray):
+        """
+        Unit-chord airfoil coordinates at the given span coordinates, shape (len(y), n_points, 2).
+        """
 
-    def __create_initial_wing(self):
+        segment, fraction, airfoils, labels = self.__get_airfoil_stations(self.airfoil_distribution, y,
+                                                                          cosine_spacing=self.__cosine_spacing,
+                                                                          steps=self.__airfoil_steps, dtype=self.dtype)
 
-        data = {}
+        sections = np.empty((len(y), airfoils.shape[1], 2), dtype=self.dtype)
+        fraction = fraction.astype(self.dtype)
 
-        for yi, ci in zip(self.__yrange, self.chord_distribution['chord']):
-            data[yi] = self.__get_current_airfoil(self.airfoil_distribution, yi, self.b, cosine_spacing=self.__cosine_spacing, steps=self.__airfoil_steps)
-            data[yi]['x'] = data[yi]['x']*-ci
-            data[yi]['z'] = data[yi]['z']*ci
+        # The stations between two knots are blended in one go, every element as start + fraction*(end - start),
+        # so a station comes out the same whichever block of the span it is built in
+        for knot in np.unique(segment):
+            rows = np.flatnonzero(segment == knot)
+            if rows[-1] - rows[0] + 1 == len(rows):
+                rows = slice(rows[0], rows[-1] + 1)
 
-        self.data_container.set_data(data)
+            start = airfoils[labels[knot]]
 
-    def __shift_wing_horizontally(self, percent_chord: float = 0.25):
+            if not np.any(fraction[rows]):
+                sections[rows] = start
+                continue
 
-        data = self.data_container.get_dictionary()
+            difference = airfoils[labels[knot + 1]] - start
 
-        for (yi, values), ci in zip(data.items(), self.chord_distribution['chord']):
+            if isinstance(rows, slice):
+                np.multiply(fraction[rows, None, None], difference, out=sections[rows])
+                sections[rows] += start
 
-            data[yi]['x'] += ci*percent_chord
+            else:
+                sections[rows] = fraction[rows, None, None]*difference + start
 
-        self.data_container.set_data(data)
+        return sections
 
-    def __apply_twist(self):
+    @instrumented('Wing.chord')
+    def __scale_sections(self, sections: np.ndarray):
+        """
+        Scale the unit-chord sections with the chord distribution and place them along the span.
+        """
 
-        T = lambda theta: np.array([[np.cos(theta), -np.sin(theta)],
-                                    [np.sin(theta), np.cos(theta)]])
+        return scale_sections(sections, self.__yrange, self.chord_distribution['chord'])
 
-        data = self.data_container.get_dictionary()
+    @instrumented('Wing.shift')
+    def __shift_wing_horizontally(self, data: np.ndarray, percent_chord: float = 0.25):
 
-        for (yi, values), ti in zip(data.items(), self.twist_distribution['twist']):
+        shift_sections(data, self.chord_distribution['chord'], percent_chord)
 
-            v = np.matmul(T(np.deg2rad(ti)), np.array([values['x'], values['z']]))
-            data[yi]['x'] = v[0, :]
-            data[yi]['z'] = v[1, :]
+        return data
 
-        self.data_container.set_data(data)
+    @instrumented('Wing.twist')
+    def __apply_twist(self, data: np.ndarray):
 
-    def __apply_sweep(self):
+        if self.twist_distribution is None:
+            return data
 
-        data = self.data_container.get_dictionary()
-        delta_x = 0
+        apply_twist(data, np.asarray(self.twist_distribution['twist'], dtype=float))
 
-        keys = list(data.keys())
+        return data
 
-        for (idx, key), alpha in zip(enumerate(keys[:-1]), self.sweep_distribution['sweep']):
+    @instrumented('Wing.sweep')
+    def __apply_sweep(self, data: np.ndarray):
 
-            delta_x = delta_x + (keys[idx+1] - key)*np.tan(np.deg2rad(alpha))
+        if self.sweep_distribution is None:
+            return data
 
-            data[keys[idx+1]]['x'] -= delta_x
+        apply_sweep(data, self.__yrange, np.asarray(self.sweep_distribution['sweep'], dtype=float))
 
-        self.data_container.set_data(data)
+        return data
 
-    def __apply_dihedral(self):
+    @instrumented('Wing.dihedral')
+    def __apply_dihedral(self, data: np.ndarray):
 
-        data = self.data_container.get_dictionary()
-        delta_z = 0
+        if self.dihedral_distribution is None:
+            return data
 
-        keys = list(data.keys())
+        apply_dihedral(data, self.__yrange, np.asarray(self.dihedral_distribution['dihedral'], dtype=float))
 
-        for (idx, key), alpha in zip(enumerate(keys[:-1]), self.dihedral_distribution['dihedral']):
-            delta_z = delta_z + (keys[idx + 1] - key) * np.tan(np.deg2rad(alpha))
+        return data
 
-            data[keys[idx + 1]]['z'] += delta_z
+    @contextmanager
+    def profile(self, memory: bool = True):
+        """
+        Record the wall time, number of calls and peak memory of every pipeline stage called within the block,
+        including the airfoil stages. Afterwards the statistics are stored in profile_report:
 
-        self.data_container.set_data(data)
+            with wing.profile():
+                wing.construct()
+            print(ProfilingTool.format_report(wing.profile_report))
 
+        :param memory: whether to trace the peak memory of every stage, which slows down the stages considerably
+        """
+
+        with record(memory=memory) as recorder:
+            try:
+                yield recorder
+
+            finally:
+                self.profile_report = recorder.report()
+
+    @instrumented('Wing.construct')
     def construct(self):
+        """
+        Calculate the 3D coordinates of the wing. The unit-chord sections and the scaled and shifted sections
+        are cached, so only the stages affected by the setters called since the previous construction are
+        recomputed. The twist, sweep and dihedral stages are applied in place on one copy of the shifted sections,
+        which becomes the data of the storage.
+        """
+
+        stage_functions = {
+            'sections': self.__load_sections,
+            'chord': self.__scale_sections,
+            'shift': self.__shift_wing_horizontally,
+            'twist': self.__apply_twist,
+            'sweep': self.__apply_sweep,
+            'dihedral': self.__apply_dihedral
+        }
 
-        self.__create_initial_wing()
-        self.__shift_wing_horizontally(percent_chord=0.25)
+        if self.__dirty_stage < len(self.__STAGES):
 
-        while self.transformation_order:
-            self.transformation_order.pop()()
+            # Restart from the last cached stage before the first one that is out of date
+            cached = [self.__STAGES.index(stage) for stage in self.__CACHED_STAGES
+                      if self.__STAGES.index(stage) < self.__dirty_stage and stage in self.__stage_data]
+            restart = max(cached, default=-1)
+            data = self.__stage_data[self.__STAGES[restart]] if restart >= 0 else None
+
+            for stage in self.__STAGES[restart + 1:]:
+                # The cached sections are only read by the chord stage, every later stage would overwrite its input
+                if stage not in ('sections', 'chord') and any(data is self.__stage_data.get(name)
+                                                             for name in self.__CACHED_STAGES):
+                    data = data.copy()
+
+                data = stage_functions[stage](data)
+
+                if stage in self.__CACHED_STAGES:
+                    self.__stage_data[stage] = data
+
+            self.__dirty_stage = len(self.__STAGES)
+            self.data_container.set_data(data)
 
         # self.__shift_wing_horizontally(percent_chord=-0.25)
 
+    def iter_sections(self, chunk: int = 256):
+        """
+        Construct the wing block by block along the span, so only one block of sections is in memory at a time.
+        The blocks hold the same coordinates as construct() produces, in the same order: sorted along the span.
+        Sweep and dihedral offsets accumulate along the span discretization as given, like in construct().
+        Nothing is cached and the data container is left untouched.
+        :param chunk: number of span stations per block
+        :return: generator of coordinate blocks, shape (n_stations, n_points, 3)
+        """
+
+        if chunk < 1:
+            raise ValueError(f"Expected a positive chunk size, got {chunk}")
+
+        y = np.asarray(self.__yrange, dtype=float)
+        distribution = lambda d, key: None if d is None else np.asarray(d[key], dtype=float)
+
+        chord = distribution(self.chord_distribution, 'chord')
+        twist = distribution(self.twist_distribution, 'twist')
+        sweep = distribution(self.sweep_distribution, 'sweep')
+        dihedral = distribution(self.dihedral_distribution, 'dihedral')
+
+        # Offsets are a single value per station, so they are calculated for the whole span at once
+        sweep_offsets = None if sweep is None else span_offsets(y, sweep)
+        dihedral_offsets = None if dihedral is None else span_offsets(y, dihedral)
+
+        # The stations in the order DataStorage sorts the constructed sections in
+        order = np.argsort(y.astype(self.dtype), kind='stable')
+
+        for start in range(0, len(y), chunk):
+            block = order[start:start + chunk]
+
+            data = scale_sections(self.__unit_sections(y[block]), y[block], chord[block])
+            shift_sections(data, chord[block], 0.25)
+
+            if twist is not None:
+                apply_twist(data, twist[block])
+
+            if sweep_offsets is not None:
+                data[..., 0] -= sweep_offsets[block, None]
+
+            if dihedral_offsets is not None:
+                data[..., 2] += dihedral_offsets[block, None]
+
+            yield data
+
+    @instrumented('Wing.compile')
+    def compile(self):
+        """
+        Compile the current configuration into a ConstructionPlan, which can be executed many times with
+        different chord, twist, sweep and dihedral distributions without touching this wing.
+        """
+
+        if self.__dirty_stage == 0 or 'sections' not in self.__stage_data:
+            self.__stage_data['sections'] = self.__load_sections()
+            self.__dirty_stage = max(self.__dirty_stage, 1)
+
+        distribution = lambda d, key: None if d is None else np.array(d[key], dtype=float)
+
+        return ConstructionPlan(self.__stage_data['sections'], self.__yrange,
+                                chord=distribution(self.chord_distribution, 'chord'),
+                                twist=distribution(self.twist_distribution, 'twist'),
+                                sweep=distribution(self.sweep_distribution, 'sweep'),
+                                dihedral=distribution(self.dihedral_distribution, 'dihedral'))
+
+    @instrumented('Wing.export_mesh')
+    def export_mesh(self, path: str, file_format: str = None, chunk: int = 256):
+        """
+        Write the wing surface, closed at the root and tip, to a triangle mesh file.
+        :param path: file to write to
+        :param file_format: 'stl' for binary STL or 'ply' for an indexed binary PLY mesh, defaults to the file extension
+        :param chunk: number of span stations triangulated at a time
+        :return: number of triangles written
+        """
+
+        file_format = (path.rsplit('.', 1)[-1] if file_format is None else file_format).lower()
+
+        if file_format not in ('stl', 'ply'):
+            raise ValueError(f"Unknown mesh format '{file_format}', choose from 'stl' or 'ply'")
+
+        # The sections are generated and written one block at a time, so the whole wing is never held in memory
+        if file_format == 'stl':
+            return write_stl(path, self.iter_sections(chunk), chunk=chunk)
+
+        return write_ply(path, self.iter_sections(chunk), chunk=chunk)[1]
+
+    def metrics(self, method: str = 'simpson'):
+        """
+        Span, planform area, mean aerodynamic chord and its leading edge position, aspect ratio, volume and wetted
+        area of the constructed wing, see MetricsTool.wing_metrics. Also updates MAC and x_LEMAC.
+        :param method: spanwise quadrature, 'simpson' or 'trapezoid'
+        :return: dictionary of floats
+        """
+
+        self.construct()
+        metrics = {key: float(value) for key, value in wing_metrics(self.data_container.get_sections(), method).items()}
+
+        self.MAC = metrics['MAC']
+        self.x_LEMAC = metrics['x_LEMAC']
+
+        return metrics
+
     @staticmethod
     def axisEqual3D(ax):
         """
@@ -461,6 +904,10 @@ class Wing(object):
 
     def plot_wing(self, fig=None):
 
+        # Plotting libraries are only imported when needed, to keep importing this module cheap
+        import matplotlib.pyplot as plt
+        from mpl_toolkits.mplot3d import Axes3D
+
         fig = plt.figure() if fig is None else fig
         ax = fig.add_subplot(111, projection='3d')
         arr = self.data_container.get_array()
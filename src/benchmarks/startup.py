@@ -0,0 +1,72 @@
+"""
+Startup benchmark: measures how long a fresh interpreter takes to import backend.WingTool.
+
+Three scenarios are timed, each in its own short-lived process:
+    - interpreter:  bare interpreter startup, the floor for every other number
+    - lazy import:  'import backend.WingTool' as it is now
+    - eager import: the same import plus everything the backend used to do at import time: importing
+                    matplotlib, pandas and scipy.interpolate, and scanning the airfoil database. This reproduces
+                    the import cost from before the airfoil registry became lazy.
+
+Run from the src folder:
+    python -m benchmarks.startup --repeat 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+SRC_FOLDER = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+SCENARIOS = {
+    'interpreter': "pass",
+    'lazy import': "import backend.WingTool",
+    'eager import': "import matplotlib.pyplot, mpl_toolkits.mplot3d, pandas, scipy.interpolate; "
+                    "import backend.WingTool, backend.AirFoilTool as A; A.AIRFOILS",
+}
+
+
+def time_process(code: str):
+    """
+    Wall time of a fresh interpreter running the given code, in seconds.
+    """
+
+    env = dict(os.environ, MPLBACKEND='Agg')
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=SRC_FOLDER, env=env, check=True)
+
+    return time.perf_counter() - start
+
+
+def run(repeat: int = 10):
+    """
+    Time every scenario a number of times.
+    :return: dictionary with the scenario names as keys and lists of wall times as values
+    """
+
+    results = {name: [] for name in SCENARIOS}
+
+    # Interleave the scenarios, so disk caches and background load affect them equally
+    for _ in range(repeat):
+        for name, code in SCENARIOS.items():
+            results[name].append(time_process(code))
+
+    return results
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Measure the import cost of backend.WingTool in fresh processes")
+    parser.add_argument('--repeat', type=int, default=10, help="number of processes per scenario")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    floor = statistics.median(results['interpreter'])
+
+    print(f"{'scenario':<14}{'median [ms]':>14}{'min [ms]':>12}{'import only [ms]':>20}")
+    for name, times in results.items():
+        median = statistics.median(times)
+        print(f"{name:<14}{median * 1e3:>14.1f}{min(times) * 1e3:>12.1f}{(median - floor) * 1e3:>20.1f}")
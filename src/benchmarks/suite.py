@@ -0,0 +1,363 @@
+"""
+Benchmark suite for the geometry pipeline. Runs without a display.
+
+Every case is timed like timeit does it: the number of calls per measurement is calibrated until a measurement
+takes at least --min-time seconds, and the measurement is repeated --repeat times. The per-call times are reported.
+
+Cases:
+    - naca:         analytic NACA airfoil generation, by number of points
+    - naca_family:  vectorized generation of many NACA airfoils at once, by family size
+    - loaded:       loading a database airfoil and resampling it, by number of points, with cold and warm caches
+    - spline:       spline_coordinate_calculation on coordinates that are already loaded, by number of points,
+                    with cold and warm caches
+    - construct:    a full Wing.construct with a warm section cache, by span stations and airfoil points
+    - storage:      DataStorage conversions between the (n_span, n_points, 3) array, the dict and the flat array
+    - export:       streaming STL and PLY export of a constructed wing
+
+Run from the src folder:
+    python -m benchmarks.suite --output run.json
+    python -m benchmarks.suite --output new.json --compare run.json --threshold 0.1
+    python -m benchmarks.suite --history ../benchmark_history --threshold 0.1
+
+With --history, the run is compared against the most recent run in the folder and then stored there as well.
+The exit code is 1 when a case got slower than the threshold allows.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Nothing is plotted, but make sure nothing would try to open a window either
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy as np
+
+from backend.AirFoilTool import AirFoil, FourDigitNACA, LoadedAirfoil, naca_family, SECTION_CACHE
+from backend.AirfoilDatabase import REGISTRY, get_pack, read_processed_file
+from backend.MeshTool import write_ply, write_stl
+from backend.SplineTool import RESAMPLER
+from backend.WingTool import DataStorage, Wing
+
+
+SRC_FOLDER = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+LOADED_AIRFOIL = 'e1213'
+
+
+def make_wing(span_steps: int, airfoil_steps: int, airfoil: str = 'naca2412'):
+    """
+    Tapered, swept, twisted wing with dihedral, so every construction stage does work.
+    """
+
+    wing = Wing()
+    wing.set_span_discretization(np.linspace(0, 20, span_steps))
+    wing.set_chord(lambda y: 3 - 0.1*y)
+    wing.set_sweep(lambda y: 30 - y)
+    wing.set_dihedral(5)
+    wing.set_twist(lambda y: 2 - 0.3*y)
+    wing.set_airfoil(airfoil)
+    wing.set_airfoil_steps(airfoil_steps)
+
+    return wing
+
+
+def case_naca(n: int):
+    foil = FourDigitNACA('2412', 1.0)
+
+    return lambda: foil.load_coordinates(cosine_spacing=True, n=n)
+
+
+def case_naca_family(size: int):
+    rng = np.random.default_rng(0)
+    m, p, t = rng.uniform(0, 0.09, size), rng.uniform(0.1, 0.9, size), rng.uniform(0.06, 0.3, size)
+
+    return lambda: naca_family(m=m, p=p, t=t, n=50, cosine_spacing=True)
+
+
+def clear_caches():
+    SECTION_CACHE.clear()
+    RESAMPLER.clear()
+
+
+def case_loaded(n: int, cache: str):
+    def run():
+        # A cold call fits the splines and builds the basis matrices again, a warm call reuses them
+        if cache == 'cold':
+            clear_caches()
+        LoadedAirfoil(LOADED_AIRFOIL).load_coordinates(cosine_spacing=True, n=n)
+
+    return run
+
+
+def case_spline(n: int, cache: str):
+    pack = get_pack()
+    coordinates = np.array(pack[LOADED_AIRFOIL]) if pack is not None else read_processed_file(REGISTRY.path(LOADED_AIRFOIL))
+    foil = AirFoil(1.0)
+
+    def run():
+        if cache == 'cold':
+            clear_caches()
+        # spline_coordinate_calculation replaces the coordinates, so restore the originals on every call
+        foil.coordinates = {'x': coordinates[:, 0], 'z': coordinates[:, 1]}
+        foil.spline_coordinate_calculation('cosine', n=n)
+
+    return run
+
+
+def case_construct(span_steps: int, airfoil_steps: int):
+    wing = make_wing(span_steps, airfoil_steps)
+    y = np.linspace(0, 20, span_steps)
+
+    def run():
+        # Setting the span discretization invalidates every stage, so each call is a full construction
+        wing.set_span_discretization(y)
+        wing.construct()
+
+    return run
+
+
+def case_storage(conversion: str, span_steps: int = 1000, airfoil_steps: int = 100):
+    wing = make_wing(span_steps, airfoil_steps)
+    wing.construct()
+    storage = wing.data_container
+
+    # Dictionaries hold views on the storage, copy them so set_data does real work
+    dictionary = {yi: {'x': np.array(s['x']), 'z': np.array(s['z'])} for yi, s in storage.get_dictionary().items()}
+
+    conversions = {
+        'set_sections': lambda: DataStorage().set_data(storage.get_sections()),
+        'set_array': lambda: DataStorage().set_data(storage.get_array()),
+        'set_dictionary': lambda: DataStorage().set_data(dictionary),
+        'get_array': storage.get_array,
+        'get_dictionary': storage.get_dictionary,
+    }
+
+    return conversions[conversion]
+
+
+def case_export(file_format: str, span_steps: int = 1000, airfoil_steps: int = 100):
+    wing = make_wing(span_steps, airfoil_steps)
+    wing.construct()
+    sections = wing.data_container.get_sections()
+    writer = {'stl': write_stl, 'ply': write_ply}[file_format]
+    path = os.path.join(tempfile.mkdtemp(), f'wing.{file_format}')
+
+    return lambda: writer(path, sections)
+
+
+CASES = {
+    'naca': (case_naca, [{'n': n} for n in (25, 100, 400, 1600)]),
+    'naca_family': (case_naca_family, [{'size': size} for size in (10, 1000, 10000)]),
+    'loaded': (case_loaded, [{'n': n, 'cache': c} for n in (25, 100, 400) for c in ('cold', 'warm')]),
+    'spline': (case_spline, [{'n': n, 'cache': c} for n in (25, 100, 400) for c in ('cold', 'warm')]),
+    'construct': (case_construct, [{'span_steps': s, 'airfoil_steps': a} for s in (25, 250, 2500) for a in (25, 100)]),
+    'storage': (case_storage, [{'conversion': c} for c in ('set_sections', 'set_array', 'set_dictionary',
+                                                            'get_array', 'get_dictionary')]),
+    'export': (case_export, [{'file_format': f} for f in ('stl', 'ply')]),
+}
+
+# Smaller parameter sets for a quick check
+QUICK = {
+    'naca_family': [{'size': 1000}],
+    'loaded': [{'n': 100, 'cache': 'cold'}, {'n': 100, 'cache': 'warm'}],
+    'spline': [{'n': 100, 'cache': 'cold'}, {'n': 100, 'cache': 'warm'}],
+    'construct': [{'span_steps': 25, 'airfoil_steps': 25}, {'span_steps': 250, 'airfoil_steps': 100}],
+}
+
+
+def case_name(family: str, params: dict):
+    return family + ''.join(f"[{key}={value}]" for key, value in params.items())
+
+
+def measure(function: callable, repeat: int = 5, min_time: float = 0.2):
+    """
+    Time a function: calibrate how many calls fill min_time seconds, then time that many calls repeat times.
+    :return: dictionary with the number of calls per measurement and per-call statistics in seconds
+    """
+
+    function()
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+
+        if elapsed >= min_time or number >= 1e6:
+            break
+
+        number *= 10 if elapsed < min_time/10 else 2
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start)/number)
+
+    return {
+        'number': number,
+        'repeat': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+        'stdev': statistics.stdev(times) if repeat > 1 else 0.0,
+    }
+
+
+def environment():
+    """
+    Description of the machine and software a run was made on, so runs can be matched up later.
+    """
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=SRC_FOLDER, capture_output=True,
+                                text=True, check=True).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    try:
+        import scipy
+        scipy_version = scipy.__version__
+
+    except ImportError:
+        scipy_version = None
+
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'numpy': np.__version__,
+        'scipy': scipy_version,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'airfoil_pack': get_pack() is not None,
+    }
+
+
+def run(families: list = None, repeat: int = 5, min_time: float = 0.2, quick: bool = False, verbose: bool = True):
+    """
+    Run the benchmark cases.
+    :param families: names of the case families to run, defaults to all of them
+    :param repeat: number of measurements per case
+    :param min_time: minimum duration of a single measurement in seconds
+    :param quick: use the reduced parameter sets
+    :param verbose: print every case as it finishes
+    :return: dictionary with the environment and the results of every case
+    """
+
+    results = {}
+
+    for family in CASES if families is None else families:
+        factory, parameter_sets = CASES[family]
+        parameter_sets = QUICK.get(family, parameter_sets[:1]) if quick else parameter_sets
+
+        for params in parameter_sets:
+            clear_caches()
+
+            result = measure(factory(**params), repeat=repeat, min_time=min_time)
+            result.update(family=family, params=params)
+            results[case_name(family, params)] = result
+
+            if verbose:
+                print(f"{case_name(family, params):<60}{result['median'] * 1e3:>12.4f} ms", flush=True)
+
+    return {'environment': environment(), 'results': results}
+
+
+def latest_run(folder: str):
+    """
+    Path of the most recent run stored in a history folder, or None if it is empty.
+    """
+
+    if not os.path.isdir(folder):
+        return None
+
+    runs = sorted(file for file in os.listdir(folder) if file.endswith('.json'))
+
+    return os.path.join(folder, runs[-1]) if runs else None
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1):
+    """
+    Compare the median times of two runs, case by case.
+    :param baseline: earlier run, as returned by run()
+    :param current: new run
+    :param threshold: relative slowdown above which a case counts as a regression, 0.1 is 10% slower
+    :return: list of (case, baseline median, current median, ratio, regressed) tuples for the cases in both runs
+    """
+
+    rows = []
+
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+
+        old, new = baseline['results'][name]['median'], result['median']
+        ratio = new/old if old > 0 else float('inf')
+        rows.append((name, old, new, ratio, ratio > 1 + threshold))
+
+    return rows
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Benchmark the geometry pipeline")
+    parser.add_argument('cases', nargs='*', metavar='case',
+                        help=f"case families to run, from {', '.join(CASES)}. Defaults to all of them.")
+    parser.add_argument('--repeat', type=int, default=5, help="number of measurements per case")
+    parser.add_argument('--min-time', type=float, default=0.2, help="minimum duration of a measurement in seconds")
+    parser.add_argument('--quick', action='store_true', help="run a reduced set of parameters")
+    parser.add_argument('--output', help="file to write the results to")
+    parser.add_argument('--compare', help="earlier results to compare against, a file or a history folder")
+    parser.add_argument('--history', help="history folder: compare against its latest run, then store this run in it")
+    parser.add_argument('--threshold', type=float, default=0.1, help="relative slowdown counted as a regression")
+    args = parser.parse_args()
+
+    unknown = [case for case in args.cases if case not in CASES]
+    if unknown:
+        parser.error(f"unknown case families: {', '.join(unknown)}")
+
+    current = run(args.cases or None, repeat=args.repeat, min_time=args.min_time, quick=args.quick)
+
+    # The baseline is looked up before this run is added to the history
+    baseline_path = args.compare if args.compare is not None else args.history
+    if baseline_path is not None and (os.path.isdir(baseline_path) or baseline_path == args.history):
+        baseline_path = latest_run(baseline_path)
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(current, file, indent=2)
+
+    if args.history is not None:
+        os.makedirs(args.history, exist_ok=True)
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S')
+        with open(os.path.join(args.history, f'{stamp}.json'), 'w') as file:
+            json.dump(current, file, indent=2)
+
+    regressions = 0
+
+    if baseline_path is not None:
+        with open(baseline_path, 'r') as file:
+            baseline = json.load(file)
+
+        print(f"\nCompared to {baseline_path} ({baseline['environment'].get('commit')}, "
+              f"{baseline['environment'].get('timestamp')}), threshold {args.threshold:.0%}:")
+        print(f"{'case':<60}{'before [ms]':>14}{'after [ms]':>14}{'ratio':>8}")
+
+        for name, old, new, ratio, regressed in compare(baseline, current, args.threshold):
+            regressions += regressed
+            print(f"{name:<60}{old * 1e3:>14.4f}{new * 1e3:>14.4f}{ratio:>8.2f}{'  REGRESSION' if regressed else ''}")
+
+    sys.exit(1 if regressions else 0)
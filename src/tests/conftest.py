@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend is imported as a top level package from the src folder, like main.py does it
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
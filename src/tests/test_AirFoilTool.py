@@ -0,0 +1,177 @@
+import math
+import numpy as np
+import pytest
+from backend.AirFoilTool import FiveDigitNACA, FourDigitNACA, create_airfoil, five_digit_camber, fivedigit_coefficients, \
+    four_digit_camber, naca_family
+
+
+def scalar_naca(code: str, x: float):
+    """
+    Upper and lower surface point of a NACA airfoil with unit chord at one chordwise station, written out point
+    by point from the textbook equations.
+    """
+
+    t = int(code[-2:])/100
+    yt = 5*t*(0.2969*math.sqrt(x) - 0.1260*x - 0.3515*x**2 + 0.2843*x**3 - 0.1015*x**4)
+
+    if len(code) == 4:
+        m, p = int(code[0])/100, int(code[1])/10
+
+        if m == 0:
+            yc, slope = 0.0, 0.0
+        elif x <= p:
+            yc, slope = m/p**2*(2*p*x - x**2), 2*m/p**2*(p - x)
+        else:
+            yc, slope = m/(1 - p)**2*(1 - 2*p + 2*p*x - x**2), 2*m/(1 - p)**2*(p - x)
+
+    else:
+        coefficients = fivedigit_coefficients()[code[:3]]
+        r, k1 = coefficients['m'], coefficients['k1']
+
+        if x < r:
+            yc, slope = k1/6*(x**3 - 3*r*x**2 + r**2*(3 - r)*x), k1/6*(3*x**2 - 6*r*x + r**2*(3 - r))
+        else:
+            yc, slope = k1*r**3/6*(1 - x), -k1*r**3/6
+
+    theta = math.atan(slope)
+
+    return (x - yt*math.sin(theta), yc + yt*math.cos(theta)), (x + yt*math.sin(theta), yc - yt*math.cos(theta))
+
+
+@pytest.mark.parametrize('airfoil', [FourDigitNACA('0012', 1.0), FourDigitNACA('2412', 1.0),
+                                     FourDigitNACA('6409', 1.0), FiveDigitNACA('23012', 1.0),
+                                     FiveDigitNACA('21018', 1.0)])
+@pytest.mark.parametrize('cosine_spacing', [False, True])
+def test_naca_coordinates_match_the_scalar_equations(airfoil, cosine_spacing):
+    n = 41
+    coordinates = airfoil.load_coordinates(cosine_spacing=cosine_spacing, n=n)
+
+    stations = 0.5*(1 - np.cos(np.linspace(0, np.pi, n))) if cosine_spacing else np.linspace(0, 1, n)
+    upper, lower = zip(*[scalar_naca(airfoil.code, float(x)) for x in stations])
+    expected = np.concatenate((np.array(upper)[::-1], np.array(lower)))
+
+    np.testing.assert_allclose(coordinates['x'], expected[:, 0], rtol=0, atol=1e-12)
+    np.testing.assert_allclose(coordinates['z'], expected[:, 1], rtol=0, atol=1e-12)
+
+
+def test_naca_coordinates_scale_with_the_chord():
+    reference = FourDigitNACA('4415', 1.0).load_coordinates(cosine_spacing=True, n=30)
+    scaled = FourDigitNACA('4415', 2.5).load_coordinates(cosine_spacing=True, n=30)
+
+    np.testing.assert_allclose(scaled['x'], 2.5*reference['x'], rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(scaled['z'], 2.5*reference['z'], rtol=1e-12, atol=1e-15)
+
+
+def test_single_precision_naca_coordinates():
+    reference = FiveDigitNACA('23015', 1.0).load_coordinates(n=30)
+    single = FiveDigitNACA('23015', 1.0, dtype=np.float32).load_coordinates(n=30)
+
+    assert single['x'].dtype == np.float32 and single['z'].dtype == np.float32
+    np.testing.assert_allclose(single['z'], reference['z'], rtol=0, atol=1e-7)
+
+
+def central_difference(camber: callable, x: np.ndarray, h: float = 1e-6):
+    return (camber(x + h)[0] - camber(x - h)[0])/(2*h)
+
+
+@pytest.mark.parametrize('m, p', [(0.02, 0.4), (0.06, 0.4), (0.04, 0.2), (0.09, 0.7)])
+def test_four_digit_slope_matches_the_camber_line(m, p):
+    # Stations on either side of p, but not on it, where the second derivative jumps
+    x = np.linspace(0.001, 0.999, 101)
+    x = x[np.abs(x - p) > 1e-3]
+
+    _, slope = four_digit_camber(x, m, p)
+
+    np.testing.assert_allclose(slope, central_difference(lambda x: four_digit_camber(x, m, p), x), rtol=0, atol=1e-8)
+
+
+@pytest.mark.parametrize('series', sorted(fivedigit_coefficients()))
+def test_five_digit_slope_matches_the_camber_line(series):
+    coefficients = fivedigit_coefficients()[series]
+    m, k1, k2_k1 = coefficients['m'], coefficients['k1'], coefficients.get('k2_k1', 0.0)
+
+    x = np.linspace(0.001, 0.999, 101)
+    x = x[np.abs(x - m) > 1e-3]
+
+    _, slope = five_digit_camber(x, m, k1, 1, k2_k1)
+    expected = central_difference(lambda x: five_digit_camber(x, m, k1, 1, k2_k1), x)
+
+    np.testing.assert_allclose(slope, expected, rtol=0, atol=1e-6*k1)
+
+
+@pytest.mark.parametrize('series', sorted(fivedigit_coefficients()))
+def test_five_digit_camber_peaks_at_the_tabulated_position(series):
+    coefficients = fivedigit_coefficients()[series]
+    m, k1, k2_k1 = coefficients['m'], coefficients['k1'], coefficients.get('k2_k1', 0.0)
+
+    x = np.linspace(0, 1, 100001)
+    yc, slope = five_digit_camber(x, m, k1, 1, k2_k1)
+
+    # Reflexed and standard camber lines start and end on the chord line and peak at the tabulated position p
+    assert yc[0] == pytest.approx(0, abs=1e-12) and yc[-1] == pytest.approx(0, abs=1e-12)
+    assert x[np.argmax(yc)] == pytest.approx(coefficients['p'], abs=1e-3)
+    assert five_digit_camber(coefficients['p'], m, k1, 1, k2_k1)[1] == pytest.approx(0, abs=0.01)
+
+    if k2_k1:
+        # The reflexed camber line turns upwards again towards the trailing edge
+        assert slope[-1] > slope[np.searchsorted(x, 0.8)]
+
+
+def test_reflexed_camber_values():
+    # Reflexed 5-digit camber line ordinates, written out from the equations with the tabulated 231 coefficients
+    m, k1, k2_k1 = 0.217, 15.793, 0.00677
+    x = np.array([0.05, 0.15, 0.5, 0.9])
+
+    front = k1/6*((x - m)**3 - k2_k1*(1 - m)**3*x - m**3*x + m**3)
+    rear = k1/6*(k2_k1*(x - m)**3 - k2_k1*(1 - m)**3*x - m**3*x + m**3)
+
+    yc, _ = five_digit_camber(x, m, k1, 1, k2_k1)
+
+    np.testing.assert_allclose(yc, np.where(x < m, front, rear), rtol=1e-12)
+
+
+def test_user_supplied_camber_line_uses_a_numerical_slope():
+    camber = lambda x: 0.02*np.sin(np.pi*x)
+    coordinates = FourDigitNACA('0012', 1.0, camber=camber).load_coordinates(n=21)
+
+    x = np.linspace(0, 1, 21)
+    yt = 0.6*(0.2969*np.sqrt(x) - 0.1260*x - 0.3515*x**2 + 0.2843*x**3 - 0.1015*x**4)
+    theta = np.arctan(0.02*np.pi*np.cos(np.pi*x))
+
+    np.testing.assert_allclose(coordinates['z'][21:], camber(x) - yt*np.cos(theta), rtol=0, atol=1e-5)
+
+
+@pytest.mark.parametrize('cosine_spacing', [False, True])
+def test_naca_family_matches_the_airfoil_objects(cosine_spacing):
+    codes = ['0012', '2412', '4415', '6409', '23012', '21018', '23112', '25115']
+
+    family = naca_family(codes, n=40, cosine_spacing=cosine_spacing, chord=2.0)
+
+    assert family.shape == (len(codes), 80, 2) and family.flags['C_CONTIGUOUS']
+
+    for code, coordinates in zip(codes, family):
+        reference = create_airfoil(f"naca{code}", 2.0).load_coordinates(cosine_spacing=cosine_spacing, n=40)
+
+        np.testing.assert_allclose(coordinates[:, 0], reference['x'], rtol=0, atol=1e-13)
+        np.testing.assert_allclose(coordinates[:, 1], reference['z'], rtol=0, atol=1e-13)
+
+
+def test_naca_family_from_parameters_matches_the_codes():
+    m, p, t = np.meshgrid([0, 0.02, 0.06], [0.2, 0.4], [0.09, 0.12, 0.24], indexing='ij')
+    codes = [f"{round(mi*100)}{round(pi*10)}{round(ti*100):02d}" for mi, pi, ti in zip(m.ravel(), p.ravel(), t.ravel())]
+
+    np.testing.assert_allclose(naca_family(m=m.ravel(), p=p.ravel(), t=t.ravel(), n=30),
+                               naca_family(codes, n=30), rtol=0, atol=1e-15)
+
+
+def test_naca_family_dtype_and_invalid_codes():
+    assert naca_family(['2412'], n=10, dtype=np.float32).dtype == np.float32
+
+    with pytest.raises(ValueError):
+        naca_family(['241'])
+
+    with pytest.raises(TypeError):
+        naca_family(['24a2'])
+
+    with pytest.raises(ValueError):
+        naca_family(['26012'])
@@ -0,0 +1,56 @@
+import numpy as np
+from backend.AirfoilConverter import convert_file, parse_airfoil
+from backend.AirfoilDatabase import read_processed_file
+
+
+NACA_WITH_FOOTER = """NACA 2412
+1.0000     0.0013
+0.5000     0.0700
+0.1000     0.0500
+0.0000     0.0000
+0.1000    -0.0300
+0.5000    -0.0300
+1.0000     (-0.0013)
+100.00     0.0000
+"""
+
+
+def test_footer_is_not_a_point(tmp_path):
+    raw_file = tmp_path / 'naca2412.dat'
+    raw_file.write_text(NACA_WITH_FOOTER)
+
+    record = convert_file(str(raw_file), str(tmp_path))
+    coordinates = read_processed_file(str(tmp_path / 'naca2412.txt'))
+
+    assert record['title'] == 'NACA 2412'
+    assert len(coordinates) == 7
+    assert coordinates[:, 0].min() == 0 and coordinates[:, 0].max() == 1
+    np.testing.assert_array_equal(coordinates, record['coordinates'])
+
+
+def test_bracketed_trailing_edge_point_is_kept(tmp_path):
+    raw_file = tmp_path / 'naca2412.dat'
+    raw_file.write_text("NACA 2412\n1.0000     ......\n" + NACA_WITH_FOOTER.split('\n', 1)[1])
+
+    coordinates = convert_file(str(raw_file))['coordinates']
+    lower = coordinates[np.argmin(coordinates[:, 0]):]
+
+    assert len(coordinates) == 7
+    assert lower[-1].tolist() == [1.0, -0.0013]
+
+
+def test_processed_file_keeps_bracketed_values(tmp_path):
+    path = tmp_path / 'naca2412.txt'
+    path.write_text("NACA,2412\n1.0000,......\n1.0000,(0.0013)\n0.0000,0.0000\n1.0000,(-0.0013)\n")
+
+    np.testing.assert_array_equal(read_processed_file(str(path)), [[1, 0.0013], [0, 0], [1, -0.0013]])
+
+
+def test_coordinates_in_percent_of_the_chord_are_kept():
+    text = "\n".join(["N64 215 IN PERCENT"] + [f"{x} {z}" for x, z in
+                                                 [(100, 0), (50, 7), (0, 0), (50, -5), (100, 0.5)]])
+
+    _, coordinates, layout = parse_airfoil(text)
+
+    assert layout == 'selig'
+    assert len(coordinates) == 5 and coordinates[:, 0].max() == 100
@@ -0,0 +1,55 @@
+import json
+import os
+import numpy as np
+import pytest
+from backend.AirfoilDatabase import PACK_INDEX, AirfoilPack, write_pack
+
+
+def airfoils(n: int):
+    return {name: np.arange(2*n, dtype=float).reshape(n, 2) + offset for offset, name in enumerate(['a', 'b', 'c'])}
+
+
+def test_pack_round_trip(tmp_path):
+    write_pack(airfoils(5), str(tmp_path))
+
+    pack = AirfoilPack(str(tmp_path))
+
+    assert pack.names() == ['a', 'b', 'c']
+    np.testing.assert_array_equal(pack['b'], airfoils(5)['b'])
+
+
+def test_rewrite_keeps_open_packs_and_previous_data(tmp_path):
+    write_pack(airfoils(5), str(tmp_path))
+    with open(tmp_path / PACK_INDEX) as file:
+        old_index = file.read()
+
+    old = AirfoilPack(str(tmp_path))
+    write_pack(airfoils(7), str(tmp_path))
+
+    new = AirfoilPack(str(tmp_path))
+    np.testing.assert_array_equal(new['c'], airfoils(7)['c'])
+    np.testing.assert_array_equal(old['c'], airfoils(5)['c'])
+
+    # A reader which read the index just before it was replaced still finds the data that index points to
+    (tmp_path / PACK_INDEX).write_text(old_index)
+    np.testing.assert_array_equal(AirfoilPack(str(tmp_path))['c'], airfoils(5)['c'])
+
+
+def test_only_current_and_previous_data_are_kept(tmp_path):
+    for n in (3, 4, 5, 6):
+        write_pack(airfoils(n), str(tmp_path))
+
+    assert len([file for file in os.listdir(tmp_path) if file.endswith('.bin')]) == 2
+
+
+def test_data_not_matching_index_is_rejected(tmp_path):
+    write_pack(airfoils(5), str(tmp_path))
+
+    with open(tmp_path / PACK_INDEX) as file:
+        data_file = json.load(file)['data']
+
+    with open(tmp_path / data_file, 'r+b') as file:
+        file.truncate(16)
+
+    with pytest.raises(ValueError):
+        AirfoilPack(str(tmp_path))
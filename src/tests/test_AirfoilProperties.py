@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from backend.AirFoilTool import naca_family
+from backend.AirfoilProperties import PROPERTIES, PropertyIndex, airfoil_properties, get_property_index, property_table
+
+
+def naca(code: str):
+    return naca_family([code], n=100, cosine_spacing=True)[0]
+
+
+def test_naca_thickness_and_camber():
+    properties = airfoil_properties(naca('2412'))
+
+    assert properties['thickness'] == pytest.approx(0.12, abs=1e-3)
+    assert properties['thickness_x'] == pytest.approx(0.3, abs=0.02)
+    assert properties['camber'] == pytest.approx(0.02, abs=1e-3)
+    assert properties['camber_x'] == pytest.approx(0.4, abs=0.02)
+    assert properties['le_radius'] == pytest.approx(1.1019*0.12**2, rel=0.1)
+
+
+def test_symmetric_section_has_no_camber():
+    assert airfoil_properties(naca('0012'))['camber'] == pytest.approx(0, abs=1e-9)
+
+
+@pytest.mark.parametrize('points', [
+    slice(0, 101),      # a single surface
+    slice(0, 170),      # lower surface ending at 80% of the chord
+])
+def test_partial_contours_are_not_measured(points):
+    properties = airfoil_properties(naca('2412')[points])
+
+    assert all(np.isnan(properties[key]) for key in PROPERTIES)
+
+
+def test_footnote_point_is_not_measured():
+    coordinates = np.concatenate((naca('2412'), [[100, 0]]))
+
+    assert np.isnan(airfoil_properties(coordinates)['thickness'])
+
+
+def test_implausible_airfoils_drop_out_of_queries():
+    index = PropertyIndex(property_table({'naca2412': naca('2412'), 'single': naca('2412')[:101]}))
+
+    assert index.query(thickness=(0.1, 0.2)) == ['naca2412']
+    assert index.query(camber=(None, 1)) == ['naca2412']
+
+
+def test_indexed_naca_section_matches_its_definition():
+    properties = get_property_index()['naca2412']
+
+    # Half the trailing edge thickness of the NACA thickness distribution at x = 1
+    te_half_thickness = 5*0.12*(0.2969 - 0.1260 - 0.3516 + 0.2843 - 0.1015)
+
+    assert properties['thickness'] == pytest.approx(0.12, abs=1e-3)
+    assert properties['camber'] == pytest.approx(0.02, abs=1e-3)
+    assert properties['te_thickness'] == pytest.approx(2*te_half_thickness, abs=2e-4)
+    assert 'naca2412' in get_property_index().query(thickness=(0.119, 0.121), te_thickness=(None, 0.003))
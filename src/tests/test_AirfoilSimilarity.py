@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from backend.AirFoilTool import FourDigitNACA, LoadedAirfoil, naca_family
+from backend.AirfoilDatabase import REGISTRY, get_pack, read_processed_file
+from backend.AirfoilSimilarity import ShapeIndex, get_shape_index, leading_edge, shape_vector, similar_airfoils
+from backend.SplineTool import RESAMPLER
+
+
+def coordinates(airfoil):
+    return np.stack((airfoil.coordinates['x'], airfoil.coordinates['z']), axis=-1)
+
+
+@pytest.mark.parametrize('n', [25, 50, 51, 100])
+def test_shape_vector_does_not_depend_on_sampling(n):
+    reference = shape_vector(naca_family(['2412'], n=100, cosine_spacing=True)[0])
+    shape = shape_vector(naca_family(['2412'], n=n, cosine_spacing=True)[0])
+
+    assert np.sqrt(np.mean((shape - reference)**2)) < 5e-4
+
+
+def test_leading_edge_of_symmetric_section():
+    section = naca_family(['0012'], n=51, cosine_spacing=True)[0]
+
+    _, _, le = leading_edge(np.delete(section, 51, axis=0))
+
+    assert le == pytest.approx([0, 0], abs=1e-6)
+
+
+@pytest.mark.parametrize('code', ['0012', '2412', '4415'])
+def test_naca_section_finds_its_catalog_entry(code):
+    airfoil = FourDigitNACA(code, 1.0)
+    airfoil.load_coordinates(cosine_spacing=True, n=50)
+
+    assert similar_airfoils(coordinates(airfoil), k=1)[0][0] == f"naca{code}"
+
+
+def test_names_match_regardless_of_case():
+    sections = naca_family(['0015', '0012', '2412'], n=50, cosine_spacing=True)
+    index = ShapeIndex(['ah81k144wfKlappe', 'naca0012', 'naca2412'], [shape_vector(section) for section in sections])
+
+    assert 'ah81k144wfKlappe' in index
+    assert 'AH81K144WFKLAPPE' in index
+    assert [name for name, _ in index.query('ah81k144wfklappe', k=2)] == ['naca0012', 'naca2412']
+
+
+def test_mixed_case_catalog_entry():
+    index = get_shape_index()
+
+    names = [name for name, _ in similar_airfoils('ah81k144wfKlappe', k=3)]
+
+    assert 'ah81k144wfKlappe' in index
+    assert len(names) == 3 and 'ah81k144wfKlappe' not in names
+
+
+@pytest.mark.parametrize('code', ['2412', 2412, np.int64(2412), 'naca2412', 'NACA 2412'])
+def test_query_by_naca_code(code):
+    results = similar_airfoils(code, k=5)
+    vector = get_shape_index().shape(code)
+
+    assert len(results) == 5 and 'naca2412' not in [name for name, _ in results]
+    assert vector == pytest.approx(get_shape_index().shape('naca2412'))
+
+
+def test_query_by_naca_code_outside_the_catalog():
+    airfoil = FourDigitNACA('2430', 1.0)
+    airfoil.load_coordinates(cosine_spacing=True, n=100)
+
+    assert get_shape_index().shape(2430) == pytest.approx(shape_vector(coordinates(airfoil)), abs=1e-6)
+
+
+def test_integer_code_with_leading_zeros():
+    assert get_shape_index().shape(12) == pytest.approx(get_shape_index().shape('naca0012'))
+
+
+def test_catalog_vector_uses_the_wing_splines():
+    pack = get_pack()
+    RESAMPLER.clear()
+    shape_vector(pack['e1213'] if pack is not None else read_processed_file(REGISTRY.path('e1213')))
+    splines = RESAMPLER.stats()['splines']
+
+    LoadedAirfoil('e1213').load_coordinates(cosine_spacing=True, n=50)
+
+    assert splines == 2 and RESAMPLER.stats()['splines'] == splines
+
+
+def test_surfaces_that_cannot_be_fitted():
+    section = naca_family(['2412'], n=25, cosine_spacing=True)[0]
+
+    with pytest.raises(ValueError):
+        shape_vector(np.concatenate((section, section[-1:] + [0, -0.001])))
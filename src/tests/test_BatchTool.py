@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from backend.BatchTool import construct_wings
+from backend.WingTool import Wing
+
+
+def make_wing(chord, dtype=np.float64):
+    wing = Wing(dtype=dtype)
+    wing.set_span_discretization(np.linspace(0, 10, 11))
+    wing.set_chord(chord)
+    wing.set_twist(lambda y: 2 - 0.2*y)
+    wing.set_sweep(15)
+    wing.set_airfoil('naca2412')
+    wing.set_airfoil_steps(20)
+
+    return wing
+
+
+def reference(wing):
+    wing.construct()
+    return wing.data_container.get_sections().copy()
+
+
+@pytest.mark.parametrize('dtypes', [(np.float32, np.float64), (np.float64, np.float32, np.float32)])
+def test_mixed_precision_batch_uses_the_widest_type(dtypes):
+    wings = [make_wing(1.0 + idx, dtype) for idx, dtype in enumerate(dtypes)]
+    expected = [reference(make_wing(1.0 + idx, dtype)) for idx, dtype in enumerate(dtypes)]
+
+    with construct_wings(wings, processes=1) as batch:
+        assert batch.coordinates.dtype == np.float64
+
+        for coordinates, sections in zip(batch.coordinates, expected):
+            np.testing.assert_array_equal(coordinates, sections.astype(np.float64))
+
+
+def test_single_precision_batch():
+    wings = [make_wing(chord, np.float32) for chord in (1.0, 2.0)]
+
+    with construct_wings(wings, processes=1) as batch:
+        assert batch.coordinates.dtype == np.float32
+        np.testing.assert_array_equal(batch.coordinates[1], reference(make_wing(2.0, np.float32)))
+        assert batch.metrics()['area'] == pytest.approx([10, 20], rel=1e-6)
+
+
+def test_batch_shape_mismatch():
+    wings = [make_wing(1.0), make_wing(1.0)]
+    wings[1].set_airfoil_steps(30)
+
+    with pytest.raises(ValueError):
+        construct_wings(wings, processes=1)
@@ -0,0 +1,95 @@
+import os
+import numpy as np
+import pytest
+from backend.MeshTool import STL_RECORD, triangulate, write_ply, write_stl
+from backend.MetricsTool import wing_metrics
+from backend.WingTool import Wing
+
+
+def tapered_wing(span_steps=21, airfoil='naca2412', airfoil_steps=30):
+    wing = Wing()
+    wing.set_span_discretization(np.linspace(0, 10, span_steps))
+    wing.set_chord(lambda y: 2 - 0.1*y)
+    wing.set_sweep(20)
+    wing.set_dihedral(5)
+    wing.set_airfoil(airfoil)
+    wing.set_airfoil_steps(airfoil_steps)
+    wing.construct()
+
+    return wing.data_container.get_sections()
+
+
+def signed_volume(vertices, faces):
+    v0, v1, v2 = (vertices[faces[:, i]] for i in range(3))
+    return np.einsum('ij,ij->i', v0, np.cross(v1, v2)).sum()/6
+
+
+@pytest.mark.parametrize('airfoil', ['naca2412', 'naca0012', 'e1213'])
+def test_mesh_is_watertight(airfoil):
+    vertices, faces = triangulate(tapered_wing(airfoil=airfoil))
+
+    # Every directed edge appears once, and its reverse belongs to the neighbouring face
+    edges = np.concatenate((faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]))
+    unique, counts = np.unique(edges, axis=0, return_counts=True)
+
+    assert np.all(counts == 1)
+    assert len(unique) == len(edges)
+    assert set(map(tuple, edges)) == set(map(tuple, edges[:, ::-1]))
+
+    # No collapsed faces and no unused vertices
+    areas = np.linalg.norm(np.cross(vertices[faces[:, 1]] - vertices[faces[:, 0]],
+                                    vertices[faces[:, 2]] - vertices[faces[:, 0]]), axis=-1)
+    assert np.all(areas > 0)
+    assert np.array_equal(np.unique(faces), np.arange(len(vertices)))
+
+
+@pytest.mark.parametrize('method', ['simpson', 'trapezoid'])
+def test_mesh_volume_matches_the_metrics(method):
+    sections = tapered_wing()
+    vertices, faces = triangulate(sections)
+
+    # Outward normals give a positive volume. The sections are scaled copies of each other, so the section area
+    # is quadratic along the span and Simpson's rule is exact; the trapezoid rule is within the taper error.
+    volume = signed_volume(vertices, faces)
+    expected = wing_metrics(sections, method=method)['volume']
+
+    assert volume > 0
+    assert volume == pytest.approx(expected, rel=1e-10 if method == 'simpson' else 1e-3)
+
+
+def test_stl_and_ply_hold_the_mesh(tmp_path):
+    sections = tapered_wing()
+    vertices, faces = triangulate(sections)
+
+    stl, ply = os.path.join(tmp_path, 'wing.stl'), os.path.join(tmp_path, 'wing.ply')
+
+    # Blocks smaller than the wing, so the faces between blocks are written as well
+    assert write_stl(stl, sections, chunk=4) == len(faces)
+    assert write_ply(ply, sections, chunk=4) == (len(vertices), len(faces))
+
+    with open(stl, 'rb') as file:
+        file.seek(80)
+        count = int(np.frombuffer(file.read(4), dtype='<u4')[0])
+        records = np.frombuffer(file.read(), dtype=STL_RECORD)
+
+    assert count == len(records) == len(faces)
+    np.testing.assert_allclose(records['vertices'], vertices[faces].astype(np.float32))
+
+    normals = np.cross(records['vertices'][:, 1] - records['vertices'][:, 0],
+                       records['vertices'][:, 2] - records['vertices'][:, 0])
+    assert np.all(np.einsum('ij,ij->i', normals, records['normal']) > 0)
+
+    with open(ply, 'rb') as file:
+        header = file.read(1000).split(b'end_header\n')[0].decode('ascii')
+
+    assert f"element vertex {len(vertices):>12d}" in header and f"element face {len(faces):>12d}" in header
+
+
+def test_streamed_blocks_give_the_same_mesh():
+    sections = tapered_wing()
+
+    vertices, faces = triangulate(sections)
+    streamed_vertices, streamed_faces = triangulate(iter([sections[:5], sections[5:6], sections[6:]]))
+
+    np.testing.assert_array_equal(streamed_vertices, vertices)
+    np.testing.assert_array_equal(streamed_faces, faces)
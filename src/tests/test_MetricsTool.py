@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from backend.AirFoilTool import naca_family
+from backend.MetricsTool import mean_aerodynamic_chord, simpson, trapezoid, wing_metrics
+from backend.WingTool import Wing
+
+
+def wing_sections(chord, span=10.0, span_steps=21, sweep=None, dihedral=None):
+    wing = Wing()
+    wing.set_span_discretization(np.linspace(0, span, span_steps))
+    wing.set_chord(chord)
+    if sweep is not None:
+        wing.set_sweep(sweep)
+    if dihedral is not None:
+        wing.set_dihedral(dihedral)
+    wing.set_airfoil('naca2412')
+    wing.set_airfoil_steps(40)
+    wing.construct()
+
+    return wing, wing.data_container.get_sections()
+
+
+def unit_section():
+    section = naca_family(['2412'], n=40)[0]
+    closed = np.vstack((section, section[:1]))
+
+    area = 0.5*abs(np.sum(closed[:-1, 0]*closed[1:, 1] - closed[1:, 0]*closed[:-1, 1]))
+    perimeter = np.sum(np.hypot(*np.diff(section, axis=0).T))
+
+    return area, perimeter
+
+
+@pytest.mark.parametrize('method', ['simpson', 'trapezoid'])
+def test_rectangular_wing(method):
+    _, sections = wing_sections(2.0)
+    area, perimeter = unit_section()
+
+    metrics = wing_metrics(sections, method=method)
+
+    assert metrics['span'] == pytest.approx(10)
+    assert metrics['area'] == pytest.approx(20, rel=1e-12)
+    assert metrics['MAC'] == pytest.approx(2, rel=1e-12)
+    assert metrics['aspect_ratio'] == pytest.approx(5, rel=1e-12)
+    assert metrics['x_LEMAC'] == pytest.approx(0.5, rel=1e-12)
+    assert metrics['volume'] == pytest.approx(area*4*10, rel=1e-12)
+    assert metrics['wetted_area'] == pytest.approx(perimeter*2*10, rel=1e-12)
+
+
+def test_tapered_swept_wing():
+    root, tip, span, sweep = 3.0, 1.2, 10.0, 25.0
+    wing, sections = wing_sections(lambda y: root + (tip - root)*y/span, span=span, sweep=sweep, dihedral=4)
+
+    taper = tip/root
+    area = span*(root + tip)/2
+    mac = 2/3*root*(1 + taper + taper**2)/(1 + taper)
+    y_mac = span/3*(1 + 2*taper)/(1 + taper)
+
+    metrics = wing_metrics(sections)
+
+    # The chord is linear along the span, so Simpson's rule is exact for the area and the MAC
+    assert metrics['area'] == pytest.approx(area, rel=1e-12)
+    assert metrics['MAC'] == pytest.approx(mac, rel=1e-12)
+    assert metrics['aspect_ratio'] == pytest.approx(span**2/area, rel=1e-12)
+    # The leading edge lies a quarter chord ahead of the swept quarter-chord line
+    assert metrics['x_LEMAC'] == pytest.approx(mac/4 - np.tan(np.deg2rad(sweep))*y_mac, rel=1e-12)
+    assert metrics['volume'] == pytest.approx(unit_section()[0]*span*(root**2 + root*tip + tip**2)/3, rel=1e-12)
+
+    assert wing.MAC == pytest.approx(mac, rel=1e-12)
+    assert mean_aerodynamic_chord(wing.chord_distribution['chord'], np.linspace(0, span, 21)) == pytest.approx(mac)
+
+
+def test_metrics_of_a_stack_of_wings():
+    stack = np.stack([wing_sections(chord)[1] for chord in (1.0, 2.0, lambda y: 2 - 0.1*y, 1.5)]).reshape(2, 2, 21, 80, 3)
+
+    metrics = wing_metrics(stack)
+
+    for idx in np.ndindex(2, 2):
+        single = wing_metrics(stack[idx])
+
+        for key, values in metrics.items():
+            assert values.shape == (2, 2)
+            assert values[idx] == pytest.approx(single[key], rel=1e-12)
+
+
+def test_quadrature_on_uneven_spacing():
+    x = np.array([0, 0.3, 1.0, 1.2, 2.5, 3.0])
+
+    # Simpson's rule is exact for quadratics, also with an odd number of unequal intervals
+    assert simpson(x**2 - x, x) == pytest.approx(9 - 4.5, rel=1e-12)
+    assert trapezoid(2*x + 1, x) == pytest.approx(12, rel=1e-12)
+
+    with pytest.raises(ValueError):
+        wing_metrics(np.zeros((3, 4, 3)), method='midpoint')
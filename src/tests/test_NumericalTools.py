@@ -0,0 +1,102 @@
+import math
+import numpy as np
+import pytest
+from backend.NumericalTools import evaluate_callable, linear_interpolation, resample_distribution
+
+
+def loop_resample(knots, values, x):
+    """
+    Piecewise-linear resampling with one linear_interpolation call per position, holding the end values outside
+    the knots.
+    """
+
+    order = np.argsort(knots)
+    knots, values = np.asarray(knots, dtype=float)[order], np.asarray(values, dtype=float)[order]
+    result = []
+
+    for xi in x:
+        if xi <= knots[0]:
+            result.append(values[0])
+        elif xi >= knots[-1]:
+            result.append(values[-1])
+        else:
+            idx = np.searchsorted(knots, xi, side='right') - 1
+            result.append(linear_interpolation(xi, (knots[idx], values[idx]), (knots[idx + 1], values[idx + 1])))
+
+    return np.array(result)
+
+
+def test_linear_resampling_matches_the_loop():
+    rng = np.random.default_rng(2)
+    knots, values = rng.permutation(np.linspace(0, 10, 30)), rng.normal(size=30)
+    x = np.linspace(-1, 11, 500)
+
+    np.testing.assert_allclose(resample_distribution(knots, values, x), loop_resample(knots, values, x), rtol=1e-12)
+
+
+def test_resampling_includes_the_knots_and_the_tip():
+    knots, values = [0, 4, 10], [3.0, 2.0, 1.0]
+    y = np.linspace(0, 10, 11)
+
+    for mode in ('linear', 'step', 'cubic'):
+        result = resample_distribution(knots, values, y, mode=mode)
+
+        assert result.shape == y.shape
+        assert result[[0, 4, 10]] == pytest.approx(values)
+
+
+def test_step_resampling():
+    result = resample_distribution([10, 0, 4], [1.0, 3.0, 2.0], [-1, 0, 3.9, 4, 9.99, 10, 12], mode='step')
+
+    np.testing.assert_array_equal(result, [3, 3, 3, 2, 2, 1, 1])
+
+
+def test_cubic_resampling():
+    knots = np.linspace(0, 10, 6)
+
+    # A cubic spline reproduces a quadratic through not-a-knot end conditions, and holds its end values outside
+    result = resample_distribution(knots, 0.1*knots**2, [-2, 1.5, 7.25, 12], mode='cubic')
+
+    np.testing.assert_allclose(result, [0, 0.225, 5.25625, 10], rtol=1e-12, atol=1e-12)
+    assert resample_distribution([5], [2.0], [0, 10], mode='cubic') == pytest.approx([2, 2])
+
+
+def test_invalid_distributions():
+    with pytest.raises(ValueError):
+        resample_distribution([0, 1], [1.0], [0.5])
+
+    with pytest.raises(ValueError):
+        resample_distribution([], [], [0.5])
+
+    with pytest.raises(ValueError):
+        resample_distribution([0, 1], [1.0, 2.0], [0.5], mode='quadratic')
+
+
+
+def test_numpy_safe_callables_are_called_once():
+    calls = []
+
+    def chord(y):
+        calls.append(y)
+        return 3*np.sqrt(1 - (y/10)**2)
+
+    x = np.linspace(0, 10, 101)
+    values, path = evaluate_callable(chord, x)
+
+    assert path == 'vectorized' and len(calls) == 1
+    np.testing.assert_allclose(values, [3*math.sqrt(1 - (xi/10)**2) for xi in x], rtol=1e-12)
+
+
+def test_scalar_callables_fall_back():
+    x = np.linspace(0, 1, 5)
+
+    # Branching on the value fails on an array, np.vectorize handles it
+    values, path = evaluate_callable(lambda y: 2.0 if y > 0.5 else 1.0, x)
+    assert path == 'np.vectorize'
+    np.testing.assert_array_equal(values, [1, 1, 1, 2, 2])
+
+    # A constant returns a single value for the whole array, which is not one value per station
+    values, path = evaluate_callable(lambda y: 4.0, x)
+    assert path == 'np.vectorize'
+    np.testing.assert_array_equal(values, np.full(5, 4.0))
+
@@ -0,0 +1,45 @@
+import tracemalloc
+import numpy as np
+from backend.ProfilingTool import instrumented, record
+
+
+@instrumented('allocate')
+def allocate(n: int):
+    return np.ones(n).sum()
+
+
+def test_peak_memory_of_a_stage():
+    with record() as recorder:
+        allocate(10**6)
+
+    assert recorder.report()['allocate']['peak_memory'] >= 8*10**6
+    assert not tracemalloc.is_tracing()
+
+
+def test_nested_recorder_leaves_the_enclosing_peak_alone():
+    with record() as outer:
+        with record() as inner:
+            allocate(10**6)
+
+        allocate(10)
+
+    assert inner.report()['allocate']['peak_memory'] is None
+    assert outer.report()['allocate']['calls'] == 1
+
+
+def test_peak_of_existing_tracing_is_not_reset():
+    tracemalloc.start()
+
+    try:
+        data = np.ones(10**6)
+        del data
+
+        with record() as recorder:
+            allocate(10)
+
+        assert tracemalloc.get_traced_memory()[1] >= 8*10**6
+        assert recorder.report()['allocate']['peak_memory'] is None
+        assert tracemalloc.is_tracing()
+
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,289 @@
+import pickle
+import tracemalloc
+import numpy as np
+import pytest
+from backend.WingTool import DataStorage, Wing, apply_dihedral, apply_sweep, apply_twist, span_offsets
+
+
+def make_wing(y=np.linspace(0, 10, 41)):
+    wing = Wing()
+    wing.set_span_discretization(y)
+    wing.set_chord(lambda y: 2 - 0.1*y)
+    wing.set_sweep(lambda y: 25 - y)
+    wing.set_dihedral(4)
+    wing.set_twist(lambda y: 1 - 0.2*y)
+    wing.set_airfoil('naca2412')
+    wing.set_airfoil_steps(30)
+
+    return wing
+
+
+def test_pickled_wing_leaves_out_constructed_coordinates():
+    wing = make_wing()
+    wing.construct()
+
+    payload = pickle.dumps(wing)
+    copy = pickle.loads(payload)
+
+    assert len(payload) < wing.data_container.get_sections().nbytes
+    assert copy.data_container.get_sections() is None
+
+    copy.construct()
+    np.testing.assert_array_equal(copy.data_container.get_sections(), wing.data_container.get_sections())
+
+
+def test_streamed_sections_match_the_constructed_wing():
+    y = np.linspace(0, 10, 41)
+    y = np.concatenate((y[20:], y[:20][::-1]))
+
+    for dtype in (np.float64, np.float32):
+        wing = make_wing(y)
+        wing.set_dtype(dtype)
+        wing.construct()
+
+        for chunk in (1, 7, 100):
+            streamed = np.concatenate(list(wing.iter_sections(chunk=chunk)))
+
+            np.testing.assert_array_equal(streamed, wing.data_container.get_sections())
+
+
+def test_edits_after_construction_match_a_fresh_wing():
+    edits = [lambda w: w.set_twist(3), lambda w: w.set_sweep(10), lambda w: w.set_dihedral(-2),
+             lambda w: w.set_chord(1.5)]
+
+    wing = make_wing()
+    wing.construct()
+
+    for count, edit in enumerate(edits, start=1):
+        # Editing the storage must not leak into the stages a later construction restarts from
+        wing.data_container.get_sections()[:] = 0
+
+        edit(wing)
+        wing.construct()
+
+        reference = make_wing()
+        for applied in edits[:count]:
+            applied(reference)
+        reference.construct()
+
+        np.testing.assert_array_equal(wing.data_container.get_sections(), reference.data_container.get_sections())
+
+
+def test_construction_memory():
+    wing = make_wing(np.linspace(0, 10, 500))
+    wing.set_airfoil_steps(100)
+    wing.construct()
+    size = wing.data_container.get_sections().nbytes
+
+    tracemalloc.start()
+    try:
+        wing.set_span_discretization(np.linspace(0, 10, 500))
+        wing.construct()
+        current, peak = tracemalloc.get_traced_memory()
+
+    finally:
+        tracemalloc.stop()
+
+    # Cached unit-chord and shifted sections plus the storage, with one temporary for the twist
+    assert current < 3*size and peak < 4*size
+
+
+def random_sections(n_span=6, n_points=8, seed=0):
+    rng = np.random.default_rng(seed)
+    sections = rng.normal(size=(n_span, n_points, 3))
+    sections[..., 1] = rng.permutation(n_span)[:, None]
+
+    return sections
+
+
+def test_storage_sorts_sections_along_the_span():
+    sections = random_sections()
+    storage = DataStorage()
+    storage.set_data(sections)
+
+    order = np.argsort(sections[:, 0, 1])
+    np.testing.assert_array_equal(storage.get_sections(), sections[order])
+    np.testing.assert_array_equal(storage.get_span_coordinates(), np.arange(6))
+
+
+def test_storage_round_trips():
+    storage = DataStorage()
+    storage.set_data(random_sections())
+    reference = storage.get_sections().copy()
+
+    for data in (storage.get_sections(), storage.get_array(), storage.get_dictionary(), storage.get_array().tolist()):
+        copy = DataStorage()
+        copy.set_data(data)
+
+        np.testing.assert_array_equal(copy.get_sections(), reference)
+
+    dictionary = storage.get_dictionary()
+    assert list(dictionary) == list(range(6))
+    np.testing.assert_array_equal(dictionary[2]['x'], reference[2, :, 0])
+    np.testing.assert_array_equal(dictionary[2]['z'], reference[2, :, 2])
+    assert storage.get_array().shape == (3, 6*8)
+
+
+def test_storage_views_write_through():
+    storage = DataStorage()
+    storage.set_data(random_sections())
+    sections = storage.get_sections()
+
+    storage.get_dictionary()[3]['z'][:] = 7
+    storage.get_array()[0, :8] = -1
+
+    assert np.all(sections[3, :, 2] == 7) and np.all(sections[0, :, 0] == -1)
+    assert np.shares_memory(storage.get_array(), sections)
+
+
+def test_storage_keeps_single_precision():
+    storage = DataStorage()
+    storage.set_data(random_sections().astype(np.float32))
+    assert storage.get_sections().dtype == np.float32
+
+    storage.set_data(random_sections().astype(np.float16))
+    assert storage.get_sections().dtype == np.float32
+
+    storage.set_data(random_sections().astype(int))
+    assert storage.get_sections().dtype == np.float64
+
+    with pytest.raises(TypeError):
+        storage.set_data('sections')
+
+
+def loop_transforms(sections, y, twist, sweep, dihedral):
+    """
+    Twist, sweep and dihedral applied station by station, like the original loops of the Wing class.
+    """
+
+    sections = sections.copy()
+
+    for section, ti in zip(sections, twist):
+        theta = np.deg2rad(ti)
+        T = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+        section[:, ::2] = np.matmul(T, section[:, ::2].T).T
+
+    delta_x = delta_z = 0
+    for idx in range(len(y) - 1):
+        delta_x = delta_x + (y[idx + 1] - y[idx])*np.tan(np.deg2rad(sweep[idx]))
+        delta_z = delta_z + (y[idx + 1] - y[idx])*np.tan(np.deg2rad(dihedral[idx]))
+        sections[idx + 1, :, 0] -= delta_x
+        sections[idx + 1, :, 2] += delta_z
+
+    return sections
+
+
+def batched_transforms(sections, y, twist, sweep, dihedral):
+    apply_twist(sections, twist)
+    apply_sweep(sections, y, sweep)
+    apply_dihedral(sections, y, dihedral)
+
+    return sections
+
+
+def transform_inputs(n_wings, n_span=50, seed=1):
+    rng = np.random.default_rng(seed)
+    y = np.sort(rng.uniform(0, 10, n_span))
+    sections = rng.normal(size=(n_wings, n_span, 12, 3))
+    sections[..., 1] = y[:, None]
+    angles = [rng.uniform(-30, 30, (n_wings, n_span)) for _ in range(3)]
+
+    return sections, y, angles
+
+
+def test_batched_transforms_match_the_station_loops():
+    sections, y, (twist, sweep, dihedral) = transform_inputs(1)
+
+    result = batched_transforms(sections[0].copy(), y, twist[0], sweep[0], dihedral[0])
+
+    np.testing.assert_allclose(result, loop_transforms(sections[0], y, twist[0], sweep[0], dihedral[0]),
+                               rtol=1e-12, atol=1e-12)
+
+
+def test_transforms_broadcast_over_a_batch_of_wings():
+    sections, y, (twist, sweep, dihedral) = transform_inputs(4)
+
+    result = batched_transforms(sections.copy(), np.broadcast_to(y, (4, len(y))), twist, sweep, dihedral)
+
+    for wing in range(4):
+        np.testing.assert_allclose(result[wing], loop_transforms(sections[wing], y, twist[wing], sweep[wing],
+                                                                 dihedral[wing]), rtol=1e-12, atol=1e-12)
+
+
+def test_span_offsets_accumulate_in_double_precision():
+    y = np.linspace(0, 10, 10001)
+
+    offsets = span_offsets(y.astype(np.float32), np.full(y.size, 45, dtype=np.float32), initial=1.0)
+
+    assert offsets.dtype == np.float64
+    assert offsets[0] == 1.0 and offsets[-1] == pytest.approx(11.0, rel=1e-9)
+
+
+def test_distribution_inputs_reach_the_tip_station():
+    y = np.linspace(0, 10, 21)
+    expected = np.interp(y, [0, 4, 10], [3.0, 2.0, 1.0])
+
+    inputs = [
+        {0: 3.0, 4: 2.0, 10: 1.0},
+        {10: 1.0, 0: 3.0, 4: 2.0},
+        np.array([[3.0, 0], [2.0, 4], [1.0, 10]]),
+        np.array([[3.0, 2.0, 1.0], [0, 4, 10]]),
+        [[3.0, 0], [2.0, 4], [1.0, 10]],
+    ]
+
+    for distribution in inputs:
+        wing = Wing()
+        wing.set_span_discretization(y)
+        wing.set_chord(distribution)
+        wing.set_twist(distribution)
+
+        np.testing.assert_allclose(wing.chord_distribution['chord'], expected, rtol=1e-12)
+        np.testing.assert_allclose(wing.twist_distribution['twist'], expected, rtol=1e-12)
+        assert wing.cr == 3.0 and wing.ct == 1.0
+
+
+def test_distribution_per_station_and_step_interpolation():
+    y = np.linspace(0, 10, 6)
+
+    wing = Wing()
+    wing.set_span_discretization(y)
+    wing.set_sweep(np.arange(6.0))
+    wing.set_dihedral({0: 1.0, 5: 2.0}, interpolation='step')
+
+    np.testing.assert_array_equal(wing.sweep_distribution['sweep'], np.arange(6.0))
+    np.testing.assert_array_equal(wing.dihedral_distribution['dihedral'], [1, 1, 1, 2, 2, 2])
+
+    with pytest.raises(ValueError):
+        wing.set_sweep(np.ones((3, 3)))
+
+
+def test_wing_records_how_callables_were_evaluated():
+    wing = Wing()
+    wing.set_span_discretization(np.linspace(0, 10, 11))
+    wing.set_chord(lambda y: 2 - 0.1*y)
+    wing.set_twist(lambda y: 1.0 if y < 5 else 0.0)
+
+    assert wing.callable_evaluation == {'chord': 'vectorized', 'twist': 'np.vectorize'}
+    np.testing.assert_allclose(wing.chord_distribution['chord'], 2 - 0.1*np.linspace(0, 10, 11))
+    np.testing.assert_array_equal(wing.twist_distribution['twist'], [1]*5 + [0]*6)
+
+
+@pytest.mark.parametrize('value', [np.float64(2.0), np.float32(2.0), np.int64(2), 2, 2.0])
+def test_setters_accept_numpy_scalars(value):
+    wing = make_wing()
+    wing.set_chord(value)
+    wing.set_twist(value)
+    wing.set_sweep(value)
+    wing.set_dihedral(value)
+
+    for distribution, key in ((wing.chord_distribution, 'chord'), (wing.twist_distribution, 'twist'),
+                              (wing.sweep_distribution, 'sweep'), (wing.dihedral_distribution, 'dihedral')):
+        np.testing.assert_array_equal(distribution[key], np.full(41, 2.0))
+
+    assert wing.cr == wing.ct == 2 and wing.MAC == pytest.approx(2)
+    wing.construct()
+
+
+def test_setters_reject_booleans():
+    with pytest.raises(TypeError):
+        make_wing().set_twist(True)